@@ -0,0 +1,9 @@
+import itertools
+
+
+# every object created and every change made gets a new version so a publisher can tell what changed since it last looked
+_versions = itertools.count(1)
+
+
+def next_version() -> int:
+    return next(_versions)
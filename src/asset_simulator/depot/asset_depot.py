@@ -1,21 +1,30 @@
 from collections import namedtuple
 from datetime import datetime, timedelta
+from itertools import chain
 import json
-from typing import Optional, Dict, List
+import math
+from typing import Optional, Dict, List, Set
 
-from pydantic import BaseModel
+from pydantic import BaseModel, root_validator
 import numpy as np
+import pandas as pd
 
 from src.asset_simulator.station.station import Station
 from src.asset_simulator.station.station_fleet import StationFleet
+from src.asset_simulator.station.station_record import StationRecord
 from src.asset_simulator.vehicle.vehicle import Vehicle
 from src.asset_simulator.vehicle.vehicle_fleet import VehicleFleet
+from src.asset_simulator.vehicle.vehicle_record import VehicleRecord
 from src.asset_simulator.schedule.schedule import Schedule
 from src.mock_queue.msg_broker import MsgBroker
 from src.asset_simulator.reservation.reservation import Reservation
 from src.asset_simulator.depot.fleet_manager import FleetManager
+from src.asset_simulator.depot.kpi_accumulator import KpiAccumulator
+from src.asset_simulator.depot.snapshot_recorder import SnapshotRecorder
+from src.asset_simulator.depot.status_timeline import NO_STATION, StatusTimeline, get_status_segments
 from src.mock_queue.mock_queue import MockQueue
 from src.demand_simulator.demand_simulator.demand_simulator import DemandSimulator
+from src.instrumentation.phase_profiler import profile_phase
 
 
 class AssetDepot(MsgBroker):
@@ -33,7 +42,30 @@ class AssetDepot(MsgBroker):
     power_snapshot: Dict[datetime, float] = {}
     vehicle_status_snapshot: Dict[str, List] = {}
     departure_snapshot: Dict[str, List] = {}
-
+    # interval -> ids of assigned reservations departing/arriving in it
+    departure_calendar: Dict[datetime, List[str]] = {}
+    arrival_calendar: Dict[datetime, List[str]] = {}
+    # reservations on or past their departure that haven't completed, e.g. vehicles still charging up to 80%
+    pending_departure_ids: Set[str] = set()
+    # reservation id -> order received, due reservations are handled in the order they were received
+    reservation_order: Dict[str, int] = {}
+    n_reservations_received: int = 0
+    # vehicles/stations are published as deltas with everything sent every n publishes, 1 sends everything every time
+    keyframe_every_n_publishes: int = 96
+    # opt in to KPIs updated as the simulation runs, with capture_snapshots off no history is kept at all
+    # and the KPIs are the only results, see use_kpi_accumulator
+    kpi_accumulator: Optional[KpiAccumulator] = None
+    capture_snapshots: bool = True
+    # opt in to recording vehicle soc/status and meter power snapshots into arrays instead of the dicts above
+    snapshot_recorder: Optional[SnapshotRecorder] = None
+    # opt in to keeping vehicle status history as run-length segments instead of vehicle_status_snapshot
+    status_timeline: Optional[StatusTimeline] = None
+
+    @root_validator(skip_on_failure=True)
+    def accumulate_kpis_without_snapshots(cls, values):
+        if not values['capture_snapshots'] and values['kpi_accumulator'] is None:
+            values['kpi_accumulator'] = KpiAccumulator()
+        return values
 
     @property
     def vehicles(self):
@@ -49,13 +81,105 @@ class AssetDepot(MsgBroker):
 
     def increment_interval(self):
         # capture the current values for plotting later
-        self.capture_vehicle_snapshot()
+        if self.capture_snapshots:
+            self.capture_vehicle_snapshot()
+            if self.status_timeline is not None:
+                self.status_timeline.record(self.current_datetime, *self.get_vehicle_status_arrays(self.status_timeline.get_status_code))
+        if self.kpi_accumulator is not None:
+            meter_power_kw = self.get_meter_power_kw()
+            # like the power snapshot only intervals with a vehicle charging are counted
+            if meter_power_kw is not None:
+                self.kpi_accumulator.add_meter_power(self.current_datetime, meter_power_kw)
 
 
         interval_seconds = self.interval_seconds
         self.current_datetime = self.current_datetime + timedelta(seconds=interval_seconds)
 
+    def use_kpi_accumulator(self, capture_snapshots=False):
+        if self.kpi_accumulator is None:
+            self.kpi_accumulator = KpiAccumulator()
+        self.capture_snapshots = capture_snapshots
+
+    def use_snapshot_recorder(self, n_intervals=96):
+        # status is only kept once, by the status timeline if there is one
+        self.snapshot_recorder = SnapshotRecorder.for_vehicles(self.vehicles.keys(), n_intervals, record_status=self.status_timeline is None)
+
+    def use_status_timeline(self):
+        self.status_timeline = StatusTimeline(interval_seconds=self.interval_seconds, vehicle_ids=list(self.vehicles.keys()))
+        if self.snapshot_recorder is not None:
+            self.snapshot_recorder.stop_recording_status()
+
+    def get_vehicle_status_arrays(self, get_status_code):
+        """
+        :param get_status_code: status -> code of the recorder the arrays are for
+        :return: status code and connected station id (NO_STATION if unplugged) of every vehicle
+        """
+        vehicle_fleet_state = self.fleet_manager.vehicle_fleet.state
+        if vehicle_fleet_state is None:
+            status_code = np.fromiter((get_status_code(vehicle.status) for vehicle in self.vehicles.values()), dtype=np.int8, count=len(self.vehicles))
+            station_id = np.fromiter(
+                (NO_STATION if vehicle.connected_station_id is None else vehicle.connected_station_id for vehicle in self.vehicles.values()),
+                dtype=np.int64,
+                count=len(self.vehicles)
+            )
+            return status_code, station_id
+
+        status_codes = np.array([get_status_code(status) for status in vehicle_fleet_state.statuses], dtype=np.int8)
+        return status_codes[vehicle_fleet_state.status_code], vehicle_fleet_state.connected_station_id
+
+    def record_vehicle_snapshot(self):
+        # no status when the status timeline keeps it
+        status_code = None
+        if self.snapshot_recorder.status_code is not None:
+            status_code, station_id = self.get_vehicle_status_arrays(self.snapshot_recorder.get_status_code)
+        vehicle_fleet_state = self.fleet_manager.vehicle_fleet.state
+        if vehicle_fleet_state is None:
+            self.snapshot_recorder.record(
+                self.current_datetime,
+                np.fromiter((vehicle.state_of_charge for vehicle in self.vehicles.values()), dtype=np.float64, count=len(self.vehicles)),
+                status_code,
+                self.get_meter_power_kw()
+            )
+            return
+
+        charging = vehicle_fleet_state.status_code == vehicle_fleet_state.get_status_code('charging')
+        meter_power_kw = None
+        if charging.any():
+            station_max_power_kw = self.fleet_manager.station_fleet.get_max_power_kw_by_station_id()
+            # cumsum adds in vehicle order like the power snapshot so the totals match to the bit
+            meter_power_kw = np.cumsum(station_max_power_kw[vehicle_fleet_state.connected_station_id[charging]])[-1]
+
+        self.snapshot_recorder.record(self.current_datetime, vehicle_fleet_state.state_of_charge, status_code, meter_power_kw)
+
+    def get_soc_frame(self):
+        if self.snapshot_recorder is not None:
+            return self.snapshot_recorder.get_soc_frame()
+        return pd.DataFrame.from_dict(self.vehicle_soc_snapshot)
+
+    def get_status_frame(self):
+        if self.status_timeline is not None:
+            return self.status_timeline.get_status_frame()
+        if self.snapshot_recorder is not None:
+            return self.snapshot_recorder.get_status_frame()
+        return pd.DataFrame.from_dict(self.vehicle_status_snapshot)
+
+    def get_status_segments(self):
+        """
+        :return: vehicle id -> StatusSegments, station ids are only known when the status timeline is used
+        """
+        if self.status_timeline is not None:
+            return self.status_timeline.get_segments()
+        return get_status_segments(self.get_status_frame(), self.interval_seconds)
+
+    def get_power_snapshot(self) -> Dict[datetime, float]:
+        if self.snapshot_recorder is not None:
+            return self.snapshot_recorder.get_power_snapshot()
+        return self.power_snapshot
+
     def capture_vehicle_snapshot(self):
+        if self.snapshot_recorder is not None:
+            self.record_vehicle_snapshot()
+            return
 
         # initialize dictionary
         if len(self.vehicle_soc_snapshot) == 0:
@@ -63,9 +187,10 @@ class AssetDepot(MsgBroker):
             for vehicle_id in self.vehicles.keys():
                 self.vehicle_soc_snapshot[vehicle_id] = []
 
-            self.vehicle_status_snapshot['datetime'] = []
-            for vehicle_id in self.vehicles.keys():
-                self.vehicle_status_snapshot[vehicle_id] = []
+            if self.status_timeline is None:
+                self.vehicle_status_snapshot['datetime'] = []
+                for vehicle_id in self.vehicles.keys():
+                    self.vehicle_status_snapshot[vehicle_id] = []
 
             # init value_type column
 
@@ -86,12 +211,35 @@ class AssetDepot(MsgBroker):
 
 
         # add vehicle status
+        if self.status_timeline is not None:
+            return
         self.vehicle_status_snapshot['datetime'].append(self.current_datetime)
         for vehicle in self.vehicles.values():
             # if not driving log the SOC
             self.vehicle_status_snapshot[vehicle.id].append(vehicle.status)
 
+    def get_meter_power_kw(self) -> Optional[float]:
+        """
+        :return: power drawn by every vehicle charging, summed in the same order as the power snapshot, None if none are charging
+        """
+        meter_power_kw = None
+        for vehicle in self.vehicles.values():
+            if vehicle.status == 'charging':
+                station = self.fleet_manager.stations[vehicle.connected_station_id]
+                meter_power_kw = (meter_power_kw or 0) + station.max_power_kw
+        return meter_power_kw
+
+    def capture_msg_inflight_for_plotting(self, route, key, value):
+        if self.kpi_accumulator is not None and route == 'reservation_assignments':
+            self.kpi_accumulator.add_assignment(key, value.id, value.departure_timestamp_utc)
+        if self.capture_snapshots:
+            super().capture_msg_inflight_for_plotting(route, key, value)
+
     def capture_departure_snapshot(self, reservation_id, vehicle_id, scheduled_departure_datetime, state_of_charge):
+        if self.kpi_accumulator is not None:
+            self.kpi_accumulator.add_departure(vehicle_id, reservation_id, scheduled_departure_datetime, self.current_datetime)
+        if not self.capture_snapshots:
+            return
 
         # initialize dictionary
         if len(self.departure_snapshot) == 0:
@@ -108,12 +256,19 @@ class AssetDepot(MsgBroker):
         self.departure_snapshot['vehicle_id'].append(vehicle_id)
         self.departure_snapshot['state_of_charge'].append(state_of_charge)
 
+    @profile_phase('asset.charge_vehicles')
     def charge_vehicles(self):
+        vehicle_fleet_state = self.fleet_manager.vehicle_fleet.state
+        if vehicle_fleet_state is not None:
+            vehicle_fleet_state.charge(self.interval_seconds, self.fleet_manager.station_fleet.get_max_power_kw_by_station_id())
+            return
+
         plugged_in_vehicle_station = [(vehicle.id, vehicle.connected_station_id) for vehicle in self.vehicles.values() if vehicle.status == 'charging']
         for vehicle_id, station_id in plugged_in_vehicle_station:
             max_power_kw = self.stations[station_id].max_power_kw
             self.vehicles[vehicle_id].charge(self.interval_seconds, max_power_kw, self.current_datetime)
 
+    @profile_phase('asset.depart_vehicles')
     def depart_vehicles(self):
         # if the current timestamp matches the departure AND vehicle_id matches reservation then unplug
         #todo: we don't have vehicle assignments though because the heuristic does that
@@ -135,21 +290,7 @@ class AssetDepot(MsgBroker):
                       ]
         """
 
-        departures = []
-        veh = []
-        for reservation in self.reservations.values():
-            valid_reservation = (reservation.assigned_vehicle_id != None) and (reservation.status != 'complete')
-            if valid_reservation:
-                vehicle_ready_to_depart = (self.current_datetime >= reservation.departure_timestamp_utc) and \
-                    (self.vehicles[reservation.assigned_vehicle_id].state_of_charge >= 0.8) and \
-                    (self.vehicles[reservation.assigned_vehicle_id].status != 'driving')
-                if vehicle_ready_to_depart:
-                    departures.append(reservation)
-                    veh.append(reservation.assigned_vehicle_id)
-
-        # if len(list(set(veh))) != len(veh):
-        #     print('we have dupe assigned vehs')
-
+        departures = self.get_departures()
 
         for reservation in departures:
             # if we have as assigned vehicle id and it is time to depart then depart
@@ -191,6 +332,10 @@ class AssetDepot(MsgBroker):
                 # print('missed departure')
 
     def run_interval(self):
+        self.step_interval()
+        self.publish_state()
+
+    def step_interval(self):
         #todo: only doing simple moves to parking for now, need to do moves to stations
         self.subscribe_to_queue('move_charge', 'vehicle', 'move_charge')
 
@@ -199,7 +344,8 @@ class AssetDepot(MsgBroker):
 
         # the heuristic has assigned a veh id to the reservation
         # we overwrite the current reservation with that assigned res
-        self.subscribe_to_queue('reservations', 'reservation', 'reservation_assignments')
+        reservation_ids = self.subscribe_to_queue('reservations', 'reservation', 'reservation_assignments')
+        self.schedule_reservations(reservation_ids)
 
         # important to depart vehicles first thing so that we don't assign the vehicles other tasks afterwards when it should be gone
         self.depart_vehicles()
@@ -239,10 +385,44 @@ class AssetDepot(MsgBroker):
 
         self.charge_vehicles()
 
-        # push status of all vehicles/stations to the queue at end of interval to update the heuristic
-        self.publish_to_queue('vehicles', 'vehicles_demand_sim')
-        self.publish_to_queue('vehicles', 'vehicles_heuristic')
-        self.publish_to_queue('stations', 'stations')
+    def publish_state(self, demand_simulator=True, heuristic=True):
+        # push status of all changed vehicles/stations to the queue at end of interval to update the heuristic
+        if demand_simulator:
+            self.publish_changes_to_queue('vehicles', 'vehicles_demand_sim', self.keyframe_every_n_publishes)
+        if heuristic:
+            self.publish_changes_to_queue('vehicles', 'vehicles_heuristic', self.keyframe_every_n_publishes)
+            self.publish_changes_to_queue('stations', 'stations', self.keyframe_every_n_publishes)
+
+    def is_quiet_interval(self):
+        """
+        True when step_interval would do nothing but charge and drive vehicles:
+        no instructions waiting in the queue and no vehicles to free up, depart or check in
+        """
+        if len(self.queue.move_charge) > 0 or len(self.queue.reservation_assignments) > 0:
+            return False
+        if len(self.fleet_manager.get_ready_vehicle_ids(self.current_datetime)) > 0:
+            return False
+
+        # anything due this interval is in the calendar buckets, departures still waiting on their vehicle can leave
+        # as soon as it has charged
+        if self.current_datetime in self.departure_calendar or self.current_datetime in self.arrival_calendar:
+            return False
+        return not any(self.is_ready_to_depart(self.reservations[reservation_id]) for reservation_id in self.pending_departure_ids)
+
+    def get_next_event_datetime(self) -> Optional[datetime]:
+        # next departure or arrival due, a vehicle charging can still end a quiet interval sooner, see is_quiet_interval
+        return min(chain(self.departure_calendar, self.arrival_calendar), default=None)
+
+    def step_quiet_interval(self):
+        """
+        same order as step_interval with the no-op steps left out
+
+        :return: True if a vehicle driving dropped below minimum soc, the only change the heuristic acts on
+        """
+        n_vehicles_needing_charge = self.fleet_manager.vehicle_fleet.count_vehicles_needing_charge()
+        self.decrease_soc_of_vehicles_driving()
+        self.charge_vehicles()
+        return self.fleet_manager.vehicle_fleet.count_vehicles_needing_charge() != n_vehicles_needing_charge
 
     def execute_move_charge_instructions(self):
         # self.park_finished_vehicles()
@@ -251,6 +431,57 @@ class AssetDepot(MsgBroker):
         # clear local cache of move_charge commands
         self.move_charge = {}
 
+    def get_interval_bucket(self, timestamp):
+        # first interval on or after the timestamp
+        if timestamp <= self.current_datetime:
+            return self.current_datetime
+        n_intervals = math.ceil((timestamp - self.current_datetime).total_seconds() / self.interval_seconds)
+        return self.current_datetime + timedelta(seconds=n_intervals * self.interval_seconds)
+
+    def schedule_reservations(self, reservation_ids):
+        for reservation_id in reservation_ids:
+            if reservation_id not in self.reservation_order:
+                # completed reservations are dropped, so the order can't be taken from len(reservation_order)
+                self.reservation_order[reservation_id] = self.n_reservations_received
+                self.n_reservations_received += 1
+
+            # a re-sent assignment lands in the same buckets again, due ids are de-duplicated when read
+            reservation = self.reservations[reservation_id]
+            if reservation.assigned_vehicle_id == None:
+                continue
+            departure_bucket = self.get_interval_bucket(reservation.departure_timestamp_utc)
+            self.departure_calendar.setdefault(departure_bucket, []).append(reservation_id)
+            if reservation.arrival_timestamp_utc >= self.current_datetime:
+                arrival_bucket = self.get_interval_bucket(reservation.arrival_timestamp_utc)
+                self.arrival_calendar.setdefault(arrival_bucket, []).append(reservation_id)
+
+    def get_departures(self):
+        # reservations departing this interval join the ones still waiting on their vehicle
+        self.pending_departure_ids.update(reservation_id for reservation_id in self.departure_calendar.pop(self.current_datetime, []) \
+                                          if reservation_id in self.reservations)
+
+        departures = []
+        for reservation_id in sorted(self.pending_departure_ids, key=self.reservation_order.get):
+            reservation = self.reservations[reservation_id]
+            if not self.is_valid_departure(reservation):
+                self.pending_departure_ids.discard(reservation_id)
+                continue
+
+            if self.is_ready_to_depart(reservation):
+                departures.append(reservation)
+
+        return departures
+
+    def is_valid_departure(self, reservation):
+        return (reservation.assigned_vehicle_id != None) and (reservation.status != 'complete')
+
+    def is_ready_to_depart(self, reservation):
+        # a re-sent assignment can leave the id in an earlier bucket than its departure
+        if not self.is_valid_departure(reservation) or self.current_datetime < reservation.departure_timestamp_utc:
+            return False
+        return (self.vehicles[reservation.assigned_vehicle_id].state_of_charge >= 0.8) and \
+            (self.vehicles[reservation.assigned_vehicle_id].status != 'driving')
+
     def initialize_plugins(self):
 
         station_ids = [station_id for station_id in self.stations.keys()]
@@ -270,23 +501,41 @@ class AssetDepot(MsgBroker):
                 self.fleet_manager.plugin(vehicle_id, station_id)
 
     def decrease_soc_of_vehicles_driving(self):
+        vehicle_fleet_state = self.fleet_manager.vehicle_fleet.state
+        if vehicle_fleet_state is not None:
+            vehicle_fleet_state.drive(self.interval_seconds)
+            return
+
         for vehicle in self.vehicles.values():
                 vehicle.drive(self.interval_seconds, self.current_datetime)
 
     # Upon vehicle arrival send a QR code
+    @profile_phase('asset.send_qr_scans_upon_vehicle_arrival')
     def send_qr_scans_upon_vehicle_arrival(self):
 
         # when current timestamp == arrival then send msg to QR queue
-        for res in self.reservations.values():
-            if res.arrival_timestamp_utc == self.current_datetime and res.assigned_vehicle_id != None:
-                self.publish_object_to_queue(self.vehicles[res.assigned_vehicle_id], 'scan_events')
-                self.reservations[res.id].status = 'complete'
-                self.vehicles[res.assigned_vehicle_id].park(self.current_datetime)
-                self.vehicles[res.assigned_vehicle_id].active_reservation_id = None
-
+        for res in self.get_arrivals():
+            self.publish_object_to_queue(self.vehicles[res.assigned_vehicle_id], 'scan_events')
+            self.reservations[res.id].status = 'complete'
+            self.pending_departure_ids.discard(res.id)
+            self.vehicles[res.assigned_vehicle_id].park(self.current_datetime)
+            self.vehicles[res.assigned_vehicle_id].active_reservation_id = None
+            self.drop_reservation(res.id)
+        self.arrival_calendar.pop(self.current_datetime, None)
+
+    def drop_reservation(self, reservation_id):
+        # completed reservations are never read again, drop them so a streamed run only holds the ones in flight.
+        # ids left in later calendar buckets by a re-sent assignment are skipped when the bucket is read
+        del self.reservations[reservation_id]
+        del self.reservation_order[reservation_id]
+
+
+    def get_arrivals(self):
+        arrival_ids = sorted(set(self.arrival_calendar.get(self.current_datetime, [])) & self.reservations.keys(), key=self.reservation_order.get)
+        return [self.reservations[reservation_id] for reservation_id in arrival_ids if self.reservations[reservation_id].assigned_vehicle_id != None]
 
     @classmethod
-    def prep_build_depot(cls, config, queue):
+    def prep_build_depot(cls, config, queue, array_backed=False):
         # the folling are attribute that live within depot
         l2_max_power_kw = config.l2_max_power_kw
         dcfc_max_power_kw = config.dcfc_max_power_kw
@@ -335,6 +584,12 @@ class AssetDepot(MsgBroker):
 
         station_fleet = StationFleet(stations=stations)
         vehicle_fleet = VehicleFleet(vehicles=vehicles, minimum_ready_vehicle_pool=config.minimum_ready_vehicle_pool)
+        # the config is validated above, from here on the simulation works on records
+        station_fleet.stations = {station_id: StationRecord.from_model(station) for station_id, station in stations.items()}
+        if array_backed:
+            vehicle_fleet.use_array_state()
+        else:
+            vehicle_fleet.vehicles = {vehicle_id: VehicleRecord.from_model(vehicle) for vehicle_id, vehicle in vehicles.items()}
         fleet_manager = FleetManager(vehicle_fleet=vehicle_fleet, station_fleet=station_fleet)
 
         # schedule = Schedule(reservations=reservations)
@@ -353,8 +608,8 @@ class AssetDepot(MsgBroker):
         return (config.interval_seconds, queue, fleet_manager, schedule, {})
 
     @classmethod
-    def build_depot(cls, config, queue):
-        interval_seconds, queue, fleet_manager, schedule, vehicle_snapshot = cls.prep_build_depot(config, queue)
+    def build_depot(cls, config, queue, array_backed=False):
+        interval_seconds, queue, fleet_manager, schedule, vehicle_snapshot = cls.prep_build_depot(config, queue, array_backed=array_backed)
         depot = AssetDepot(
             interval_seconds=config.interval_seconds,
             queue=queue,
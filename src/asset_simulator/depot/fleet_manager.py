@@ -43,7 +43,7 @@ class FleetManager(BaseModel):
             self.unplug(vehicle_id, current_datetime)
         self.vehicles[vehicle_id].park()
 
-    def free_up_ready_vehicles(self, current_datetime):
+    def get_ready_vehicle_ids(self, current_datetime):
         # if it is business hours between 9am and 5pm and vehicles is finished charging
         if current_datetime.hour >= 9 and current_datetime.hour <= 17:
 
@@ -51,11 +51,17 @@ class FleetManager(BaseModel):
         # if 1 == 1:
 
             # if a vehicle is finished charging or 80% done then park it instead of charge it
-            for vehicle in self.vehicles.values():
-                if vehicle.state_of_charge == 1.0 and vehicle.status in ('charging', 'finished_charging'):
-                # if vehicle.state_of_charge >= 0.8 and vehicle.status in ('charging', 'finished_charging'):
-                    self.unplug(vehicle.id, current_datetime)
-                    vehicle.status = 'parked'
+            if self.vehicle_fleet.state is not None:
+                return self.vehicle_fleet.state.get_fully_charged_vehicle_ids()
+            return [vehicle.id for vehicle in self.vehicles.values() \
+                    if vehicle.state_of_charge == 1.0 and vehicle.status in ('charging', 'finished_charging')]
+            # if vehicle.state_of_charge >= 0.8 and vehicle.status in ('charging', 'finished_charging'):
+        return []
+
+    def free_up_ready_vehicles(self, current_datetime):
+        for vehicle_id in self.get_ready_vehicle_ids(current_datetime):
+            self.unplug(vehicle_id, current_datetime)
+            self.vehicles[vehicle_id].status = 'parked'
 
     # todo: move to vehicle_fleet method
 
@@ -0,0 +1,100 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+
+class KpiAccumulator(BaseModel):
+    """
+    late departure and meter power KPIs updated as the simulation runs so no snapshot history has to be kept
+
+    departure deltas follow RuntimeEnvironment.get_departure_deltas: one per reservation assignment sent to a vehicle,
+    reservations that never departed count as late from their scheduled departure until finish is called
+    """
+    # lateness histogram, bin i counts deltas in [i*bin_minutes, (i+1)*bin_minutes), with one extra bin
+    # each side for early (< 0) and very late (>= max_minutes) departures
+    bin_minutes: int = 15
+    max_minutes: int = 14 * 24 * 60
+    late_histogram: List[int] = []
+    departure_deltas: List[float] = []
+    # (vehicle id, reservation id) -> delta of the first departure
+    departed: Dict[Tuple[int, str], float] = {}
+    # (vehicle id, reservation id) -> [scheduled departure, n assignments sent]
+    pending_assignments: Dict[Tuple[int, str], List] = {}
+    # meter power over the intervals a vehicle was charging
+    n_power_intervals: int = 0
+    total_power_kw: float = 0
+    max_power_kw: Optional[float] = None
+    min_power_kw: Optional[float] = None
+    # hour of day -> highest meter power seen in that hour
+    hourly_peak_power: Dict[int, float] = {}
+
+    def add_departure_delta(self, departure_delta_minutes: float):
+        if len(self.late_histogram) == 0:
+            self.late_histogram = [0] * (self.max_minutes // self.bin_minutes + 2)
+
+        if departure_delta_minutes < 0:
+            bin_idx = 0
+        elif departure_delta_minutes >= self.max_minutes:
+            bin_idx = len(self.late_histogram) - 1
+        else:
+            bin_idx = int(departure_delta_minutes // self.bin_minutes) + 1
+
+        self.late_histogram[bin_idx] += 1
+        self.departure_deltas.append(departure_delta_minutes)
+
+    def add_assignment(self, vehicle_id, reservation_id, scheduled_departure_datetime: datetime):
+        # non-vehicle assignments aren't counted
+        if vehicle_id is None:
+            return
+
+        key = (vehicle_id, reservation_id)
+        if key in self.departed:
+            self.add_departure_delta(self.departed[key])
+        else:
+            self.pending_assignments.setdefault(key, [scheduled_departure_datetime, 0])[1] += 1
+
+    def add_departure(self, vehicle_id, reservation_id, scheduled_departure_datetime: datetime, actual_departure_datetime: datetime):
+        key = (vehicle_id, reservation_id)
+        if key in self.departed:
+            return
+
+        self.departed[key] = (actual_departure_datetime - scheduled_departure_datetime).total_seconds()/60
+        _, n_assignments = self.pending_assignments.pop(key, [None, 0])
+        for assignment in range(0, n_assignments):
+            self.add_departure_delta(self.departed[key])
+
+    def add_meter_power(self, current_datetime: datetime, meter_power_kw: float):
+        self.n_power_intervals += 1
+        self.total_power_kw += meter_power_kw
+        self.max_power_kw = meter_power_kw if self.max_power_kw is None else max(self.max_power_kw, meter_power_kw)
+        self.min_power_kw = meter_power_kw if self.min_power_kw is None else min(self.min_power_kw, meter_power_kw)
+
+        hourly_peak_power_kw = self.hourly_peak_power.get(current_datetime.hour)
+        if hourly_peak_power_kw is None or meter_power_kw > hourly_peak_power_kw:
+            self.hourly_peak_power[current_datetime.hour] = meter_power_kw
+
+    def finish(self, current_datetime: datetime):
+        # reservations that never departed
+        for key, (scheduled_departure_datetime, n_assignments) in self.pending_assignments.items():
+            for assignment in range(0, n_assignments):
+                self.add_departure_delta((current_datetime - scheduled_departure_datetime).total_seconds()/60)
+        self.pending_assignments = {}
+
+    def get_pct_late(self, late_minute_threshold: int) -> float:
+        """
+        :param late_minute_threshold: rounded down to a multiple of bin_minutes
+        """
+        first_late_bin = min(late_minute_threshold // self.bin_minutes + 1, len(self.late_histogram) - 1)
+        return 100.0*sum(self.late_histogram[first_late_bin:]) / sum(self.late_histogram)
+
+    def get_power_stats(self) -> Dict[str, float]:
+        return {
+            'max_power': self.max_power_kw,
+            'min_power': self.min_power_kw,
+            'avg_power': self.total_power_kw/self.n_power_intervals
+        }
+
+    def get_hourly_peak_power(self) -> Dict[int, float]:
+        # one entry per hour of day a vehicle was charging, enough for the hourly peak power KPI
+        return dict(sorted(self.hourly_peak_power.items()))
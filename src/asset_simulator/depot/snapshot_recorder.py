@@ -0,0 +1,90 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.asset_simulator.vehicle.vehicle_status_codes import VehicleStatusCodes
+
+
+class SnapshotRecorder(VehicleStatusCodes):
+    """
+    per interval vehicle soc/status and meter power kept in preallocated arrays, row i is the i-th interval recorded
+
+    soc is kept as float32 and status as a code into statuses, the arrays double in size if more intervals
+    are recorded than were reserved
+    """
+    vehicle_ids: List[int]
+    datetimes: List[datetime] = []
+    state_of_charge: np.ndarray
+    # None when status is kept by a StatusTimeline instead
+    status_code: Optional[np.ndarray] = None
+    # nan for intervals without any vehicle charging, they have no entry in the power snapshot
+    meter_power_kw: np.ndarray
+    n_recorded: int = 0
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @classmethod
+    def for_vehicles(cls, vehicle_ids: List[int], n_intervals: int = 96, record_status: bool = True):
+        vehicle_ids = list(vehicle_ids)
+        return cls(
+            vehicle_ids=vehicle_ids,
+            state_of_charge=np.zeros((n_intervals, len(vehicle_ids)), dtype=np.float32),
+            status_code=np.zeros((n_intervals, len(vehicle_ids)), dtype=np.int8) if record_status else None,
+            meter_power_kw=np.full(n_intervals, np.nan)
+        )
+
+    def stop_recording_status(self):
+        self.status_code = None
+
+    def reserve(self, n_intervals: int):
+        # grow the arrays so at least n_intervals more can be recorded without reallocating
+        capacity = self.n_recorded + n_intervals
+        if capacity <= len(self.meter_power_kw):
+            return
+
+        state_of_charge = np.zeros((capacity, len(self.vehicle_ids)), dtype=np.float32)
+        meter_power_kw = np.full(capacity, np.nan)
+        state_of_charge[:self.n_recorded] = self.state_of_charge[:self.n_recorded]
+        meter_power_kw[:self.n_recorded] = self.meter_power_kw[:self.n_recorded]
+        self.state_of_charge = state_of_charge
+        self.meter_power_kw = meter_power_kw
+        if self.status_code is not None:
+            status_code = np.zeros((capacity, len(self.vehicle_ids)), dtype=np.int8)
+            status_code[:self.n_recorded] = self.status_code[:self.n_recorded]
+            self.status_code = status_code
+
+    def record(self, current_datetime: datetime, state_of_charge: np.ndarray, status_code: Optional[np.ndarray], meter_power_kw=None):
+        """
+        :param status_code: codes into statuses, see get_status_code, None when status isn't recorded
+        :param meter_power_kw: None if no vehicle is charging
+        """
+        if self.n_recorded == len(self.meter_power_kw):
+            self.reserve(max(self.n_recorded, 1))
+
+        row = self.n_recorded
+        self.datetimes.append(current_datetime)
+        self.state_of_charge[row] = state_of_charge
+        if self.status_code is not None:
+            self.status_code[row] = status_code
+        self.meter_power_kw[row] = np.nan if meter_power_kw is None else meter_power_kw
+        self.n_recorded += 1
+
+    def get_soc_frame(self) -> pd.DataFrame:
+        # same layout as pd.DataFrame.from_dict(vehicle_soc_snapshot)
+        df_soc = pd.DataFrame(self.state_of_charge[:self.n_recorded], columns=self.vehicle_ids)
+        df_soc.insert(0, 'datetime', self.datetimes)
+        return df_soc
+
+    def get_status_frame(self) -> pd.DataFrame:
+        # same layout as pd.DataFrame.from_dict(vehicle_status_snapshot)
+        statuses = np.array(self.statuses, dtype=object)
+        df_status = pd.DataFrame(statuses[self.status_code[:self.n_recorded]], columns=self.vehicle_ids)
+        df_status.insert(0, 'datetime', self.datetimes)
+        return df_status
+
+    def get_power_snapshot(self) -> Dict[datetime, float]:
+        charging = np.flatnonzero(~np.isnan(self.meter_power_kw[:self.n_recorded]))
+        return {self.datetimes[row]: float(self.meter_power_kw[row]) for row in charging}
@@ -0,0 +1,121 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.asset_simulator.vehicle.vehicle_status_codes import VehicleStatusCodes
+
+
+# a vehicle held status (and station) from start until end, end exclusive
+StatusSegment = namedtuple('StatusSegment', ('start', 'end', 'status', 'station_id'))
+
+# station_id placeholder for vehicles that aren't plugged in
+NO_STATION = -1
+
+
+class StatusTimeline(VehicleStatusCodes):
+    """
+    run-length encoded vehicle status history, a new segment only starts when a vehicle's status or station changes
+    """
+    interval_seconds: int
+    vehicle_ids: List[int]
+    start_datetime: Optional[datetime] = None
+    n_recorded: int = 0
+    # vehicle id -> closed segments
+    segments: Dict[int, List[StatusSegment]] = {}
+    # status code, station id and start of the segment each vehicle is in
+    open_status_code: Optional[np.ndarray] = None
+    open_station_id: Optional[np.ndarray] = None
+    open_start: List[datetime] = []
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def record(self, current_datetime: datetime, status_code: np.ndarray, station_id: np.ndarray):
+        """
+        :param status_code: codes into statuses for every vehicle in vehicle_ids order
+        :param station_id: connected station of every vehicle, NO_STATION if unplugged
+        """
+        if self.n_recorded == 0:
+            self.start_datetime = current_datetime
+            self.open_status_code = status_code.copy()
+            self.open_station_id = station_id.copy()
+            self.open_start = [current_datetime] * len(self.vehicle_ids)
+            self.n_recorded = 1
+            return
+
+        changed = np.flatnonzero((status_code != self.open_status_code) | (station_id != self.open_station_id))
+        for idx in changed:
+            self.close_segment(idx, current_datetime)
+            self.open_start[idx] = current_datetime
+        self.open_status_code[changed] = status_code[changed]
+        self.open_station_id[changed] = station_id[changed]
+        self.n_recorded += 1
+
+    def close_segment(self, idx, end: datetime):
+        station_id = int(self.open_station_id[idx])
+        self.segments.setdefault(self.vehicle_ids[idx], []).append(StatusSegment(
+            start=self.open_start[idx],
+            end=end,
+            status=self.statuses[self.open_status_code[idx]],
+            station_id=None if station_id == NO_STATION else station_id
+        ))
+
+    def get_end_datetime(self) -> datetime:
+        return self.start_datetime + timedelta(seconds=self.n_recorded * self.interval_seconds)
+
+    def get_segments(self) -> Dict[int, List[StatusSegment]]:
+        """
+        :return: vehicle id -> segments in time order, the running segments end after the last interval recorded
+        """
+        if self.n_recorded == 0:
+            return {}
+
+        end = self.get_end_datetime()
+        segments = {}
+        for idx, vehicle_id in enumerate(self.vehicle_ids):
+            station_id = int(self.open_station_id[idx])
+            open_segment = StatusSegment(
+                start=self.open_start[idx],
+                end=end,
+                status=self.statuses[self.open_status_code[idx]],
+                station_id=None if station_id == NO_STATION else station_id
+            )
+            segments[vehicle_id] = self.segments.get(vehicle_id, []) + [open_segment]
+        return segments
+
+    def get_status_frame(self) -> pd.DataFrame:
+        # expand back to one row per interval, same layout as pd.DataFrame.from_dict(vehicle_status_snapshot)
+        datetimes = [self.start_datetime + timedelta(seconds=row * self.interval_seconds) for row in range(0, self.n_recorded)]
+        df_status = pd.DataFrame({'datetime': datetimes})
+        for vehicle_id, segments in self.get_segments().items():
+            lengths = [int((segment.end - segment.start).total_seconds() // self.interval_seconds) for segment in segments]
+            df_status[vehicle_id] = np.repeat(np.array([segment.status for segment in segments], dtype=object), lengths)
+        return df_status
+
+
+def get_status_segments(df_status: pd.DataFrame, interval_seconds: int) -> Dict[int, List[StatusSegment]]:
+    """
+    run-length encode a status frame with one row per interval, station ids aren't known so they are None
+    """
+    datetimes = list(df_status['datetime'])
+    if len(datetimes) == 0:
+        return {}
+    end = datetimes[-1] + timedelta(seconds=interval_seconds)
+
+    segments = {}
+    for vehicle_id in df_status.columns[1:]:
+        statuses = df_status[vehicle_id].to_numpy()
+        starts = np.flatnonzero(np.concatenate(([True], statuses[1:] != statuses[:-1])))
+        segments[vehicle_id] = [
+            StatusSegment(
+                start=datetimes[start],
+                end=datetimes[starts[idx + 1]] if idx + 1 < len(starts) else end,
+                status=statuses[start],
+                station_id=None
+            )
+            for idx, start in enumerate(starts)
+        ]
+    return segments
@@ -0,0 +1,68 @@
+from src.asset_simulator.change_tracking import next_version
+
+
+class Record:
+    """
+    slotted stand in for a pydantic model inside the simulation, same fields, methods, dict/copy and versioning
+    as the model but nothing is validated and there is no per instance __dict__
+
+    pydantic models are only built where data enters the simulation: configs, the json wire format and the UI,
+    see to_model/from_model. subclasses set model and list its fields in __slots__
+    """
+    __slots__ = ('_version',)
+    model = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.field_names = tuple(cls.model.__fields__)
+        # immutable defaults only, fields with a mutable default handle it themselves
+        cls.defaults = {
+            field_name: field.default
+            for field_name, field in cls.model.__fields__.items()
+            if not field.required and not isinstance(field.default, (dict, list, set))
+        }
+
+    def __init__(self, **values):
+        for field_name in self.field_names:
+            if field_name in values:
+                object.__setattr__(self, field_name, values[field_name])
+            elif field_name in self.defaults:
+                object.__setattr__(self, field_name, self.defaults[field_name])
+            else:
+                object.__setattr__(self, field_name, None)
+        object.__setattr__(self, '_version', next_version())
+
+    def __setattr__(self, name, value):
+        # bumped on every change, see change_tracking
+        changed = name != '_version' and getattr(self, name, None) != value
+        object.__setattr__(self, name, value)
+        if changed:
+            object.__setattr__(self, '_version', next_version())
+
+    def __eq__(self, other):
+        # like BaseModel, equal to anything with the same field values
+        if isinstance(other, dict):
+            return self.dict() == other
+        if hasattr(other, 'dict'):
+            return self.dict() == other.dict()
+        return NotImplemented
+
+    def __repr__(self):
+        return type(self).__name__ + '(' + ', '.join(field_name + '=' + repr(getattr(self, field_name)) for field_name in self.field_names) + ')'
+
+    def dict(self):
+        return {field_name: getattr(self, field_name) for field_name in self.field_names}
+
+    def copy(self):
+        # shallow like BaseModel.copy, the copy keeps the version it was taken at
+        record = type(self).__new__(type(self))
+        for field_name in self.field_names + ('_version',):
+            object.__setattr__(record, field_name, getattr(self, field_name))
+        return record
+
+    def to_model(self):
+        return self.model(**self.dict())
+
+    @classmethod
+    def from_model(cls, model):
+        return cls(**{field_name: getattr(model, field_name) for field_name in cls.field_names})
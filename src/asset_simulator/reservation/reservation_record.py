@@ -0,0 +1,10 @@
+from src.asset_simulator.record import Record
+from src.asset_simulator.reservation.reservation import Reservation
+
+
+class ReservationRecord(Record):
+    """
+    Reservation used inside the simulation, see Record
+    """
+    __slots__ = tuple(Reservation.__fields__)
+    model = Reservation
@@ -1,7 +1,9 @@
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 from typing import Optional
 
+from src.asset_simulator.change_tracking import next_version
+
 
 class Station(BaseModel):
     id: int
@@ -9,6 +11,14 @@ class Station(BaseModel):
     connected_vehicle_id: int = None
     max_power_kw: float
     last_unplugged: datetime
+    # bumped on every change, see change_tracking
+    _version: int = PrivateAttr(default_factory=next_version)
+
+    def __setattr__(self, name, value):
+        changed = name != '_version' and getattr(self, name, None) != value
+        super().__setattr__(name, value)
+        if changed:
+            super().__setattr__('_version', next_version())
 
     def is_l2(self):
         return self.type == 'L2'
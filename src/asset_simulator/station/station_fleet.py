@@ -1,5 +1,6 @@
 from typing import Dict
 
+import numpy as np
 from pydantic import BaseModel
 
 from src.asset_simulator.station.station import Station
@@ -7,4 +8,10 @@ from src.asset_simulator.station.station import Station
 
 
 class StationFleet(BaseModel):
-    stations: Dict[int, Station] = {}
\ No newline at end of file
+    stations: Dict[int, Station] = {}
+
+    def get_max_power_kw_by_station_id(self) -> np.ndarray:
+        max_power_kw = np.zeros(max(self.stations.keys(), default=-1) + 1)
+        for station in self.stations.values():
+            max_power_kw[station.id] = station.max_power_kw
+        return max_power_kw
@@ -0,0 +1,17 @@
+from src.asset_simulator.record import Record
+from src.asset_simulator.station.station import Station
+
+
+class StationRecord(Record):
+    """
+    Station used inside the simulation, see Record
+    """
+    __slots__ = tuple(Station.__fields__)
+    model = Station
+
+    # the behaviour itself is shared with Station
+    is_l2 = Station.is_l2
+    is_dcfc = Station.is_dcfc
+    is_available = Station.is_available
+    _plugin = Station._plugin
+    _unplug = Station._unplug
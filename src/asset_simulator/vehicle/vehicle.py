@@ -1,7 +1,9 @@
 from datetime import datetime, timedelta
 from typing import Optional, Dict
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
+
+from src.asset_simulator.change_tracking import next_version
 
 
 class Vehicle(BaseModel):
@@ -15,6 +17,14 @@ class Vehicle(BaseModel):
     active_reservation_id: Optional[str]
     log: Optional[Dict] = {}
     # ['parked' | 'charging' | 'finished_charging', 'driving]
+    # bumped on every change, see change_tracking
+    _version: int = PrivateAttr(default_factory=next_version)
+
+    def __setattr__(self, name, value):
+        changed = name != '_version' and getattr(self, name, None) != value
+        super().__setattr__(name, value)
+        if changed:
+            super().__setattr__('_version', next_version())
 
 
     def add_log(self, datetime):
@@ -154,9 +164,10 @@ class Vehicle(BaseModel):
             # else:
             #     self.connected_station = None
 
-    def can_meet_reservation_deadline_at_l2(self, depature_datetime, charging_rate_kw, padding_seconds):
+    def can_meet_reservation_deadline_at_l2(self, current_datetime, depature_datetime, charging_rate_kw, padding_seconds):
         final_deadline = depature_datetime - timedelta(seconds=padding_seconds)
-        current_timestamp_utc = datetime.now()
+        # simulation time, not the wall clock, so a run only depends on its inputs
+        current_timestamp_utc = current_datetime
         charging_time_hours = (final_deadline - current_timestamp_utc).seconds / 3600
         current_soc_kwh = self.state_of_charge*self.energy_capacity_kwh
         end_goal_soc_kwh = 0.8*self.energy_capacity_kwh
@@ -1,8 +1,9 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel
 
 from src.asset_simulator.vehicle.vehicle import Vehicle
+from src.asset_simulator.vehicle.vehicle_fleet_state import VehicleFleetState, VehicleView
 from src.asset_simulator.reservation.reservation import Reservation
 
 
@@ -11,11 +12,25 @@ class VehicleFleet(BaseModel):
     vehicles: Dict[int, Vehicle] = {}
     walk_in_pool: Dict[int, Vehicle] = {}
     minimum_ready_vehicle_pool: Dict[str, int] = {}
+    # when set the vehicles are VehicleViews onto these arrays
+    state: Optional[VehicleFleetState] = None
+
+    def use_array_state(self):
+        # move soc/status/station into arrays so the fleet can be charged and driven in one step
+        self.state = VehicleFleetState.from_vehicles(self.vehicles.values())
+        self.vehicles = {vehicle_id: VehicleView(self.state, vehicle) for vehicle_id, vehicle in self.vehicles.items()}
 
     def get_available_vehicles_at_depot(self):
         available_vehicles = {vehicle.id: vehicle for vehicle in self.vehicles.values() if vehicle.status != 'driving'}
         return available_vehicles
 
+    def count_vehicles_needing_charge(self):
+        # below minimum soc and not already charging
+        if self.state is not None:
+            charging = self.state.get_status_code('charging')
+            return int(((self.state.state_of_charge < 0.8) & (self.state.status_code != charging)).sum())
+        return sum(1 for vehicle in self.vehicles.values() if vehicle.is_below_minimum_soc() and vehicle.status != 'charging')
+
     def allocate_to_walk_in_pool(self, vehicle: Vehicle):
         self.walk_in_pool[vehicle.id] = vehicle
 
@@ -30,7 +45,5 @@ class VehicleFleet(BaseModel):
             return sorted(subset_by_vehicle_type, key=lambda x: x.state_of_charge, reverse=True)
 
     def vehicle_in_walk_in_pool(self, vehicle_id):
-        for vehicle in self.walk_in_pool.values():
-            if vehicle.id == vehicle_id:
-                return True
-        return False
\ No newline at end of file
+        # the pool is keyed by vehicle id
+        return vehicle_id in self.walk_in_pool
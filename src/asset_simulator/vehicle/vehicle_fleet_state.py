@@ -0,0 +1,179 @@
+import copy
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.asset_simulator.change_tracking import next_version
+from src.asset_simulator.vehicle.vehicle import Vehicle
+from src.asset_simulator.vehicle.vehicle_status_codes import VehicleStatusCodes
+
+
+# connected_station_id placeholder for unplugged vehicles
+NO_STATION = -1
+
+
+class VehicleFleetState(VehicleStatusCodes):
+    """
+    struct of arrays holding the per vehicle values touched every interval
+
+    the math in charge/drive mirrors Vehicle.charge/Vehicle.drive operation for operation
+    so float results are identical to stepping each Vehicle on its own
+    """
+    vehicle_ids: np.ndarray
+    state_of_charge: np.ndarray
+    energy_capacity_kwh: np.ndarray
+    status_code: np.ndarray
+    connected_station_id: np.ndarray
+    # per vehicle version, see change_tracking
+    version: np.ndarray
+    # vehicle id -> array index
+    index: Dict[int, int] = {}
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def bump_version(self, changed: np.ndarray):
+        self.version[changed] = next_version()
+
+    def update_status(self, mask: np.ndarray):
+        # vectorized Vehicle.update_status, unplugged vehicles keep their status
+        plugged_in = mask & (self.connected_station_id != NO_STATION)
+        status_code = self.status_code.copy()
+        self.status_code[plugged_in & (self.state_of_charge < 1)] = self.get_status_code('charging')
+        self.status_code[plugged_in & (self.state_of_charge == 1)] = self.get_status_code('finished_charging')
+        self.bump_version(self.status_code != status_code)
+
+    def charge(self, seconds, station_max_power_kw: np.ndarray):
+        charging = self.status_code == self.get_status_code('charging')
+        if not charging.any():
+            return
+
+        hours = seconds/3600
+        charged_kwh = station_max_power_kw[self.connected_station_id[charging]] * hours
+        energy_capacity_kwh = self.energy_capacity_kwh[charging]
+        current_energy_kwh = self.state_of_charge[charging] * energy_capacity_kwh
+
+        # charge up to max capacity
+        new_energy_kwh = np.minimum(energy_capacity_kwh, current_energy_kwh + charged_kwh)
+        self.set_state_of_charge(charging, new_energy_kwh / energy_capacity_kwh)
+        self.update_status(charging)
+
+    def drive(self, n_seconds):
+        driving = self.status_code == self.get_status_code('driving')
+        if not driving.any():
+            return
+
+        # assume an average miles driven of 100 miles per 48 hours
+        miles_driven_per_interval = n_seconds * (100/(48*3600)) # miles per sec
+        # 0.346 kwh / mile
+        energy_consumed = miles_driven_per_interval * 0.346
+        energy_capacity_kwh = self.energy_capacity_kwh[driving]
+        current_kwh = self.state_of_charge[driving] * energy_capacity_kwh
+        next_kwh = np.maximum(5, current_kwh - energy_consumed)
+        self.set_state_of_charge(driving, next_kwh / energy_capacity_kwh)
+
+    def set_state_of_charge(self, mask: np.ndarray, state_of_charge: np.ndarray):
+        changed = mask.copy()
+        changed[mask] = self.state_of_charge[mask] != state_of_charge
+        self.state_of_charge[mask] = state_of_charge
+        self.bump_version(changed)
+
+    def get_fully_charged_vehicle_ids(self) -> List[int]:
+        at_station = np.isin(self.status_code, [self.get_status_code('charging'), self.get_status_code('finished_charging')])
+        return self.vehicle_ids[at_station & (self.state_of_charge == 1.0)].tolist()
+
+    @classmethod
+    def from_vehicles(cls, vehicles: List[Vehicle]):
+        vehicles = list(vehicles)
+        state = cls(
+            vehicle_ids=np.array([vehicle.id for vehicle in vehicles], dtype=np.int64),
+            state_of_charge=np.array([vehicle.state_of_charge for vehicle in vehicles], dtype=np.float64),
+            energy_capacity_kwh=np.array([vehicle.energy_capacity_kwh for vehicle in vehicles], dtype=np.float64),
+            status_code=np.zeros(len(vehicles), dtype=np.int8),
+            connected_station_id=np.array(
+                [NO_STATION if vehicle.connected_station_id is None else vehicle.connected_station_id for vehicle in vehicles],
+                dtype=np.int64
+            ),
+            version=np.array([vehicle._version for vehicle in vehicles], dtype=np.int64),
+            index={vehicle.id: idx for idx, vehicle in enumerate(vehicles)}
+        )
+        for idx, vehicle in enumerate(vehicles):
+            state.status_code[idx] = state.get_status_code(vehicle.status)
+        return state
+
+
+class VehicleView:
+    """
+    per vehicle handle onto a VehicleFleetState row with the same attributes and methods as Vehicle
+    """
+    __slots__ = ('_state', '_idx', 'id', 'type', 'updated_at', 'active_reservation_id', 'log')
+
+    def __setattr__(self, name, value):
+        changed = not name.startswith('_') and getattr(self, name, None) != value
+        object.__setattr__(self, name, value)
+        if changed:
+            self._state.version[self._idx] = next_version()
+
+    def __init__(self, state: VehicleFleetState, vehicle: Vehicle):
+        self._state = state
+        self._idx = state.index[vehicle.id]
+        self.id = vehicle.id
+        self.type = vehicle.type
+        self.updated_at = vehicle.updated_at
+        self.active_reservation_id = vehicle.active_reservation_id
+        self.log = vehicle.log
+
+    @property
+    def _version(self) -> int:
+        return int(self._state.version[self._idx])
+
+    @property
+    def state_of_charge(self) -> float:
+        return float(self._state.state_of_charge[self._idx])
+
+    @state_of_charge.setter
+    def state_of_charge(self, state_of_charge: float):
+        self._state.state_of_charge[self._idx] = state_of_charge
+
+    @property
+    def energy_capacity_kwh(self) -> int:
+        return int(self._state.energy_capacity_kwh[self._idx])
+
+    @property
+    def status(self) -> str:
+        return self._state.statuses[self._state.status_code[self._idx]]
+
+    @status.setter
+    def status(self, status: str):
+        self._state.status_code[self._idx] = self._state.get_status_code(status)
+
+    @property
+    def connected_station_id(self) -> Optional[int]:
+        station_id = int(self._state.connected_station_id[self._idx])
+        return None if station_id == NO_STATION else station_id
+
+    @connected_station_id.setter
+    def connected_station_id(self, station_id: Optional[int]):
+        self._state.connected_station_id[self._idx] = NO_STATION if station_id is None else station_id
+
+    def dict(self) -> Dict:
+        values = {field_name: getattr(self, field_name) for field_name in Vehicle.__fields__}
+        # like BaseModel.dict the copy doesn't share the log with this vehicle
+        values['log'] = copy.deepcopy(self.log)
+        return values
+
+    def to_vehicle(self) -> Vehicle:
+        return Vehicle(**self.dict())
+
+    # the behaviour itself is shared with Vehicle
+    add_log = Vehicle.add_log
+    drive = Vehicle.drive
+    charge = Vehicle.charge
+    is_plugged_in = Vehicle.is_plugged_in
+    is_below_minimum_soc = Vehicle.is_below_minimum_soc
+    update_status = Vehicle.update_status
+    _plugin = Vehicle._plugin
+    _unplug = Vehicle._unplug
+    park = Vehicle.park
+    can_meet_reservation_deadline_at_l2 = Vehicle.can_meet_reservation_deadline_at_l2
@@ -0,0 +1,34 @@
+import copy
+
+from src.asset_simulator.record import Record
+from src.asset_simulator.vehicle.vehicle import Vehicle
+
+
+class VehicleRecord(Record):
+    """
+    Vehicle used inside the simulation, see Record. the log is only created once something is logged
+    """
+    __slots__ = tuple(Vehicle.__fields__)
+    model = Vehicle
+
+    def dict(self):
+        values = super().dict()
+        # like BaseModel.dict the copy doesn't share the log with this vehicle
+        values['log'] = {} if self.log is None else copy.deepcopy(self.log)
+        return values
+
+    def add_log(self, datetime):
+        if self.log is None:
+            self.log = {}
+        Vehicle.add_log(self, datetime)
+
+    # the behaviour itself is shared with Vehicle
+    drive = Vehicle.drive
+    charge = Vehicle.charge
+    is_plugged_in = Vehicle.is_plugged_in
+    is_below_minimum_soc = Vehicle.is_below_minimum_soc
+    update_status = Vehicle.update_status
+    _plugin = Vehicle._plugin
+    _unplug = Vehicle._unplug
+    park = Vehicle.park
+    can_meet_reservation_deadline_at_l2 = Vehicle.can_meet_reservation_deadline_at_l2
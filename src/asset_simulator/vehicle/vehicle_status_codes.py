@@ -0,0 +1,18 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class VehicleStatusCodes(BaseModel):
+    """
+    vehicle statuses stored as int8 codes, shared by everything keeping vehicle status in arrays
+    """
+    # status_code -> status, grows if a vehicle is given a status we haven't seen before
+    statuses: List[str] = ['parked', 'charging', 'finished_charging', 'driving']
+
+    def get_status_code(self, status: str) -> int:
+        try:
+            return self.statuses.index(status)
+        except ValueError:
+            self.statuses.append(status)
+            return len(self.statuses) - 1
@@ -1,15 +1,18 @@
 from collections import namedtuple
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import json
 import random
 import uuid
 
 import numpy as np
 from pydantic import BaseModel
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from src.demand_simulator.demand_simulator_config.demand_simulator_config import DemandSimulatorConfig
 from src.asset_simulator.reservation.reservation import Reservation
+from src.asset_simulator.reservation.reservation_record import ReservationRecord
+from src.demand_simulator.reservation_stream.reservation_stream import ReservationStream
+from src.instrumentation.phase_profiler import profile_phase
 from src.mock_queue.mock_queue import MockQueue
 from src.mock_queue.msg_broker import MsgBroker
 from src.asset_simulator.vehicle.vehicle import Vehicle
@@ -21,13 +24,59 @@ class DemandSimulator(MsgBroker):
     vehicles: Dict[int, Vehicle] = {}
     # vehicles_out_driving: Dict[int, Tuple] = {}
     reservations: Dict[int, Reservation] = {}
+    # event type -> (day, events per interval of that day)
+    daily_event_counts: Dict[str, Tuple[date, List[int]]] = {}
+    # precomputed reservations of a scenario bundle, replaces sampling reservations when set
+    reservation_stream: Optional[ReservationStream] = None
 
 
     def increment_interval(self):
         interval_seconds = self.config.interval_seconds
         self.current_datetime = self.current_datetime + timedelta(seconds=interval_seconds)
 
+    def skip_intervals(self, n_intervals):
+        # stand in for run_interval/increment_interval before get_next_event_datetime, the fleet is read on the next run
+        self.current_datetime = self.current_datetime + timedelta(seconds=n_intervals*self.config.interval_seconds)
+
+    def get_next_event_datetime(self) -> Optional[datetime]:
+        """
+        first interval from now on whose run_interval samples events or publishes reservations,
+        the intervals before it only read the fleet which can wait until then
+
+        :return: None when the reservation stream has nothing left
+        """
+        if self.reservation_stream is not None:
+            created_at = self.reservation_stream.get_next_created_at(self.current_datetime)
+            if created_at is None:
+                return None
+            interval = timedelta(seconds=self.config.interval_seconds)
+            return self.current_datetime + (created_at - self.current_datetime)//interval*interval
+
+        # a day of walk ins is sampled on the first interval run that day, reservations are made at midnight
+        if 'walk_in' not in self.daily_event_counts or self.daily_event_counts['walk_in'][0] != self.current_datetime.date():
+            return self.current_datetime
+        if self.is_reservation_generation_time(self.current_datetime):
+            return self.current_datetime
+        return self.current_datetime.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
     def get_event(self, type, current_datetime) -> int:
+        # a day of events is sampled on the first call for that day, later calls look up their interval
+        day = current_datetime.date()
+        if type not in self.daily_event_counts or self.daily_event_counts[type][0] != day:
+            self.daily_event_counts[type] = (day, self.get_daily_event_counts(type).tolist())
+
+        return self.daily_event_counts[type][1][self.get_interval_of_day(current_datetime)]
+
+    def get_interval_of_day(self, current_datetime) -> int:
+        seconds_of_day = current_datetime.hour*3600 + current_datetime.minute*60 + current_datetime.second
+        return int(seconds_of_day / self.config.interval_seconds)
+
+    def get_daily_event_counts(self, type) -> np.ndarray:
+        """
+        sample one day of events and count them per interval of the day
+
+        :return: array with the number of events starting in each interval, index 0 starts at midnight
+        """
         if type == 'walk_in':
             loc_name = 'mean_walk_ins_per_day'
             scale_name = 'stdev_walk_ins_per_day'
@@ -45,14 +94,12 @@ class DemandSimulator(MsgBroker):
         # n events per day
         n_events_per_day = int(np.random.normal(
             loc=getattr(self.config, loc_name),
-            scale=getattr(self.config, scale_name),
-            size=1
+            scale=getattr(self.config, scale_name)
         ))
 
         # can't have negative events per day
         n_events_per_day = max(0, n_events_per_day)
 
-
         # bootstrap n times based on hour of day
         random_hour = np.random.normal(
             loc=getattr(self.config, loc_hour_name),
@@ -63,31 +110,32 @@ class DemandSimulator(MsgBroker):
         # in case random hour selected is negative
         random_hour[random_hour < 0] = 0
 
-        # assumes timesteps for simulations between 1 minute and 1 hour
-        hour = current_datetime.hour
-        min = current_datetime.minute
-        fractional_hour = hour + (min/60)
-        next_fractional_hour = fractional_hour + (self.config.interval_seconds/3600)
-
-        # count number of events between fractional_hour and next_fractional_hour to return number of random events at time of call
-        events_in_current_interval = [x for x in random_hour if (x > fractional_hour and x < next_fractional_hour)]
+        # an event counts towards an interval if it falls strictly after the interval start and before the next one
+        interval_hours = self.config.interval_seconds/3600
+        n_intervals = int(24/interval_hours)
+        interval_start_hours = np.arange(0, n_intervals + 1) * interval_hours
+        interval_idx = np.searchsorted(interval_start_hours, random_hour, side='right') - 1
+        in_interval = (interval_idx < n_intervals) & (random_hour > interval_start_hours[np.minimum(interval_idx, n_intervals)])
 
-        return len(events_in_current_interval)
+        return np.bincount(interval_idx[in_interval], minlength=n_intervals)
 
     def generate_arrival_time(self, departure):
+        return self.generate_arrival_times([departure])[0]
+
+    def generate_arrival_times(self, departures):
         hours_out_driving = np.random.normal(
             loc=self.config.mean_reservation_duration_hours,
-            scale=self.config.stdev_reservation_hours
+            scale=self.config.stdev_reservation_hours,
+            size=len(departures)
         )
 
         # need to apply a floor to hours driving as normal dist will give negatives
-        hours_out_driving = max(2, hours_out_driving)
+        hours_out_driving = np.maximum(2, hours_out_driving)
 
         hour_decimal = 1/(self.config.interval_seconds/3600)
-        rounded_hour = round(hours_out_driving*hour_decimal)/hour_decimal
+        rounded_hours = np.round(hours_out_driving*hour_decimal)/hour_decimal
 
-        arrival_datetime = departure + timedelta(hours=rounded_hour)
-        return arrival_datetime
+        return [departure + timedelta(hours=float(rounded_hour)) for departure, rounded_hour in zip(departures, rounded_hours)]
 
     # def make_reservations(self, n_reservations, res_datetime, walk_in=False):
     #     if n_reservations > 0:
@@ -112,8 +160,12 @@ class DemandSimulator(MsgBroker):
     #         pass
 
     def make_reservations(self, n_res, departure, walk_in=False):
-        for reservation_idx in range(0, n_res):
-            arrival = self.generate_arrival_time(departure)
+        self.make_reservations_for_departures([departure] * n_res, walk_in)
+
+    def make_reservations_for_departures(self, departures, walk_in=False):
+        # all the trip lengths are drawn in one go
+        arrivals = self.generate_arrival_times(departures)
+        for departure, arrival in zip(departures, arrivals):
             if self.is_vehicle_available(departure, arrival):
                 available_vehicles = self.get_available_vehicles(departure, arrival)
                 # vehicle_id = random.randint(0, len(available_vehicles) - 1)
@@ -176,34 +228,39 @@ class DemandSimulator(MsgBroker):
                 "walk_in": walk_in,
                 "status": 'created'
             }
-        self.reservations[id] = Reservation(**res_dict)
+        self.reservations[id] = ReservationRecord(**res_dict)
                 
     
 
     def generate_reservations_24_hours_ahead(self, current_datetime):
         # if init the sim then generate the reservations 24 hours ahead
-            # first 24 hours of reservations pre-populated
-            future_datetime = current_datetime
-            for interval in range(0, int((24*3600)/self.config.interval_seconds)):
-                # increment by timestep
-                future_datetime = future_datetime + timedelta(seconds=self.config.interval_seconds)
+            # first 24 hours of reservations pre-populated, the day of departures is sampled once
+            event_counts = self.get_daily_event_counts('reservation')
+            n_intervals = int((24*3600)/self.config.interval_seconds)
+
+            # one departure per event at the end of each interval over the next 24 hours
+            interval_offsets = np.arange(1, n_intervals + 1)
+            interval_of_day = (self.get_interval_of_day(current_datetime) + interval_offsets) % len(event_counts)
+            departure_offsets = np.repeat(interval_offsets, event_counts[interval_of_day])
 
-                n_res = self.get_event('reservation', future_datetime)
-                self.make_reservations(n_res, future_datetime)
+            departures = [current_datetime + timedelta(seconds=int(offset)*self.config.interval_seconds) for offset in departure_offsets]
+            self.make_reservations_for_departures(departures)
+
+    @classmethod
+    def is_reservation_generation_time(cls, current_datetime):
+        return current_datetime.hour == 0 and current_datetime.minute == 0 and current_datetime.second == 0
 
     def generate_reservations_at_midnight(self):
         # at midnight generate new batch of reservations
-        if self.current_datetime.hour == 0 and self.current_datetime.minute == 0 and self.current_datetime.second == 0:
+        if self.is_reservation_generation_time(self.current_datetime):
 
         # on the top of the hour every hour
         # if self.current_datetime.minute == 0 and self.current_datetime.second == 0:
             # self.reservations = self.generate_reservations_24_hours_ahead(self.current_datetime)
             self.generate_reservations_24_hours_ahead(self.current_datetime)
 
-    def run_interval(self):
-
-        self.subscribe_to_queue('vehicles', 'vehicle', 'vehicles_demand_sim')
-
+    def sample_interval_events(self):
+        # the day's walk ins are sampled once on its first interval and looked up after that, reservations are made at midnight
         # self.process_driving_vehicle_for_future_arrival()
 
         # n_res = self.get_event('reservation', self.current_datetime)
@@ -219,6 +276,17 @@ class DemandSimulator(MsgBroker):
             # self.make_reservations(n_walk_ins, self.current_datetime + timedelta(minutes=15), walk_in=True)
             pass
 
+    @profile_phase('demand.run_interval')
+    def run_interval(self):
+
+        self.subscribe_to_queue('vehicles', 'vehicle', 'vehicles_demand_sim')
+
+        if self.reservation_stream is not None:
+            interval_end = self.current_datetime + timedelta(seconds=self.config.interval_seconds)
+            self.reservations = self.reservation_stream.get_reservations(self.current_datetime, interval_end)
+        else:
+            self.sample_interval_events()
+
         # publish any random reservations or walkins created
         self.publish_to_queue('reservations', 'reservations')
         # purge local memory of those newly generated reservations
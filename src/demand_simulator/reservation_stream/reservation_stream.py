@@ -0,0 +1,78 @@
+from datetime import datetime
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from src.asset_simulator.reservation.reservation_record import ReservationRecord
+
+
+# one .npy file per column, rows sorted by created_at
+RESERVATION_COLUMNS = ['created_at', 'departure', 'arrival', 'vehicle_type_code']
+
+
+class ReservationStream(BaseModel):
+    """
+    precomputed reservations read from memory mapped columns, only the rows created in the interval asked for
+    become ReservationRecords so the whole stream is never held in memory
+    """
+    created_at: np.ndarray
+    departure: np.ndarray
+    arrival: np.ndarray
+    vehicle_type_code: np.ndarray
+    # vehicle_type_code -> vehicle type
+    vehicle_types: List[str]
+    state_of_charge: float = 0.8
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @classmethod
+    def from_path(cls, reservations_path, vehicle_types: List[str], mmap_mode='r'):
+        """
+        :param reservations_path: directory holding a .npy file per RESERVATION_COLUMNS
+        :param mmap_mode: passed to np.load, None reads the columns into memory
+        """
+        columns = {
+            column_name: np.load(os.path.join(reservations_path, column_name + '.npy'), mmap_mode=mmap_mode)
+            for column_name in RESERVATION_COLUMNS
+        }
+        return cls(vehicle_types=vehicle_types, **columns)
+
+    def __len__(self):
+        return len(self.created_at)
+
+    def get_next_created_at(self, start: datetime) -> Optional[datetime]:
+        # creation time of the first row created on or after start, None once the stream is used up
+        row = np.searchsorted(self.created_at, np.datetime64(start, 's'), side='left')
+        if row == len(self.created_at):
+            return None
+        return self.created_at[row].item()
+
+    def get_reservations(self, start: datetime, end: datetime) -> Dict[str, ReservationRecord]:
+        """
+        :return: reservation id -> ReservationRecord for rows created in [start, end), ids are the row numbers
+        """
+        first_row, end_row = np.searchsorted(self.created_at, np.array([start, end], dtype='datetime64[s]'), side='left')
+
+        reservations = {}
+        for row, created_at, departure, arrival, vehicle_type_code in zip(
+            range(first_row, end_row),
+            self.created_at[first_row:end_row].tolist(),
+            self.departure[first_row:end_row].tolist(),
+            self.arrival[first_row:end_row].tolist(),
+            self.vehicle_type_code[first_row:end_row].tolist()
+        ):
+            reservation_id = 'res_' + str(row)
+            reservations[reservation_id] = ReservationRecord(
+                id=reservation_id,
+                departure_timestamp_utc=departure,
+                arrival_timestamp_utc=arrival,
+                created_at_timestamp_utc=created_at,
+                vehicle_type=self.vehicle_types[vehicle_type_code],
+                state_of_charge=self.state_of_charge,
+                walk_in=False,
+                status='created'
+            )
+        return reservations
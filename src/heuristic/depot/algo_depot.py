@@ -1,31 +1,92 @@
 from collections import namedtuple
-from datetime import timedelta
 import copy
+from datetime import datetime, timedelta
+import heapq
 from operator import attrgetter
 import random
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Set, Tuple
+
+import numpy as np
+from pydantic import Field
+from scipy.optimize import linear_sum_assignment
 
 from src.asset_simulator.depot.asset_depot import AssetDepot
 from src.asset_simulator.reservation.reservation import Reservation
 from src.asset_simulator.vehicle.vehicle import Vehicle
 from src.demand_simulator.demand_simulator.demand_simulator import DemandSimulator
+from src.heuristic.schedule.reservation_calendar import ReservationCalendar
+from src.heuristic.station.station_availability import StationAvailability
+from src.heuristic.vehicle.vehicle_soc_index import VehicleSocIndex
+from src.instrumentation.op_counters import count_op
+from src.instrumentation.phase_profiler import profile_phase
+
+# cost of a vehicle/reservation pair that overlaps an existing assignment, never kept in the matching
+FORBIDDEN_ASSIGNMENT_COST = 1e9
+# kwh short of 80% soc at departure outweighs any preference between feasible vehicles
+LATE_DEPARTURE_KWH_COST = 1e3
+
 
 class AlgoDepot(AssetDepot):
     walk_in_pool: Optional[Dict[int, Vehicle]] = {}
     reservation_assignments: Dict[str, Reservation] = {}
     past_reservation_assignments: Dict[str, Reservation] = {}
+    # index over past_reservation_assignments so overlap lookups don't scan every past assignment
+    reservation_calendar: ReservationCalendar = ReservationCalendar()
     qr_scans: Optional[Dict[int, Vehicle]] = {}
     move_charge: Optional[Dict[int, Vehicle]] = {}
+    # free-lists per station type so availability queries don't scan every station
+    station_availability: StationAvailability = StationAvailability()
+
+    # change tracking for incremental intervals
+    dirty_vehicle_ids: Set[int] = set()
+    dirty_station_ids: Set[int] = set()
+    # reservations never assigned a vehicle in queue order, the only ones the assignment pass acts on
+    pending_reservations: Dict[str, Reservation] = {}
+    # min heap of (departure, reservation id) to drop reservations once they depart
+    reservation_expiry: List[Tuple[datetime, str]] = []
+    # vehicles below minimum soc that aren't charging
+    charge_candidate_ids: Set[int] = set()
+    # vehicles per type highest soc first, updated from dirty_vehicle_ids in incremental intervals
+    vehicle_soc_index: VehicleSocIndex = VehicleSocIndex()
+    # random_sort shuffles draw from their own stream, taken from the global one when the depot is built so seeded runs repeat
+    assignment_seed: int = Field(default_factory=lambda: random.getrandbits(32))
 
     # Msg Broker Functions
+    @profile_phase('heuristic.poll_queues')
     def poll_queues(self):
-        self.subscribe_to_queue('vehicles', 'vehicle', 'vehicles_heuristic')
-        self.subscribe_to_queue('stations','station', 'stations')
+        # vehicles/stations arrive as deltas, anything we plugged in locally last interval gets a fresh copy so those plugins are dropped
+        vehicle_ids = self.subscribe_to_changes('vehicles', 'vehicle', 'vehicles_heuristic')
+        station_ids = self.subscribe_to_changes('stations','station', 'stations')
         # We need to consider all the active reservations and keep them in the queue for the algorithm
         # to re-assign assigned reservations as we get new information on vehicles and reservations
-        self.subscribe_to_queue('reservations','reservation', 'reservations')
-
-    def run_interval(self, random_sort=False):
+        reservation_ids = self.subscribe_to_queue('reservations','reservation', 'reservations')
+
+        self.dirty_vehicle_ids.update(vehicle_ids)
+        self.dirty_station_ids.update(station_ids)
+        for reservation_id in reservation_ids:
+            self.track_reservation(self.reservations[reservation_id])
+
+        # pick up any stations the asset simulator unplugged since last interval
+        self.station_availability.sync([self.stations[station_id] for station_id in self.dirty_station_ids], self.current_datetime)
+        self.dirty_station_ids = set()
+
+    def track_reservation(self, reservation):
+        heapq.heappush(self.reservation_expiry, (reservation.departure_timestamp_utc, reservation.id))
+        if self.reservation_is_new(reservation):
+            self.pending_reservations[reservation.id] = reservation
+
+    def expire_reservations(self):
+        # same cut off as filter_out_expired_reservations without rebuilding the dict
+        while len(self.reservation_expiry) > 0 and self.reservation_expiry[0][0] <= self.current_datetime:
+            _, reservation_id = heapq.heappop(self.reservation_expiry)
+            self.reservations.pop(reservation_id, None)
+            self.pending_reservations.pop(reservation_id, None)
+
+    def run_interval(self, random_sort=False, assignment_engine='greedy', incremental=False):
+        """
+        :param incremental: only revisit reservations and vehicles that changed since the last interval,
+        gives the same instructions as a full pass
+        """
 
         # collect any instructions from the queue
         self.poll_queues()
@@ -36,12 +97,16 @@ class AlgoDepot(AssetDepot):
 
         # scan QR events - adds newly available vehicles
         self.get_qr_scan_events()
+        if incremental:
+            self.update_vehicle_soc_index()
 
         # calculate our walk in pool
-        self.allocate_vehicles_to_walk_in_pool()
+        self.allocate_vehicles_to_walk_in_pool(incremental=incremental)
 
         # filter out vehicles driving and expired reservations
-        self.reservations = self.filter_out_expired_reservations(self.reservations)
+        self.expire_reservations()
+        if not incremental:
+            self.reservations = self.filter_out_expired_reservations(self.reservations)
 
         # if vehicles are 80% or more filled up then move to parking lot
         # todo: hold off on move commands for this V1
@@ -62,12 +127,20 @@ class AlgoDepot(AssetDepot):
 
 
         # calculate heuristics
-        self.assign_vehicles_reservations_by_type_and_highest_soc(random_sort=random_sort)
+        if assignment_engine == 'min_cost' and not random_sort:
+            self.assign_vehicles_reservations_by_min_cost_matching(incremental=incremental)
+        else:
+            # shuffling needs the full reservation list to draw the same random order
+            self.assign_vehicles_reservations_by_type_and_highest_soc(random_sort=random_sort, incremental=incremental and not random_sort)
 
         # assign charging station/vehicle pairs
         self.assign_charging_stations_to_reservations()
         self.assign_charging_station_to_walk_in_pool()
-        self.assign_charging_stations_to_remaining_vehicles()
+        if incremental:
+            self.assign_charging_stations_to_charge_candidates()
+        else:
+            self.assign_charging_stations_to_remaining_vehicles()
+        self.dirty_vehicle_ids = set()
 
         # push status of all vehicles/stations to the queue at end of interval to update the heuristic
 
@@ -83,6 +156,83 @@ class AlgoDepot(AssetDepot):
 
         # after each submission we wipe move_charge local
         self.move_charge = {}
+        self.station_availability.release_reserved(self.stations, self.current_datetime)
+
+    def is_quiet_interval(self):
+        """
+        True when run_interval would send no instructions and leave nothing but the clock changed
+
+        the asset simulator publishes whenever a vehicle status or station changes or a vehicle drops below minimum soc,
+        so with nothing waiting in the queue the objects last received still say whether anything could be plugged in
+        """
+        # new reservations, arrivals, asset changes or reservations still waiting on a vehicle
+        for route in ['reservations', 'scan_events', 'vehicles_heuristic', 'stations']:
+            if len(getattr(self.queue, route)) > 0:
+                return False
+        if len(self.pending_reservations) > 0:
+            return False
+
+        if not self.walk_in_pool_is_settled():
+            return False
+
+        # either there is nowhere to plug a vehicle in or nothing needs a charge
+        if not (self.l2_is_available() or self.dcfc_is_available()):
+            return True
+        walk_in_needs_charge = any(vehicle.is_below_minimum_soc() and vehicle.status != 'charging' \
+                                   for vehicle in self.fleet_manager.vehicle_fleet.walk_in_pool.values())
+        return not walk_in_needs_charge and not any(vehicle.is_below_minimum_soc() and vehicle.status != 'charging' for vehicle in self.vehicles.values())
+
+    def run_quiet_interval(self):
+        # stand in for run_interval when is_quiet_interval, the queues are left for the next full poll
+        self.expire_reservations()
+
+    def skip_quiet_intervals(self, n_intervals):
+        """
+        stand in for n_intervals of run_quiet_interval and increment_interval, the heuristic's own snapshots
+        aren't read so the skipped intervals aren't recorded
+        """
+        if n_intervals == 0:
+            return
+        # reservations only expire as the clock moves forward, expiring in the last interval covers the ones before
+        self.current_datetime = self.current_datetime + timedelta(seconds=(n_intervals - 1)*self.interval_seconds)
+        self.run_quiet_interval()
+        self.current_datetime = self.current_datetime + timedelta(seconds=self.interval_seconds)
+
+    def get_next_event_datetime(self) -> Optional[datetime]:
+        """
+        first interval a quiet heuristic can get a station back without anything published to it,
+        only meaningful right after is_quiet_interval sorted the stations still cooling down
+
+        :return: None when no station is cooling down
+        """
+        cooling = self.station_availability.cooling
+        if len(cooling) == 0:
+            return None
+        interval = timedelta(seconds=self.interval_seconds)
+        # available from the first interval past its cooldown
+        return self.current_datetime + max(0, (cooling[0][0] - self.current_datetime)//interval + 1)*interval
+
+    def get_assignment_random(self):
+        # seeded per interval so the shuffles don't depend on which intervals were run before
+        return random.Random(str(self.assignment_seed) + '-' + self.current_datetime.isoformat())
+
+    def walk_in_pool_is_settled(self):
+        # get_walk_in_deficit writes back into minimum_ready_vehicle_pool so mirror it without the write
+        walk_in_pool = self.fleet_manager.vehicle_fleet.walk_in_pool
+        minimum_ready_vehicle_pool = self.fleet_manager.vehicle_fleet.minimum_ready_vehicle_pool
+        vehicle_types = self.get_vehicle_types(incremental=True)
+
+        for vehicle_type, n_req in minimum_ready_vehicle_pool.items():
+            n_walk_in = len([vehicle for vehicle in walk_in_pool.values() if vehicle.type == vehicle_type])
+            deficit = max(0, n_req - n_walk_in)
+            # the minimum would shrink or a vehicle could be pulled into the pool
+            if deficit != n_req or (deficit > 0 and vehicle_type in vehicle_types):
+                return False
+        return True
+
+    def any_station_available(self, stations):
+        cooldown = self.station_availability.cooldown
+        return any(station.is_available() and self.current_datetime > station.last_unplugged + cooldown for station in stations)
 
     # vehicle to job assignment
     def sort_departures_earliest_first(self, vehicle_type):
@@ -94,6 +244,25 @@ class AlgoDepot(AssetDepot):
             subset_by_vehicle_type = [res for res in self.reservations.values() if res.vehicle_type == vehicle_type]
             return sorted(subset_by_vehicle_type, key=lambda x: x.departure_timestamp_utc)
 
+    def sort_pending_departures_earliest_first(self, vehicle_type):
+        # pending_reservations keeps queue order so ties sort the same as sort_departures_earliest_first
+        subset_by_vehicle_type = [res for res in self.pending_reservations.values() if res.vehicle_type == vehicle_type]
+        return sorted(subset_by_vehicle_type, key=lambda x: x.departure_timestamp_utc)
+
+    def get_vehicle_types(self, incremental=False):
+        if not incremental:
+            return list(set([vehicle.type for vehicle in self.vehicles.values()]))
+        return self.vehicle_soc_index.get_types()
+
+    def rebuild_vehicle_soc_index(self):
+        # kept up to date by update_vehicle_soc_index, call this after swapping out the fleet manager
+        self.vehicle_soc_index = VehicleSocIndex.from_vehicles(self.vehicles.values())
+
+    def update_vehicle_soc_index(self):
+        # soc only changes on vehicles received from the queue or scanned in, both are marked dirty
+        for vehicle_id in self.dirty_vehicle_ids:
+            self.vehicle_soc_index.update(self.vehicles[vehicle_id])
+
     def filter_out_expired_reservations(self, reservations):
         current_reservations = {reservation.id: reservation for reservation in reservations.values() \
                                 if reservation.departure_timestamp_utc > self.current_datetime}
@@ -101,55 +270,66 @@ class AlgoDepot(AssetDepot):
 
     # depot related functions
 
+    def rebuild_reservation_calendar(self):
+        # the calendar is kept up to date in assign_vehicle_to_reservation, call this after setting
+        # past_reservation_assignments directly
+        self.reservation_calendar = ReservationCalendar.from_reservations(self.past_reservation_assignments.values())
+
     def get_vehicles_with_overlapping_reservations(self, new_reservation):
-        exclude_overlapping_vehicles = []
-        for past_res in self.past_reservation_assignments.values():
-            overlap = DemandSimulator.reservation_does_overlap(
-                new_reservation,
-                past_res.departure_timestamp_utc,
-                past_res.arrival_timestamp_utc
-            )
-            if overlap:
-                exclude_overlapping_vehicles.append(past_res.assigned_vehicle_id)
-        return exclude_overlapping_vehicles
+        return self.reservation_calendar.get_busy_vehicle_ids(
+            new_reservation.departure_timestamp_utc,
+            new_reservation.arrival_timestamp_utc
+        )
 
     def get_vehicle_for_reservation(self, vehicle_ids, exclude_vehicle_ids, assigned_vehicle_ids):
-        _vehicle_ids = set(vehicle_ids)
         _exclude = set(exclude_vehicle_ids)
-        _assigned_vehicle_ids = set(assigned_vehicle_ids)
-        _available_ids = (_vehicle_ids.difference(_exclude))
-        total_available_ids = list(_available_ids.difference(_assigned_vehicle_ids))
+        _assigned_vehicle_ids = assigned_vehicle_ids if isinstance(assigned_vehicle_ids, set) else set(assigned_vehicle_ids)
 
-        # because vehicle_ids preserves the order in descending soc we need to cycle in that order
-        # and check if available veh id is in total available ids
+        # because vehicle_ids preserves the order in descending soc we need to cycle in that order,
+        # stopping at the first one that is neither excluded nor assigned instead of building the whole available set
         for veh_id in vehicle_ids:
             if veh_id != None:
-                if veh_id in total_available_ids:
+                if veh_id not in _exclude and veh_id not in _assigned_vehicle_ids:
                     return veh_id
         return None
 
 
-    def assign_vehicles_reservations_by_type_and_highest_soc(self, random_sort=False):
+    @profile_phase('heuristic.assign_vehicles_reservations_by_type_and_highest_soc')
+    def assign_vehicles_reservations_by_type_and_highest_soc(self, random_sort=False, incremental=False):
+        # shuffles need the full lists to draw the same random order
+        incremental = incremental and not random_sort
+
         # create a list of all possible vehicle types
-        vehicle_types = list(set([vehicle.type for vehicle in self.vehicles.values()]))
+        vehicle_types = self.get_vehicle_types(incremental)
+
+        # only unexpired reservations get assigned so anything that has already arrived can't overlap
+        self.reservation_calendar.prune(self.current_datetime)
+        assignment_random = self.get_assignment_random()
 
         for vehicle_type in vehicle_types:
 
-            vehicles_soc_sorted = self.fleet_manager.vehicle_fleet.sort_vehicles_highest_soc_first_by_type(self.vehicles.values(), vehicle_type)
-            vehicles_soc_sorted_ids = [veh.id for veh in vehicles_soc_sorted]
-            reservations_departure_sorted = self.sort_departures_earliest_first(vehicle_type)
+            if incremental:
+                # previously assigned reservations are never re-assigned so only pending ones matter
+                reservations_departure_sorted = self.sort_pending_departures_earliest_first(vehicle_type)
+                if len(reservations_departure_sorted) == 0:
+                    continue
+                vehicles_soc_sorted_ids = self.vehicle_soc_index.get_vehicle_ids(vehicle_type)
+            else:
+                vehicles_soc_sorted = self.fleet_manager.vehicle_fleet.sort_vehicles_highest_soc_first_by_type(self.vehicles.values(), vehicle_type)
+                vehicles_soc_sorted_ids = [veh.id for veh in vehicles_soc_sorted]
+                reservations_departure_sorted = self.sort_departures_earliest_first(vehicle_type)
 
-            if random_sort:
-                # shuffle in place to mimic random assignment of vehicle to reservation
-                random.shuffle(vehicles_soc_sorted)
-                random.shuffle(reservations_departure_sorted)
+                if random_sort:
+                    # shuffle in place to mimic random assignment of vehicle to reservation
+                    assignment_random.shuffle(vehicles_soc_sorted)
+                    assignment_random.shuffle(reservations_departure_sorted)
 
             # no vehicle / reservations to assign
-            if len(vehicles_soc_sorted) == 0 or len(reservations_departure_sorted) == 0:
+            if len(vehicles_soc_sorted_ids) == 0 or len(reservations_departure_sorted) == 0:
                 pass
             else:
                 # we need to keep track of vehicles assigned
-                assigned_vehicles = []
+                assigned_vehicles = set()
                 for idx, reservation in enumerate(reservations_departure_sorted):
 
                     # for this given reservation we need a list of vehicles to exclude due to overlapping res
@@ -163,23 +343,10 @@ class AlgoDepot(AssetDepot):
 
                         if target_vehicle_id != None:
 
-                            # move the reservation to the assigned pile
-                            self.reservation_assignments[reservation.id] = self.reservations[reservation.id]
-
-                            # need to keep a record of past reservation assignments so we don't send redundant requests
-                            self.past_reservation_assignments[reservation.id] = self.reservations[reservation.id]
-
-
-                            # add the assignment timestamp
-                            self.reservation_assignments[reservation.id].assigned_at_timestamp_utc = self.current_datetime
-                            # add the vehicle id to be assigned
-                            self.reservation_assignments[reservation.id].assigned_vehicle_id = target_vehicle_id
-
-                            # need to keep a record of past reservation assignments so we don't send redundant requests
-                            self.past_reservation_assignments[reservation.id] = self.reservation_assignments[reservation.id]
+                            self.assign_vehicle_to_reservation(reservation, target_vehicle_id)
 
                             # we successfully found a vehicle
-                            assigned_vehicles.append(target_vehicle_id)
+                            assigned_vehicles.add(target_vehicle_id)
 
                         else:
                             # no vehicle assigned to reservation thus no assignment being sent off
@@ -202,6 +369,92 @@ class AlgoDepot(AssetDepot):
                 if len(vehs_listed) != len(uniq_vehs_listed):
                     print('double assigned')
 
+    def assign_vehicle_to_reservation(self, reservation, vehicle_id):
+        # move the reservation to the assigned pile
+        self.reservation_assignments[reservation.id] = self.reservations[reservation.id]
+
+        # need to keep a record of past reservation assignments so we don't send redundant requests
+        self.past_reservation_assignments[reservation.id] = self.reservations[reservation.id]
+
+
+        # add the assignment timestamp
+        self.reservation_assignments[reservation.id].assigned_at_timestamp_utc = self.current_datetime
+        # add the vehicle id to be assigned
+        self.reservation_assignments[reservation.id].assigned_vehicle_id = vehicle_id
+
+        # need to keep a record of past reservation assignments so we don't send redundant requests
+        self.past_reservation_assignments[reservation.id] = self.reservation_assignments[reservation.id]
+        self.reservation_calendar.add(self.reservation_assignments[reservation.id])
+        self.pending_reservations.pop(reservation.id, None)
+
+    def get_vehicle_available_from(self, vehicle):
+        # vehicles out driving can only start charging for their next reservation once they are back
+        if vehicle.status == 'driving' and vehicle.active_reservation_id in self.past_reservation_assignments:
+            return max(self.current_datetime, self.past_reservation_assignments[vehicle.active_reservation_id].arrival_timestamp_utc)
+        return self.current_datetime
+
+    def get_reservation_vehicle_cost_matrix(self, reservations, vehicles):
+        """
+        cost of assigning each reservation (rows) to each vehicle (columns)
+
+        primarily the kwh a vehicle would still be short of 80% soc at departure charging at L2,
+        then a preference for the fullest vehicles on the soonest departures like the greedy pass
+        """
+        padding_seconds = 60 * 15
+        departure_seconds = np.array([reservation.departure_timestamp_utc.timestamp() for reservation in reservations])
+        available_seconds = np.array([self.get_vehicle_available_from(vehicle).timestamp() for vehicle in vehicles])
+        state_of_charge = np.array([vehicle.state_of_charge for vehicle in vehicles])
+        energy_capacity_kwh = np.array([vehicle.energy_capacity_kwh for vehicle in vehicles])
+
+        charging_hours = np.clip(departure_seconds[:, None] - available_seconds[None, :] - padding_seconds, 0, None) / 3600
+        energy_deficit_kwh = np.clip(0.8 - state_of_charge, 0, None) * energy_capacity_kwh
+        shortfall_kwh = np.clip(energy_deficit_kwh[None, :] - charging_hours * self.l2_charging_rate_kw, 0, None)
+
+        hours_until_departure = np.clip(departure_seconds - self.current_datetime.timestamp(), 0, None) / 3600
+        urgency = 1 / (1 + hours_until_departure)
+
+        cost = LATE_DEPARTURE_KWH_COST * shortfall_kwh + urgency[:, None] * energy_deficit_kwh[None, :]
+
+        # vehicles already committed to an overlapping reservation can't take this one
+        vehicle_idx = {vehicle.id: idx for idx, vehicle in enumerate(vehicles)}
+        for reservation_idx, reservation in enumerate(reservations):
+            busy_idx = [vehicle_idx[veh_id] for veh_id in self.get_vehicles_with_overlapping_reservations(reservation) if veh_id in vehicle_idx]
+            cost[reservation_idx, busy_idx] = FORBIDDEN_ASSIGNMENT_COST
+
+        return cost
+
+    @profile_phase('heuristic.assign_vehicles_reservations_by_min_cost_matching')
+    def assign_vehicles_reservations_by_min_cost_matching(self, incremental=False):
+        # same candidates as the greedy pass but every reservation of a type is matched at once
+        vehicle_types = self.get_vehicle_types(incremental)
+
+        # only unexpired reservations get assigned so anything that has already arrived can't overlap
+        self.reservation_calendar.prune(self.current_datetime)
+
+        for vehicle_type in vehicle_types:
+            if incremental:
+                reservations = self.sort_pending_departures_earliest_first(vehicle_type)
+                if len(reservations) == 0:
+                    continue
+            else:
+                reservations = [
+                    reservation for reservation in self.sort_departures_earliest_first(vehicle_type)
+                    if self.reservation_is_new(reservation) or self.reservation_is_unique(reservation)
+                ]
+            vehicles = [vehicle for vehicle in self.vehicles.values() if vehicle.type == vehicle_type]
+
+            # no vehicle / reservations to assign
+            if len(vehicles) == 0 or len(reservations) == 0:
+                continue
+
+            cost = self.get_reservation_vehicle_cost_matrix(reservations, vehicles)
+            reservation_idxs, vehicle_idxs = linear_sum_assignment(cost)
+
+            # rows come back in departure order so assignments are recorded earliest first
+            for reservation_idx, vehicle_idx in zip(reservation_idxs, vehicle_idxs):
+                if cost[reservation_idx, vehicle_idx] < FORBIDDEN_ASSIGNMENT_COST:
+                    self.assign_vehicle_to_reservation(reservations[reservation_idx], vehicles[vehicle_idx].id)
+
     def is_vehicle_reservation_overlap(self):
         ### See if we can detect an overlap here
         vehs = []
@@ -274,21 +527,42 @@ class AlgoDepot(AssetDepot):
         else:
             return False
 
+    def rebuild_station_availability(self):
+        # stations received from the queue are synced in poll_queues, call this after swapping out the fleet manager
+        self.station_availability = StationAvailability.from_stations(self.stations.values(), self.current_datetime)
+        for vehicle_id, instruction in self.move_charge.items():
+            self.station_availability.reserve(vehicle_id, instruction.connected_station_id, self.stations, self.current_datetime)
+
+    def add_move_charge_instruction(self, vehicle):
+        self.move_charge[vehicle.id] = vehicle
+        self.dirty_vehicle_ids.add(vehicle.id)
+        self.mark_local_edit('vehicles', vehicle.id)
+        # the station is spoken for until the instruction is sent to the asset simulator
+        self.station_availability.reserve(vehicle.id, vehicle.connected_station_id, self.stations, self.current_datetime)
+
+    def plugin(self, vehicle_id, station_id):
+        # plugged in stations drop out of the free-lists the next time they are looked up
+        self.fleet_manager.plugin(vehicle_id, station_id)
+        self.mark_local_edit('vehicles', vehicle_id)
+        self.mark_local_edit('stations', station_id)
+
+    def unplug(self, vehicle_id):
+        station_id = self.vehicles[vehicle_id].connected_station_id
+        self.fleet_manager.unplug(vehicle_id, self.current_datetime)
+        self.mark_local_edit('vehicles', vehicle_id)
+        if station_id is not None:
+            self.mark_local_edit('stations', station_id)
+            self.station_availability.unplug(self.stations[station_id], self.current_datetime)
+
     def is_station_reserved(self, station_id):
         # determine if we assigned this station to a reservation in flight
-        for instruction in self.move_charge.values():
-            if instruction.connected_station_id == station_id:
-                return True
-        return False
+        count_op('station_reserved_checks')
+        return self.station_availability.is_reserved(station_id)
 
     def get_available_l2_station(self):
         # return first L2 station available
-        for station in self.stations.values():
-            # enforce a 5 min wait period after an evse has been unplugged to simulate unplugging and moving prior vehicle from station, otherwise we get teleporting station/vehicle pairs
-            if station.is_available() and station.is_l2() and not self.is_station_reserved(station.id) and self.current_datetime > station.last_unplugged + timedelta(minutes=15):
-                return station.id
-        #No L2 available
-        return None
+        # enforce a 15 min wait period after an evse has been unplugged to simulate unplugging and moving prior vehicle from station, otherwise we get teleporting station/vehicle pairs
+        return self.station_availability.get_available_station('L2', self.stations, self.current_datetime)
 
     def dcfc_is_available(self):
         available_dcfc_station = self.get_available_dcfc_station()
@@ -299,12 +573,7 @@ class AlgoDepot(AssetDepot):
 
     def get_available_dcfc_station(self):
         # return first DCFC station available
-        for station in self.stations.values():
-            # enforce a 5 min wait period after an evse has been unplugged to simulate unplugging and moving prior vehicle from station, otherwise we get teleporting station/vehicle pairs
-            if station.is_available() and station.is_dcfc() and not self.is_station_reserved(station.id) and self.current_datetime > station.last_unplugged + timedelta(minutes=15):
-                return station.id
-        #No DCFC available
-        return None
+        return self.station_availability.get_available_station('DCFC', self.stations, self.current_datetime)
 
     def get_walk_in_ready_vehicles(self, vehicle_class: str = None):
         pass
@@ -350,6 +619,8 @@ class AlgoDepot(AssetDepot):
             # vehicle.status = 'parked'
             vehicle.park(self.current_datetime)
             self.vehicles[vehicle.id] = vehicle
+            self.dirty_vehicle_ids.add(vehicle.id)
+            self.mark_local_edit('vehicles', vehicle.id)
 
         # wipe out the internal qr events after moving these vehicles from 'driving' to 'parked'
         # we will assign these vehicles a charging station and reservation later
@@ -378,6 +649,7 @@ class AlgoDepot(AssetDepot):
         else:
             return None
 
+    @profile_phase('heuristic.assign_charging_stations_to_reservations')
     def assign_charging_stations_to_reservations(self):
 
         # create ordered list of assigned reservations by departure date ascending
@@ -399,6 +671,7 @@ class AlgoDepot(AssetDepot):
 
                 # determine if L2 can charge fast enough
                 l2_capable = vehicle.can_meet_reservation_deadline_at_l2(
+                    current_datetime=self.current_datetime,
                     depature_datetime=reservation.departure_timestamp_utc,
                     charging_rate_kw=self.l2_charging_rate_kw,
                     # 15 minute padding
@@ -411,7 +684,7 @@ class AlgoDepot(AssetDepot):
                     vehicle.status = 'charging'
                     # we add the current timestamp so we can plot when the msg was sent later
                     vehicle.updated_at = self.current_datetime
-                    self.move_charge[vehicle.id] = vehicle
+                    self.add_move_charge_instruction(vehicle)
 
                 elif self.dcfc_is_available():
 
@@ -422,19 +695,23 @@ class AlgoDepot(AssetDepot):
                     vehicle.status = 'charging'
                     # we add the current timestamp so we can plot when the msg was sent later
                     vehicle.updated_at = self.current_datetime
-                    self.move_charge[vehicle.id] = vehicle
+                    self.add_move_charge_instruction(vehicle)
 
     def vehicle_is_currently_reserved(self, vehicle_id):
-        for reservation in self.reservation_assignments.values():
+        for n_scanned, reservation in enumerate(self.reservation_assignments.values(), 1):
             if reservation.assigned_vehicle_id == vehicle_id:
+                count_op('reservation_assignment_scans', n_scanned)
                 return True
+        count_op('reservation_assignment_scans', len(self.reservation_assignments))
         return False
 
 
     def vehicle_assigned_move_charge_instruction(self, vehicle_id):
-        for instruction in self.move_charge.values():
+        for n_scanned, instruction in enumerate(self.move_charge.values(), 1):
             if vehicle_id == instruction.id:
+                count_op('move_charge_scans', n_scanned)
                 return True
+        count_op('move_charge_scans', len(self.move_charge))
         return False
 
     def get_vehicles_free_for_walk_ins(self):
@@ -442,12 +719,21 @@ class AlgoDepot(AssetDepot):
         # - assigned to reservations
         # - assigned a move/charge instruction
 
+        # one pass over the assignments and instructions instead of one per vehicle
+        reserved_vehicle_ids = set(reservation.assigned_vehicle_id for reservation in self.reservation_assignments.values())
+        count_op('reservation_assignment_scans', len(self.reservation_assignments))
+        count_op('move_charge_scans', len(self.move_charge))
+
         available_vehicle_ids = []
         for vehicle in self.vehicles.values():
-            if not self.vehicle_is_currently_reserved(vehicle.id) and not self.vehicle_assigned_move_charge_instruction(vehicle.id) and not self.fleet_manager.vehicle_fleet.vehicle_in_walk_in_pool(vehicle.id) and vehicle.status != 'driving':
+            if self.is_free_for_walk_ins(vehicle, reserved_vehicle_ids):
                 available_vehicle_ids.append(vehicle)
         return available_vehicle_ids
 
+    def is_free_for_walk_ins(self, vehicle, reserved_vehicle_ids):
+        return vehicle.id not in reserved_vehicle_ids and vehicle.id not in self.move_charge and \
+            not self.fleet_manager.vehicle_fleet.vehicle_in_walk_in_pool(vehicle.id) and vehicle.status != 'driving'
+
     def get_walk_in_deficit(self):
         # create a list of stations left over not already assigned a reservation
         walk_in_pool = self.fleet_manager.vehicle_fleet.walk_in_pool
@@ -477,23 +763,46 @@ class AlgoDepot(AssetDepot):
         return False
 
 
-    def allocate_vehicles_to_walk_in_pool(self):
-        if self.is_walk_in_deficit():
-            vehicle_candidates = self.get_vehicles_free_for_walk_ins()
+    @profile_phase('heuristic.allocate_vehicles_to_walk_in_pool')
+    def allocate_vehicles_to_walk_in_pool(self, incremental=False):
+        if not self.is_walk_in_deficit():
+            return
 
-            # assign the highest soc vehicles to walk in pool by type
+        if incremental:
+            # walk the soc index instead of sorting every free vehicle, the first free ones are the ones a sort would pick
+            reserved_vehicle_ids = set(reservation.assigned_vehicle_id for reservation in self.reservation_assignments.values())
+            count_op('reservation_assignment_scans', len(self.reservation_assignments))
             for type, amt_needed in self.get_walk_in_deficit().items():
-                vehicles_soc_sorted_by_type = self.fleet_manager.vehicle_fleet.sort_vehicles_highest_soc_first_by_type(vehicle_candidates, type)
-                target_vehicles = vehicles_soc_sorted_by_type[0:amt_needed]
-                for vehicle in target_vehicles:
-                    self.fleet_manager.vehicle_fleet.allocate_to_walk_in_pool(vehicle)
-
+                n_allocated = 0
+                for vehicle_id in self.vehicle_soc_index.iter_vehicle_ids(type):
+                    if n_allocated >= amt_needed:
+                        break
+                    vehicle = self.vehicles[vehicle_id]
+                    if self.is_free_for_walk_ins(vehicle, reserved_vehicle_ids):
+                        self.fleet_manager.vehicle_fleet.allocate_to_walk_in_pool(vehicle)
+                        n_allocated += 1
+            return
+
+        vehicle_candidates = self.get_vehicles_free_for_walk_ins()
+
+        # assign the highest soc vehicles to walk in pool by type
+        for type, amt_needed in self.get_walk_in_deficit().items():
+            vehicles_soc_sorted_by_type = self.fleet_manager.vehicle_fleet.sort_vehicles_highest_soc_first_by_type(vehicle_candidates, type)
+            target_vehicles = vehicles_soc_sorted_by_type[0:amt_needed]
+            for vehicle in target_vehicles:
+                self.fleet_manager.vehicle_fleet.allocate_to_walk_in_pool(vehicle)
+
+    @profile_phase('heuristic.assign_charging_station_to_walk_in_pool')
     def assign_charging_station_to_walk_in_pool(self):
 
         # Are there stations available?
         if (self.l2_is_available() or self.dcfc_is_available()):
 
-            vehicles = self.fleet_manager.vehicle_fleet.walk_in_pool.values()
+            # soc < 80, isn't currently charging, and don't have a charge command in the queue for said vehicle
+            vehicles = [
+                vehicle for vehicle in self.fleet_manager.vehicle_fleet.walk_in_pool.values()
+                if vehicle.is_below_minimum_soc() and vehicle.status != 'charging' and vehicle.id not in self.move_charge.keys()
+            ]
 
             # sort our vehicles by highest SOC first so we have vehicles ready soonest
             ordered_vehicle = self.fleet_manager.vehicle_fleet.sort_vehicles_highest_soc_first_by_type(
@@ -503,23 +812,21 @@ class AlgoDepot(AssetDepot):
 
             for vehicle in ordered_vehicle:
 
-                # soc < 80, isn't currently charging, and don't have a charge command in the queue for said vehicle
-                if vehicle.is_below_minimum_soc() and vehicle.status != 'charging' and vehicle.id not in self.move_charge.keys():
+                if self.l2_is_available():
+                    available_l2_station_id = self.prefer_l2()
+                    vehicle.connected_station_id = available_l2_station_id
+                    self.add_move_charge_instruction(vehicle)
+                    # need to locally simulate the plugin so we know the station and vehicle will be plugged in
+                    self.plugin(vehicle.id, available_l2_station_id)
 
-                    if self.l2_is_available():
-                        available_l2_station_id = self.prefer_l2()
-                        vehicle.connected_station_id = available_l2_station_id
-                        self.move_charge[vehicle.id] = vehicle
-                        # need to locally simulate the plugin so we know the station and vehicle will be plugged in
-                        self.fleet_manager.plugin(vehicle.id, available_l2_station_id)
-
-                    elif self.dcfc_is_available():
-                        available_dcfc_station_id = self.prefer_dcfc()
-                        vehicle.connected_station_id = available_dcfc_station_id
-                        self.move_charge[vehicle.id] = vehicle
-                        # need to locally simulate the plugin so we know the station and vehicle will be plugged in
-                        self.fleet_manager.plugin(vehicle.id, available_dcfc_station_id)
+                elif self.dcfc_is_available():
+                    available_dcfc_station_id = self.prefer_dcfc()
+                    vehicle.connected_station_id = available_dcfc_station_id
+                    self.add_move_charge_instruction(vehicle)
+                    # need to locally simulate the plugin so we know the station and vehicle will be plugged in
+                    self.plugin(vehicle.id, available_dcfc_station_id)
 
+    @profile_phase('heuristic.assign_charging_stations_to_remaining_vehicles')
     def assign_charging_stations_to_remaining_vehicles(self):
 
         # Do we have any available charging stations
@@ -536,17 +843,60 @@ class AlgoDepot(AssetDepot):
                     if self.l2_is_available():
                         available_l2_station_id = self.prefer_l2()
                         vehicle.connected_station_id = available_l2_station_id
-                        self.move_charge[vehicle.id] = vehicle
+                        self.add_move_charge_instruction(vehicle)
                         # need to locally simulate the plugin so we know the station and vehicle will be plugged in
-                        self.fleet_manager.plugin(vehicle.id, available_l2_station_id)
+                        self.plugin(vehicle.id, available_l2_station_id)
 
                     elif self.dcfc_is_available():
                         available_dcfc_station_id = self.prefer_dcfc()
                         vehicle.connected_station_id = available_dcfc_station_id
-                        self.move_charge[vehicle.id] = vehicle
+                        self.add_move_charge_instruction(vehicle)
                         # need to locally simulate the plugin so we know the station and vehicle will be plugged in
-                        self.fleet_manager.plugin(vehicle.id, available_dcfc_station_id)
+                        self.plugin(vehicle.id, available_dcfc_station_id)
+
+    def update_charge_candidates(self):
+        for vehicle_id in self.dirty_vehicle_ids:
+            vehicle = self.vehicles[vehicle_id]
+            if vehicle.is_below_minimum_soc() and vehicle.status != 'charging':
+                self.charge_candidate_ids.add(vehicle_id)
+            else:
+                self.charge_candidate_ids.discard(vehicle_id)
+
+    @profile_phase('heuristic.assign_charging_stations_to_charge_candidates')
+    def assign_charging_stations_to_charge_candidates(self):
+        # incremental version of assign_charging_stations_to_remaining_vehicles that only sorts vehicles needing a charge
+        self.update_charge_candidates()
+
+        # Do we have any available charging stations
+        if self.l2_is_available() or self.dcfc_is_available():
+            # same order as the stable highest soc first sort over the whole fleet, popped lazily as only
+            # as many vehicles as there are free stations get one
+            candidate_heap = [
+                (-self.vehicles[vehicle_id].state_of_charge, self.vehicle_soc_index.order[vehicle_id], vehicle_id)
+                for vehicle_id in self.charge_candidate_ids if vehicle_id not in self.move_charge
+            ]
+            heapq.heapify(candidate_heap)
+
+            while len(candidate_heap) > 0:
+                vehicle = self.vehicles[heapq.heappop(candidate_heap)[2]]
+
+                if self.l2_is_available():
+                    available_l2_station_id = self.prefer_l2()
+                    vehicle.connected_station_id = available_l2_station_id
+                    self.add_move_charge_instruction(vehicle)
+                    # need to locally simulate the plugin so we know the station and vehicle will be plugged in
+                    self.plugin(vehicle.id, available_l2_station_id)
+
+                elif self.dcfc_is_available():
+                    available_dcfc_station_id = self.prefer_dcfc()
+                    vehicle.connected_station_id = available_dcfc_station_id
+                    self.add_move_charge_instruction(vehicle)
+                    # need to locally simulate the plugin so we know the station and vehicle will be plugged in
+                    self.plugin(vehicle.id, available_dcfc_station_id)
 
+                else:
+                    # plugging in never frees up a station so the rest of the vehicles would find none either
+                    break
 
     @classmethod
     def build_depot(cls, config, queue):
@@ -558,4 +908,6 @@ class AlgoDepot(AssetDepot):
             schedule=schedule,
             vehicle_snapshot={}
         )
+        depot.rebuild_station_availability()
+        depot.rebuild_vehicle_soc_index()
         return depot
\ No newline at end of file
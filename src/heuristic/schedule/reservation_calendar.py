@@ -0,0 +1,77 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from src.asset_simulator.reservation.reservation import Reservation
+from src.instrumentation.op_counters import count_op
+
+
+class ReservationCalendar(BaseModel):
+    """
+    sorted calendar of assigned reservations keyed by departure
+
+    any reservation overlapping [departure, arrival] must depart within
+    [departure - max_duration, arrival] so a lookup is two bisects plus a scan of that window
+    """
+    departures: List[datetime] = []
+    reservation_ids: List[str] = []
+    # reservation id -> (departure, arrival, assigned vehicle id)
+    intervals: Dict[str, Tuple[datetime, datetime, Optional[int]]] = {}
+    max_duration: timedelta = timedelta(0)
+
+    def add(self, reservation: Reservation):
+        # a re-assigned reservation replaces its previous calendar entry
+        self.remove(reservation.id)
+
+        departure = reservation.departure_timestamp_utc
+        arrival = reservation.arrival_timestamp_utc
+
+        idx = bisect_right(self.departures, departure)
+        self.departures.insert(idx, departure)
+        self.reservation_ids.insert(idx, reservation.id)
+        self.intervals[reservation.id] = (departure, arrival, reservation.assigned_vehicle_id)
+        self.max_duration = max(self.max_duration, arrival - departure)
+
+    def remove(self, reservation_id: str):
+        try:
+            departure, arrival, vehicle_id = self.intervals.pop(reservation_id)
+        except KeyError:
+            return
+
+        idx = bisect_left(self.departures, departure)
+        while idx < len(self.departures) and self.departures[idx] == departure:
+            if self.reservation_ids[idx] == reservation_id:
+                del self.departures[idx]
+                del self.reservation_ids[idx]
+                return
+            idx += 1
+
+    def prune(self, current_datetime: datetime):
+        # anything departing before this has already arrived and can't overlap a future reservation
+        idx = bisect_left(self.departures, current_datetime - self.max_duration)
+        for reservation_id in self.reservation_ids[:idx]:
+            del self.intervals[reservation_id]
+        del self.departures[:idx]
+        del self.reservation_ids[:idx]
+
+    def get_busy_vehicle_ids(self, departure: datetime, arrival: datetime) -> List[int]:
+        # same inclusive overlap rule as DemandSimulator.reservation_does_overlap
+        lo = bisect_left(self.departures, departure - self.max_duration)
+        hi = bisect_right(self.departures, arrival)
+        count_op('overlap_comparisons', hi - lo)
+
+        busy_vehicle_ids = []
+        for reservation_id in self.reservation_ids[lo:hi]:
+            _, res_arrival, vehicle_id = self.intervals[reservation_id]
+            if res_arrival >= departure:
+                busy_vehicle_ids.append(vehicle_id)
+        return busy_vehicle_ids
+
+    @classmethod
+    def from_reservations(cls, reservations: List[Reservation]):
+        calendar = cls()
+        for reservation in reservations:
+            calendar.add(reservation)
+        return calendar
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+import heapq
+from typing import Dict, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from src.asset_simulator.station.station import Station
+from src.instrumentation.op_counters import count_op
+
+
+class StationAvailability(BaseModel):
+    """
+    free-lists of stations per type so the heuristic doesn't scan every station per query
+
+    a station is available when it is unplugged, not reserved by a move_charge instruction and
+    past its cooldown. Entries are re-checked against the live station when they reach the top
+    of a free-list, so plugging in through FleetManager needs no bookkeeping here, only stations
+    becoming free again (unplug, released reservation, cooldown) have to be pushed back.
+    """
+    cooldown: timedelta = timedelta(minutes=15)
+    # station type -> min heap of station ids, lowest id is handed out first
+    free: Dict[str, List[int]] = {}
+    # min heap of (cooldown end, station id)
+    cooling: List[Tuple[datetime, int]] = []
+    # stations sitting in either free or cooling
+    queued: Set[int] = set()
+    # vehicle id -> station id of the move_charge instruction sent this interval
+    reserved: Dict[int, int] = {}
+    reserved_station_ids: Set[int] = set()
+    station_types: Dict[int, str] = {}
+
+    def sync(self, stations: List[Station], current_datetime: datetime):
+        for station in stations:
+            self.sync_station(station, current_datetime)
+        self.release_cooled_down(current_datetime)
+
+    def sync_station(self, station: Station, current_datetime: datetime):
+        self.station_types[station.id] = station.type
+        if station.id in self.queued or not station.is_available():
+            return
+
+        self.queued.add(station.id)
+        ready_at = station.last_unplugged + self.cooldown
+        if current_datetime > ready_at:
+            heapq.heappush(self.free.setdefault(station.type, []), station.id)
+        else:
+            heapq.heappush(self.cooling, (ready_at, station.id))
+
+    def release_cooled_down(self, current_datetime: datetime):
+        while len(self.cooling) > 0 and current_datetime > self.cooling[0][0]:
+            _, station_id = heapq.heappop(self.cooling)
+            heapq.heappush(self.free.setdefault(self.station_types[station_id], []), station_id)
+
+    def get_available_station(self, station_type: str, stations: Dict[int, Station], current_datetime: datetime) -> Optional[int]:
+        self.release_cooled_down(current_datetime)
+        free = self.free.get(station_type, [])
+
+        n_scanned = 0
+        while len(free) > 0:
+            n_scanned += 1
+            station = stations[free[0]]
+            ready_at = station.last_unplugged + self.cooldown
+
+            if not station.is_available() or station.id in self.reserved_station_ids:
+                # pushed back by unplug or release_reserved once it frees up
+                heapq.heappop(free)
+                self.queued.discard(station.id)
+            elif current_datetime <= ready_at:
+                # unplugged again since it was queued, wait out the new cooldown
+                heapq.heappop(free)
+                heapq.heappush(self.cooling, (ready_at, station.id))
+            else:
+                count_op('station_scans', n_scanned)
+                return station.id
+
+        count_op('station_scans', n_scanned)
+        return None
+
+    def is_reserved(self, station_id: int) -> bool:
+        return station_id in self.reserved_station_ids
+
+    def reserve(self, vehicle_id: int, station_id: int, stations: Dict[int, Station], current_datetime: datetime):
+        # a vehicle only holds one instruction, re-assigning it gives up the previous station
+        previous_station_id = self.reserved.get(vehicle_id)
+        if previous_station_id is not None and previous_station_id != station_id:
+            self.reserved_station_ids.discard(previous_station_id)
+            self.sync_station(stations[previous_station_id], current_datetime)
+
+        self.reserved[vehicle_id] = station_id
+        self.reserved_station_ids.add(station_id)
+
+    def release_reserved(self, stations: Dict[int, Station], current_datetime: datetime):
+        released_station_ids = self.reserved_station_ids
+        self.reserved = {}
+        self.reserved_station_ids = set()
+        for station_id in released_station_ids:
+            self.sync_station(stations[station_id], current_datetime)
+
+    def unplug(self, station: Station, current_datetime: datetime):
+        self.sync_station(station, current_datetime)
+
+    @classmethod
+    def from_stations(cls, stations: List[Station], current_datetime: datetime):
+        station_availability = cls()
+        station_availability.sync(stations, current_datetime)
+        return station_availability
@@ -0,0 +1,54 @@
+from bisect import bisect_left, insort
+from typing import Dict, Iterator, List, Tuple
+
+from pydantic import BaseModel
+
+from src.asset_simulator.vehicle.vehicle import Vehicle
+
+
+class VehicleSocIndex(BaseModel):
+    """
+    vehicles of each type kept highest soc first so the heuristic doesn't sort the fleet every interval
+
+    only vehicles whose soc changed have to be updated, ties keep the order vehicles were added in
+    which is the order a stable sort of the fleet gives them
+    """
+    # vehicle type -> sorted (-soc, order added, vehicle id)
+    entries_by_type: Dict[str, List[Tuple[float, int, int]]] = {}
+    # vehicle id -> its current entry
+    entries: Dict[int, Tuple[float, int, int]] = {}
+    vehicle_types: Dict[int, str] = {}
+    order: Dict[int, int] = {}
+
+    def update(self, vehicle: Vehicle):
+        order = self.order.setdefault(vehicle.id, len(self.order))
+        entry = (-vehicle.state_of_charge, order, vehicle.id)
+        previous_entry = self.entries.get(vehicle.id)
+        if entry == previous_entry:
+            return
+
+        # a vehicle's type never changes
+        vehicle_type = self.vehicle_types.setdefault(vehicle.id, vehicle.type)
+        type_entries = self.entries_by_type.setdefault(vehicle_type, [])
+        if previous_entry is not None:
+            del type_entries[bisect_left(type_entries, previous_entry)]
+        insort(type_entries, entry)
+        self.entries[vehicle.id] = entry
+
+    def get_types(self) -> List[str]:
+        return list(self.entries_by_type.keys())
+
+    def get_vehicle_ids(self, vehicle_type: str) -> List[int]:
+        return [entry[2] for entry in self.entries_by_type.get(vehicle_type, [])]
+
+    def iter_vehicle_ids(self, vehicle_type: str) -> Iterator[int]:
+        # highest soc first, for scans that stop at the first few vehicles that qualify
+        for entry in self.entries_by_type.get(vehicle_type, []):
+            yield entry[2]
+
+    @classmethod
+    def from_vehicles(cls, vehicles: List[Vehicle]):
+        vehicle_soc_index = cls()
+        for vehicle in vehicles:
+            vehicle_soc_index.update(vehicle)
+        return vehicle_soc_index
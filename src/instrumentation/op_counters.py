@@ -0,0 +1,76 @@
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from pydantic import BaseModel
+
+
+class OpCounters(BaseModel):
+    """
+    counts of hot path operations kept per interval, so growth over the horizon shows up and not just the total
+    """
+    # counter -> count in the interval running now
+    counts: Dict[str, int] = {}
+    # start of every interval ended so far and the counts it ended with
+    datetimes: List[datetime] = []
+    interval_counts: List[Dict[str, int]] = []
+
+    def add(self, counter: str, n: int = 1):
+        self.counts[counter] = self.counts.get(counter, 0) + n
+
+    def end_interval(self, interval_datetime: datetime):
+        self.datetimes.append(interval_datetime)
+        self.interval_counts.append(self.counts)
+        self.counts = {}
+
+    def get_records(self) -> List[Tuple[datetime, str, int]]:
+        """
+        :return: (interval start, counter, count) for every counter that counted something in an interval
+        """
+        return [
+            (interval_datetime, counter, n)
+            for interval_datetime, counts in zip(self.datetimes, self.interval_counts)
+            for counter, n in sorted(counts.items())
+        ]
+
+    def get_frame(self) -> pd.DataFrame:
+        # one row per interval and one column per counter, intervals a counter didn't count in are 0
+        df_counts = pd.DataFrame(self.interval_counts, index=pd.Index(self.datetimes, name='datetime'))
+        return df_counts.reindex(sorted(df_counts.columns), axis=1).fillna(0).astype(int)
+
+
+# counters operations are counted into, None unless inside counting()
+active_counters: Optional[OpCounters] = None
+
+
+def count_op(counter: str, n: int = 1):
+    counters = active_counters
+    if counters is not None:
+        counters.add(counter, n)
+
+
+def end_op_interval(interval_datetime: datetime):
+    counters = active_counters
+    if counters is not None:
+        counters.end_interval(interval_datetime)
+
+
+def is_counting() -> bool:
+    # for call sites where even working out the count costs something
+    return active_counters is not None
+
+
+@contextmanager
+def counting(counters: Optional[OpCounters] = None):
+    """
+    count operations into counters for the duration of the block, RuntimeEnvironment.run ends an interval after each step
+    """
+    global active_counters
+    counters = OpCounters() if counters is None else counters
+    previous_counters = active_counters
+    active_counters = counters
+    try:
+        yield counters
+    finally:
+        active_counters = previous_counters
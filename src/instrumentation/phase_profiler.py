@@ -0,0 +1,137 @@
+from contextlib import contextmanager
+import cProfile
+import functools
+import inspect
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+# histogram bin i counts calls taking [2**i, 2**(i+1)) microseconds, bin 0 also holds anything faster
+N_HISTOGRAM_BINS = 40
+
+
+class PhaseStats(BaseModel):
+    calls: int = 0
+    total_seconds: float = 0
+    max_seconds: float = 0
+    histogram: List[int] = [0] * N_HISTOGRAM_BINS
+
+    def record(self, seconds: float):
+        self.calls += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        microseconds = int(seconds * 1e6)
+        self.histogram[min(max(microseconds.bit_length() - 1, 0), N_HISTOGRAM_BINS - 1)] += 1
+
+    def get_quantile_seconds(self, quantile: float) -> float:
+        """
+        :return: upper edge of the histogram bin holding the quantile, at most max_seconds
+        """
+        target = quantile * self.calls
+        count = 0
+        for bin_idx, bin_count in enumerate(self.histogram):
+            count += bin_count
+            if count >= target:
+                return min(2**(bin_idx + 1) / 1e6, self.max_seconds)
+        return self.max_seconds
+
+
+class PhaseProfiler(BaseModel):
+    """
+    wall time histograms and call counts of the phases decorated with profile_phase, collected while profiling
+    """
+    # phase -> stats, msg broker phases are split by route e.g. msg_broker.publish_to_queue[vehicles]
+    phases: Dict[str, PhaseStats] = {}
+
+    def record(self, phase: str, seconds: float):
+        phase_stats = self.phases.get(phase)
+        if phase_stats is None:
+            phase_stats = self.phases[phase] = PhaseStats()
+        phase_stats.record(seconds)
+
+    def get_summary(self) -> List[Dict]:
+        """
+        :return: one dict per phase, most total time first, nested phases count towards their parent too
+        """
+        summary = []
+        for phase, phase_stats in self.phases.items():
+            summary.append({
+                'phase': phase,
+                'calls': phase_stats.calls,
+                'total_seconds': phase_stats.total_seconds,
+                'mean_ms': 1000 * phase_stats.total_seconds / phase_stats.calls,
+                'p50_ms': 1000 * phase_stats.get_quantile_seconds(0.5),
+                'p95_ms': 1000 * phase_stats.get_quantile_seconds(0.95),
+                'max_ms': 1000 * phase_stats.max_seconds,
+                'histogram': list(phase_stats.histogram)
+            })
+        return sorted(summary, key=lambda row: row['total_seconds'], reverse=True)
+
+    def format_summary(self) -> str:
+        lines = ['{:<70} {:>8} {:>10} {:>9} {:>9} {:>9} {:>9}'.format('phase', 'calls', 'total s', 'mean ms', 'p50 ms', 'p95 ms', 'max ms')]
+        for row in self.get_summary():
+            lines.append('{:<70} {:>8} {:>10.3f} {:>9.3f} {:>9.3f} {:>9.3f} {:>9.3f}'.format(
+                row['phase'], row['calls'], row['total_seconds'], row['mean_ms'], row['p50_ms'], row['p95_ms'], row['max_ms']
+            ))
+        return '\n'.join(lines)
+
+
+# profiler collecting phase timings, None unless inside profiling()
+active_profiler: Optional[PhaseProfiler] = None
+
+
+def profile_phase(phase: str, label_arg: Optional[str] = None):
+    """
+    time every call of the decorated function as phase while profiling, otherwise it is called straight through
+
+    :param label_arg: name of an argument whose value is appended to the phase, e.g. the route of a queue call
+    """
+    def decorator(function):
+        label_idx = list(inspect.signature(function).parameters).index(label_arg) if label_arg is not None else None
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = active_profiler
+            if profiler is None:
+                return function(*args, **kwargs)
+
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                if label_idx is None:
+                    profiler.record(phase, perf_counter() - start)
+                else:
+                    label = args[label_idx] if len(args) > label_idx else kwargs[label_arg]
+                    profiler.record(phase + '[' + str(label) + ']', perf_counter() - start)
+
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def profiling(profiler: Optional[PhaseProfiler] = None, cprofile_path=None):
+    """
+    collect phase timings into profiler for the duration of the block
+
+    :param cprofile_path: also run cProfile and dump its stats here, readable by pstats, snakeviz or flameprof
+    :return: the profiler collecting the timings
+    """
+    global active_profiler
+    profiler = PhaseProfiler() if profiler is None else profiler
+    previous_profiler = active_profiler
+    active_profiler = profiler
+
+    cprofile = None
+    if cprofile_path is not None:
+        cprofile = cProfile.Profile()
+        cprofile.enable()
+    try:
+        yield profiler
+    finally:
+        if cprofile is not None:
+            cprofile.disable()
+            cprofile.dump_stats(cprofile_path)
+        active_profiler = previous_profiler
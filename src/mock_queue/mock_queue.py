@@ -1,20 +1,30 @@
-from typing import List, Dict
+from typing import Any, Dict, List, Union
 
 from pydantic import BaseModel
 
 from src.asset_simulator.reservation.reservation import Reservation
 from src.asset_simulator.vehicle.vehicle import Vehicle
 from src.asset_simulator.station.station import Station
+from src.mock_queue.transport import JsonTransport, Transport
+
+
+# json strings with JsonTransport, dicts with InProcessTransport
+Message = Union[str, Dict[str, Any]]
 
 
 class MockQueue(BaseModel):
-    scan_events: List[str] = []
-    reservations: List[str] = []
-    reservation_assignments: List[str] = []
-    move_charge: List[str] = []
-    departures: List[str] = []
+    # json by default so messages look like they would on the wire
+    transport: Transport = JsonTransport()
+    scan_events: List[Message] = []
+    reservations: List[Message] = []
+    reservation_assignments: List[Message] = []
+    move_charge: List[Message] = []
+    departures: List[Message] = []
     # walk ins are just treated as reservations with type = 'walk_in'
     # walk_in_events: List[str]
-    vehicles_demand_sim: List[str] = []
-    vehicles_heuristic: List[str] = []
-    stations: List[str] = []
\ No newline at end of file
+    vehicles_demand_sim: List[Message] = []
+    vehicles_heuristic: List[Message] = []
+    stations: List[Message] = []
+
+    class Config:
+        arbitrary_types_allowed = True
@@ -1,8 +1,8 @@
-import json
-
 from pydantic import BaseModel
-from typing import Dict, List
+from typing import Dict, List, Set
 
+from src.instrumentation.op_counters import count_op, is_counting
+from src.instrumentation.phase_profiler import profile_phase
 from src.mock_queue.mock_queue import MockQueue
 from src.asset_simulator.reservation.reservation import Reservation
 from src.asset_simulator.station.station import Station
@@ -13,16 +13,76 @@ class MsgBroker(BaseModel):
     queue: MockQueue
     reservation_assignment_snapshot: Dict[str, List] = {}
     move_charge_snapshot: Dict[str, List] = {}
+    # route -> object id -> version last published, for delta publishing
+    published_versions: Dict[str, Dict] = {}
+    publish_counts: Dict[str, int] = {}
+    # route -> object id -> last object received, subscribers apply deltas onto this
+    received_state: Dict[str, Dict] = {}
+    # attribute name -> ids of received objects edited locally since the last poll
+    local_edit_ids: Dict[str, Set] = {}
 
     def publish_object_to_queue(self, object, route):
-        object_json = json.dumps(object.dict(), default=str)
-        getattr(self.queue, route).append(object_json)
+        message = self.queue.transport.encode(object)
+        self.count_published_message(route, message)
+        getattr(self.queue, route).append(message)
 
+    @profile_phase('msg_broker.publish_to_queue', label_arg='route')
     def publish_to_queue(self, attribute_name, route):
         for object in getattr(self, attribute_name).values():
             # this would be telematics data that the heuristic depends on
-            object_json = json.dumps(object.dict(), default=str)
-            getattr(self.queue, route).append(object_json)
+            message = self.queue.transport.encode(object)
+            self.count_published_message(route, message)
+            getattr(self.queue, route).append(message)
+
+    def count_published_message(self, route, message):
+        # json transports send strings, the in process transport has no wire format to measure
+        if is_counting():
+            count_op('queue_messages[' + route + ']')
+            if isinstance(message, str):
+                count_op('queue_json_bytes[' + route + ']', len(message))
+
+    @profile_phase('msg_broker.publish_changes_to_queue', label_arg='route')
+    def publish_changes_to_queue(self, attribute_name, route, keyframe_every_n_publishes=1):
+        """
+        only publish the objects that changed since the last publish on this route, with every
+        keyframe_every_n_publishes publish sending everything so subscribers can resync
+        """
+        published_versions = self.published_versions.setdefault(route, {})
+        keyframe = self.publish_counts.get(route, 0) % keyframe_every_n_publishes == 0
+        self.publish_counts[route] = self.publish_counts.get(route, 0) + 1
+
+        for object in getattr(self, attribute_name).values():
+            if keyframe or published_versions.get(object.id) != object._version:
+                published_versions[object.id] = object._version
+                self.publish_object_to_queue(object, route)
+
+    @profile_phase('msg_broker.subscribe_to_changes', label_arg='route')
+    def subscribe_to_changes(self, attribute_name, object_type, route):
+        """
+        apply the objects published on a delta route and hand out fresh copies of the ones published or edited
+        locally since the last poll, so local edits never outlive the next poll. edits have to be reported with
+        mark_local_edit, everything else is left as is
+
+        :return: ids of objects that were published or edited locally since the last poll
+        """
+        received_state = self.received_state.setdefault(route, {})
+        local_objects = getattr(self, attribute_name)
+        edited_ids = self.local_edit_ids.pop(attribute_name, set())
+
+        received_ids = []
+        for object in self.read_queue(object_type, route):
+            received_state[object.id] = object
+            received_ids.append(object.id)
+
+        changed_ids = list(dict.fromkeys(received_ids + [object_id for object_id in edited_ids if object_id in received_state]))
+        for object_id in changed_ids:
+            local_objects[object_id] = received_state[object_id].copy()
+
+        return changed_ids
+
+    def mark_local_edit(self, attribute_name, object_id):
+        # the copy handed out by subscribe_to_changes is replaced on the next poll
+        self.local_edit_ids.setdefault(attribute_name, set()).add(object_id)
 
     def capture_msg_inflight_for_plotting(self, route, key, value):
         if route == 'reservation_assignments':
@@ -37,32 +97,45 @@ class MsgBroker(BaseModel):
             # first time creating the snapshot list must be instantiated
             getattr(self, snapshot_cache)[key] = [value]
 
+    @profile_phase('msg_broker.subscribe_to_queue', label_arg='route')
     def subscribe_to_queue(self, attribute_name, object_type, route, delete_on_read=True):
+        # ids of every object read so subscribers can track what changed since the last poll
+        received_ids = []
+
+        for object in self.read_queue(object_type, route, delete_on_read):
+            getattr(self, attribute_name)[object.id] = object
+            received_ids.append(object.id)
 
-        for object_json in getattr(self.queue, route):
-            object_dict = json.loads(object_json)
+        return received_ids
+
+    def read_queue(self, object_type, route, delete_on_read=True):
+        objects = []
+
+        for message in getattr(self.queue, route):
 
             # We need to capture the stream of reservation assignments to evaluate how verbose and accurate they are
             if object_type == 'reservation':
-                object = Reservation.parse_obj(object_dict)
+                object = self.queue.transport.decode(message, Reservation)
 
                 if route == 'reservation_assignments':
                     self.capture_msg_inflight_for_plotting(route, object.assigned_vehicle_id, object)
 
             elif object_type == 'station':
-                object = Station.parse_obj(object_dict)
+                object = self.queue.transport.decode(message, Station)
 
             elif object_type == 'vehicle':
                 try:
-                    object = Vehicle.parse_obj(object_dict)
+                    object = self.queue.transport.decode(message, Vehicle)
                 except:
                     pass
 
                 if route == 'move_charge':
                     self.capture_msg_inflight_for_plotting(route, object.id, object)
 
-            getattr(self, attribute_name)[object.id] = object
+            objects.append(object)
 
         # once we have read each item from our mock route then clear messages
         if delete_on_read:
-            setattr(self.queue, route, [])
\ No newline at end of file
+            setattr(self.queue, route, [])
+
+        return objects
@@ -0,0 +1,57 @@
+from abc import ABC, abstractmethod
+import json
+
+from src.asset_simulator.reservation.reservation import Reservation
+from src.asset_simulator.reservation.reservation_record import ReservationRecord
+from src.asset_simulator.station.station import Station
+from src.asset_simulator.station.station_record import StationRecord
+from src.asset_simulator.vehicle.vehicle import Vehicle
+from src.asset_simulator.vehicle.vehicle_record import VehicleRecord
+
+
+# model -> record the simulation works with once a message is decoded
+RECORD_TYPES = {
+    Vehicle: VehicleRecord,
+    Station: StationRecord,
+    Reservation: ReservationRecord
+}
+
+
+class Transport(ABC):
+    """
+    how MsgBroker turns objects into queue messages and back
+    """
+
+    @abstractmethod
+    def encode(self, object):
+        pass
+
+    @abstractmethod
+    def decode(self, message, model):
+        pass
+
+
+class JsonTransport(Transport):
+    # messages are json strings, same as they would be on the wire
+    def encode(self, object):
+        return json.dumps(object.dict(), default=str)
+
+    def decode(self, message, model):
+        # the wire is a boundary so messages are validated, then handed on as records
+        object = model.parse_obj(json.loads(message))
+        return RECORD_TYPES[model].from_model(object) if model in RECORD_TYPES else object
+
+
+class InProcessTransport(Transport):
+    # messages are dict copies of the published object, no json or validation when every service shares a process
+    def encode(self, object):
+        return object.dict()
+
+    def decode(self, message, model):
+        return RECORD_TYPES[model](**message) if model in RECORD_TYPES else model.construct(**message)
+
+
+TRANSPORTS = {
+    'json': JsonTransport,
+    'in_process': InProcessTransport
+}
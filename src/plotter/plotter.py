@@ -11,7 +11,11 @@ import numpy as np
 class Plotter(BaseModel):
 
 
-    def get_soc_timeseries(self, df_soc, df_status, dictionary_of_assigned_reservations, dictionary_of_assigned_stations, station_fleet):
+    def get_soc_timeseries(self, df_soc, df_status, dictionary_of_assigned_reservations, dictionary_of_assigned_stations, station_fleet, status_segments=None):
+        """
+        :param status_segments: vehicle id -> StatusSegments, when given statuses are drawn as one span per segment
+        instead of a bar per interval from df_status
+        """
 
         res_assignments = dictionary_of_assigned_reservations
         vehicle_ids = list(df_soc.columns)[1:]
@@ -80,17 +84,37 @@ class Plotter(BaseModel):
             # fig['layout']['yaxis' + axis_num]['title'] = '(%) SOC'
 
 
-            fig.add_trace(
-               go.Bar(
-                   x=df_status['datetime'],
-                   y=np.ones(shape=len(df_status['datetime'])),
-                   marker={'color':  df_status[plot_num].map(lambda x: set_color(x))},
-                   hovertemplate=df_status[plot_num],
-                   opacity=0.2
-               ),
-                row=row_placement,
-                col=1
-            )
+            if status_segments is not None:
+                segments = status_segments[vehicle_id]
+                fig.add_trace(
+                   go.Bar(
+                       x=[segment.start for segment in segments],
+                       y=np.ones(shape=len(segments)),
+                       # bar widths on a date axis are in ms, offset 0 starts each span at its segment start
+                       width=[(segment.end - segment.start).total_seconds()*1000 for segment in segments],
+                       offset=0,
+                       marker={'color': [set_color(segment.status) for segment in segments]},
+                       hovertemplate=[
+                           segment.status + ('' if segment.station_id is None else ' station: ' + str(segment.station_id))
+                           for segment in segments
+                       ],
+                       opacity=0.2
+                   ),
+                    row=row_placement,
+                    col=1
+                )
+            else:
+                fig.add_trace(
+                   go.Bar(
+                       x=df_status['datetime'],
+                       y=np.ones(shape=len(df_status['datetime'])),
+                       marker={'color':  df_status[plot_num].map(lambda x: set_color(x))},
+                       hovertemplate=df_status[plot_num],
+                       opacity=0.2
+                   ),
+                    row=row_placement,
+                    col=1
+                )
 
             # plot timeline of every reservation per vehicle
             # todo: mark cancelled reservations by modifying res object to have a status: 'created' | 'cancelled'
@@ -1,8 +1,12 @@
+import numpy as np
 import pandas as pd
 import sqlite3
 
-def get_departure_kpis(late_minute_threshold: int) -> pd.DataFrame:
-    con = sqlite3.connect('test.db')
+from src.utils.result_db import connect_result_db
+from src.utils.result_store import RUN_COLUMNS, get_row_run_index, load_result_store
+
+def get_departure_kpis(late_minute_threshold: int, db_path='test.db') -> pd.DataFrame:
+    con = sqlite3.connect(db_path)
     sql = """
         with aggs as
         (
@@ -40,8 +44,8 @@ def get_departure_kpis(late_minute_threshold: int) -> pd.DataFrame:
     return df
 
 
-def get_power_stats() -> pd.DataFrame:
-    con = sqlite3.connect('test.db')
+def get_power_stats(db_path='test.db') -> pd.DataFrame:
+    con = sqlite3.connect(db_path)
     sql = """
         select 
             n_dcfc,
@@ -58,18 +62,26 @@ def get_power_stats() -> pd.DataFrame:
 
     return df
 
-def get_hourly_power_stats() -> pd.DataFrame:
-    con = sqlite3.connect('test.db')
+def get_hourly_power_stats(db_path='test.db') -> pd.DataFrame:
+    # runs that streamed their KPIs only have hourly peaks, the rest the meter power of every interval,
+    # older dbs get the hourly peak table when opened
+    con = connect_result_db(db_path)
     sql = """
         select  
             random_sort, 
             n_dcfc, 
             l2_station, 
             vehicles, 
-            strftime('%H', datetime) as hour, 
+            hour, 
             max(meter_power_kw) as max_hourly_power_kw 
         from 
-            hourly_power_stats 
+        (
+            select random_sort, n_dcfc, l2_station, vehicles, CAST(strftime('%H', datetime) AS INTEGER) as hour, meter_power_kw
+            from hourly_power_stats
+            union all
+            select random_sort, n_dcfc, l2_station, vehicles, hour, meter_power_kw
+            from hourly_peak_power
+        )
         group by 
             1, 2, 3, 4, 5;
     """
@@ -78,4 +90,77 @@ def get_hourly_power_stats() -> pd.DataFrame:
     # convert hour field to numeric
     df['hour'] = pd.to_numeric(df['hour'])
 
-    return df
\ No newline at end of file
+    return df
+
+def get_op_counts(db_path='test.db') -> pd.DataFrame:
+    # per interval hot path operation counts of the runs that counted them, one row per counter and interval
+    con = sqlite3.connect(db_path)
+    sql = """
+        select
+            runs.run_id,
+            runs.random_sort,
+            runs.n_dcfc,
+            runs.l2_station,
+            runs.vehicles,
+            op_counts.datetime,
+            op_counts.counter,
+            op_counts.count
+        from
+            op_counts
+            join runs using (run_id)
+        order by
+            1, 6, 7;
+    """
+    df = pd.read_sql_query(sql, con, parse_dates=['datetime'])
+
+    return df
+
+# the same KPIs read from a columnar result store written by multi_run_cmd_line, reduced per run with numpy
+def get_run_settings(partition) -> pd.DataFrame:
+    df = pd.DataFrame({column: np.asarray(partition[column]) for column in RUN_COLUMNS})
+    df['random_sort'] = df['random_sort'].astype(int)
+    return df
+
+
+def get_departure_kpis_from_store(late_minute_threshold: int, store_path) -> pd.DataFrame:
+    runs = []
+    for partition in load_result_store(store_path):
+        df_runs = get_run_settings(partition)
+        run_index = get_row_run_index(partition['departure_offsets'])
+        df_runs['total_cnt'] = np.diff(partition['departure_offsets'])
+        df_runs['late_cnt'] = np.bincount(run_index, weights=partition['departure_deltas'] >= late_minute_threshold, minlength=len(df_runs))
+        runs.append(df_runs)
+
+    df = pd.concat(runs).groupby(['random_sort', 'n_dcfc', 'vehicles', 'l2_station'])[['total_cnt', 'late_cnt']].sum().reset_index()
+    # like the sql version there is no row when no departures happened
+    df = df[df['total_cnt'] > 0]
+    df['pct_late'] = 100.0*(df['late_cnt'] / df['total_cnt'])
+
+    return df[['random_sort', 'n_dcfc', 'vehicles', 'l2_station', 'pct_late']].reset_index(drop=True)
+
+
+def get_power_stats_from_store(store_path) -> pd.DataFrame:
+    runs = []
+    for partition in load_result_store(store_path):
+        df_runs = get_run_settings(partition)
+        for column in ['max_power', 'min_power', 'avg_power']:
+            df_runs[column] = np.asarray(partition[column])
+        runs.append(df_runs)
+
+    df = pd.concat(runs).reset_index(drop=True)
+
+    return df[['n_dcfc', 'random_sort', 'l2_station', 'vehicles', 'max_power', 'min_power', 'avg_power']]
+
+
+def get_hourly_power_stats_from_store(store_path) -> pd.DataFrame:
+    runs = []
+    for partition in load_result_store(store_path):
+        df_runs = get_run_settings(partition)
+        # n runs x 24 hours, nan where no vehicle was charging
+        hourly_peak_power_kw = np.asarray(partition['hourly_peak_power_kw'])
+        run_index, hour = np.nonzero(~np.isnan(hourly_peak_power_kw))
+        runs.append(df_runs.iloc[run_index].reset_index(drop=True).assign(hour=hour, meter_power_kw=hourly_peak_power_kw[run_index, hour]))
+
+    df = pd.concat(runs).groupby(['random_sort', 'n_dcfc', 'l2_station', 'vehicles', 'hour'])['meter_power_kw'].max().reset_index()
+
+    return df.rename(columns={'meter_power_kw': 'max_hourly_power_kw'})
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+import json
+import os
+import unittest
+
+from src.asset_simulator.depot.asset_depot import AssetDepot
+from src.asset_simulator.depot_config.depot_config import AssetDepotConfig
+from src.asset_simulator.reservation.reservation import Reservation
+from src.mock_queue.mock_queue import MockQueue
+
+
+class TestAssetDepotCalendar(unittest.TestCase):
+
+    def get_asset_depot(self):
+        script_dir = os.path.dirname(__file__)
+        with open(os.path.join(script_dir, '../asset_simulator/depot_config/configs/hiker_9_to_5.json')) as f:
+            asset_sim_config = json.load(f)
+        asset_sim_config['vehicles']['sedan']['n'] = 3
+        asset_sim_config['n_l2_stations'] = 1
+        asset_sim_config['n_dcfc_stations'] = 0
+        return AssetDepot.build_depot(config=AssetDepotConfig(**asset_sim_config), queue=MockQueue())
+
+    def send_assignment(self, asset_depot, id, vehicle_id, departure, arrival):
+        reservation = Reservation(
+            id=id,
+            departure_timestamp_utc=departure,
+            arrival_timestamp_utc=arrival,
+            created_at_timestamp_utc=asset_depot.current_datetime,
+            vehicle_type='sedan',
+            state_of_charge=0.8,
+            walk_in=False,
+            status='created',
+            assigned_vehicle_id=vehicle_id
+        )
+        asset_depot.queue.reservation_assignments.append(json.dumps(reservation.dict(), default=str))
+
+    def test_departures_and_arrivals_by_bucket(self):
+        asset_depot = self.get_asset_depot()
+        start = asset_depot.current_datetime
+
+        # vehicle 1 is short of 80% and has to charge up before it can leave
+        asset_depot.vehicles[1].state_of_charge = 0.7
+        asset_depot.fleet_manager.plugin(1, 0)
+        asset_depot.vehicles[1].update_status()
+
+        self.send_assignment(asset_depot, '0', 0, start + timedelta(minutes=30), start + timedelta(hours=2))
+        self.send_assignment(asset_depot, '1', 1, start + timedelta(minutes=15), start + timedelta(hours=3))
+
+        departed_at = {}
+        arrived_at = {}
+        for interval in range(0, 16):
+            asset_depot.step_interval()
+            for reservation in asset_depot.reservations.values():
+                if reservation.status == 'active':
+                    departed_at.setdefault(reservation.id, asset_depot.current_datetime)
+            # completed reservations are dropped on arrival
+            for reservation_id in departed_at.keys() - asset_depot.reservations.keys():
+                arrived_at.setdefault(reservation_id, asset_depot.current_datetime)
+            asset_depot.increment_interval()
+
+        assert departed_at['0'] == start + timedelta(minutes=30)
+        # late departure once the vehicle reached 80%
+        assert departed_at['1'] > start + timedelta(minutes=15)
+        assert arrived_at == {'0': start + timedelta(hours=2), '1': start + timedelta(hours=3)}
+        assert len(asset_depot.pending_departure_ids) == 0
+        assert asset_depot.reservations == {} and asset_depot.reservation_order == {}
+        assert all(bucket > asset_depot.current_datetime for bucket in asset_depot.arrival_calendar.keys())
+
+    def test_off_grid_timestamps_use_next_interval(self):
+        asset_depot = self.get_asset_depot()
+        start = asset_depot.current_datetime
+
+        self.send_assignment(asset_depot, '0', 0, start + timedelta(minutes=20), start + timedelta(minutes=50))
+
+        for interval in range(0, 5):
+            asset_depot.step_interval()
+            asset_depot.increment_interval()
+
+        assert asset_depot.departure_snapshot['actual_departure_datetime'] == [start + timedelta(minutes=30)]
+        assert '0' not in asset_depot.reservations
+
+    def test_resent_assignment_departs_at_new_departure(self):
+        asset_depot = self.get_asset_depot()
+        start = asset_depot.current_datetime
+
+        self.send_assignment(asset_depot, '0', 0, start + timedelta(minutes=15), start + timedelta(hours=2))
+        asset_depot.step_interval()
+        asset_depot.increment_interval()
+
+        # departure moved out after the first assignment was bucketed
+        self.send_assignment(asset_depot, '0', 0, start + timedelta(hours=1), start + timedelta(hours=2))
+        for interval in range(0, 6):
+            asset_depot.step_interval()
+            asset_depot.increment_interval()
+
+        assert asset_depot.departure_snapshot['actual_departure_datetime'] == [start + timedelta(hours=1)]
+        assert asset_depot.reservations['0'].status == 'active'
+
+    def test_reservation_received_after_one_completes_is_scheduled(self):
+        asset_depot = self.get_asset_depot()
+        start = asset_depot.current_datetime
+
+        self.send_assignment(asset_depot, '0', 0, start + timedelta(minutes=15), start + timedelta(minutes=30))
+        for interval in range(0, 3):
+            asset_depot.step_interval()
+            asset_depot.increment_interval()
+        assert '0' not in asset_depot.reservations
+
+        # one reservation dropped and one added, each is scheduled as it is received
+        self.send_assignment(asset_depot, '1', 1, start + timedelta(hours=1), start + timedelta(hours=2))
+        asset_depot.step_interval()
+        assert asset_depot.reservation_order == {'1': 1}
+        assert asset_depot.departure_calendar[start + timedelta(hours=1)] == ['1']
+
+
+
+if __name__ == '__main__':
+    unittest.main()
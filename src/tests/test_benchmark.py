@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+
+from src.utils.benchmark import get_regressions, read_benchmark, run_benchmark, write_benchmark
+from src.utils.utils import SERVICES
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_benchmark_cases(self):
+        benchmark = run_benchmark([3], [1, 2], [2], n_dcfc=0, event_driven=True)
+        results = benchmark['results']
+
+        # heuristic and random_sort for every station count
+        assert len(results) == 4
+        assert [result['random_sort'] for result in results] == [False, True, False, True]
+        for result in results:
+            # two days of 15 minute intervals
+            assert result['n_intervals'] == 192
+            assert result['intervals_per_sec'] > 0
+            assert set(result['phase_seconds']) == set(SERVICES)
+            assert all(seconds > 0 for seconds in result['phase_seconds'].values())
+            assert sum(result['phase_seconds'].values()) <= result['seconds']
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            benchmark_path = os.path.join(tmp_dir, 'benchmark.json')
+            write_benchmark(benchmark, benchmark_path)
+            assert read_benchmark(benchmark_path) == benchmark
+
+    def test_regressions(self):
+        baseline = {'results': [
+            {'case': 'a', 'intervals_per_sec': 100.0},
+            {'case': 'b', 'intervals_per_sec': 100.0},
+            {'case': 'c', 'intervals_per_sec': 100.0}
+        ]}
+        benchmark = {'results': [
+            {'case': 'a', 'intervals_per_sec': 85.0},
+            {'case': 'b', 'intervals_per_sec': 70.0},
+            {'case': 'd', 'intervals_per_sec': 1.0}
+        ]}
+
+        # only b lost more than 20%, d has no baseline
+        regressions = get_regressions(benchmark, baseline, threshold=0.2)
+        assert [regression['case'] for regression in regressions] == ['b']
+        assert abs(regressions[0]['slowdown'] - 0.3) < 1e-9
+        assert len(get_regressions(benchmark, baseline, threshold=0.1)) == 2
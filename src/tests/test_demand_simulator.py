@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+import json
+import os
+import unittest
+
+import numpy as np
+
+from src.asset_simulator.vehicle.vehicle import Vehicle
+from src.demand_simulator.demand_simulator.demand_simulator import DemandSimulator
+from src.demand_simulator.demand_simulator_config.demand_simulator_config import DemandSimulatorConfig
+from src.mock_queue.mock_queue import MockQueue
+
+
+class TestDemandSimulator(unittest.TestCase):
+
+    def get_demand_simulator(self):
+        script_dir = os.path.dirname(__file__)
+        with open(os.path.join(script_dir, '../demand_simulator/demand_simulator_config/configs/5days_15min_40res_per_day.json')) as f:
+            demand_sim_config = json.load(f)
+        return DemandSimulator(config=DemandSimulatorConfig(**demand_sim_config), queue=MockQueue())
+
+    def test_daily_event_counts_match_interval_filter(self):
+        demand_simulator = self.get_demand_simulator()
+        config = demand_simulator.config
+
+        np.random.seed(1)
+        event_counts = demand_simulator.get_daily_event_counts('reservation')
+
+        # redraw the same day and count each interval with a plain filter
+        np.random.seed(1)
+        n_events_per_day = max(0, int(np.random.normal(loc=config.mean_reservations_per_day, scale=config.stdev_reservations_per_day)))
+        random_hour = np.random.normal(loc=config.mean_vehicle_departure_hour_of_day, scale=config.stdev_vehicle_departure_hours, size=n_events_per_day)
+        random_hour[random_hour < 0] = 0
+
+        current_datetime = datetime(year=2022, month=1, day=1)
+        for interval_idx in range(0, len(event_counts)):
+            fractional_hour = current_datetime.hour + current_datetime.minute/60
+            next_fractional_hour = fractional_hour + config.interval_seconds/3600
+            expected = len([x for x in random_hour if x > fractional_hour and x < next_fractional_hour])
+            assert event_counts[interval_idx] == expected
+            current_datetime += timedelta(seconds=config.interval_seconds)
+
+    def test_walk_ins_sampled_once_per_day(self):
+        demand_simulator = self.get_demand_simulator()
+        current_datetime = datetime(year=2022, month=1, day=1)
+
+        np.random.seed(0)
+        n_walk_ins = [demand_simulator.get_event('walk_in', current_datetime + timedelta(minutes=15*idx)) for idx in range(0, 96)]
+        np.random.seed(0)
+        assert n_walk_ins == demand_simulator.get_daily_event_counts('walk_in').tolist()
+
+    def test_reservations_24_hours_ahead(self):
+        demand_simulator = self.get_demand_simulator()
+        demand_simulator.vehicles = {
+            vehicle_id: Vehicle(id=vehicle_id, type='sedan', state_of_charge=0.8, energy_capacity_kwh=60, status='parked')
+            for vehicle_id in range(0, 5)
+        }
+        current_datetime = datetime(year=2022, month=1, day=1)
+
+        np.random.seed(0)
+        demand_simulator.generate_reservations_24_hours_ahead(current_datetime)
+        np.random.seed(0)
+        event_counts = demand_simulator.get_daily_event_counts('reservation')
+
+        reservations = list(demand_simulator.reservations.values())
+        assert len(reservations) == event_counts.sum()
+        departures = [reservation.departure_timestamp_utc for reservation in reservations]
+        assert departures == sorted(departures)
+        assert current_datetime < departures[0] and departures[-1] <= current_datetime + timedelta(hours=24)
+        for reservation in reservations:
+            duration_hours = (reservation.arrival_timestamp_utc - reservation.departure_timestamp_utc).total_seconds()/3600
+            assert duration_hours >= 2 and (duration_hours * 4) % 1 == 0
+
+    def test_next_event_is_the_next_sampling_interval(self):
+        demand_simulator = self.get_demand_simulator()
+        demand_simulator.current_datetime = datetime(year=2022, month=1, day=1, hour=6)
+        # nothing sampled for the day yet
+        assert demand_simulator.get_next_event_datetime() == demand_simulator.current_datetime
+
+        np.random.seed(0)
+        demand_simulator.run_interval()
+        demand_simulator.skip_intervals(3)
+        assert demand_simulator.current_datetime == datetime(year=2022, month=1, day=1, hour=6, minute=45)
+        assert demand_simulator.get_next_event_datetime() == datetime(year=2022, month=1, day=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
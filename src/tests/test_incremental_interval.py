@@ -0,0 +1,75 @@
+import json
+import os
+import random
+import unittest
+
+import numpy as np
+
+from src.asset_simulator.depot.asset_depot import AssetDepot
+from src.asset_simulator.depot_config.depot_config import AssetDepotConfig
+from src.demand_simulator.demand_simulator.demand_simulator import DemandSimulator
+from src.demand_simulator.demand_simulator_config.demand_simulator_config import DemandSimulatorConfig
+from src.heuristic.depot.algo_depot import AlgoDepot
+from src.mock_queue.mock_queue import MockQueue
+from src.utils.utils import RuntimeEnvironment
+
+
+class TestIncrementalInterval(unittest.TestCase):
+
+    def get_runtime(self, n_days=3):
+        mock_queue = MockQueue()
+        script_dir = os.path.dirname(__file__)
+
+        with open(os.path.join(script_dir, '../demand_simulator/demand_simulator_config/configs/5days_15min_40res_per_day.json')) as f:
+            demand_sim_config = json.load(f)
+        demand_sim_config['horizon_length_hours'] = n_days * 24
+        demand_simulator = DemandSimulator(config=DemandSimulatorConfig(**demand_sim_config), queue=mock_queue)
+
+        with open(os.path.join(script_dir, '../asset_simulator/depot_config/configs/hiker_9_to_5.json')) as f:
+            asset_sim_config = json.load(f)
+        asset_sim_config['vehicles']['sedan']['n'] = 25
+        asset_sim_config['n_l2_stations'] = 4
+        asset_sim_config['n_dcfc_stations'] = 1
+        asset_depot = AssetDepot.build_depot(config=AssetDepotConfig(**asset_sim_config), queue=mock_queue)
+
+        asset_sim_config['minimum_ready_vehicle_pool'] = {'sedan': 2, 'crossover': 2, 'suv': 2}
+        algo_depot = AlgoDepot.build_depot(config=AssetDepotConfig(**asset_sim_config), queue=mock_queue)
+
+        return RuntimeEnvironment(
+            mock_queue=mock_queue,
+            demand_simulator=demand_simulator,
+            asset_simulator=asset_depot,
+            heuristic=algo_depot,
+            queue=mock_queue
+        )
+
+    def run_seeded(self, **kwargs):
+        random.seed(0)
+        np.random.seed(0)
+        runtime = self.get_runtime()
+        runtime.run(plot_output=False, **kwargs)
+
+        asset_simulator = runtime.asset_simulator
+        move_charge = {
+            vehicle_id: [(vehicle.updated_at, vehicle.connected_station_id) for vehicle in instructions]
+            for vehicle_id, instructions in asset_simulator.move_charge_snapshot.items()
+        }
+        return (
+            asset_simulator.vehicle_soc_snapshot,
+            asset_simulator.vehicle_status_snapshot,
+            asset_simulator.power_snapshot,
+            asset_simulator.departure_snapshot['vehicle_id'],
+            asset_simulator.departure_snapshot['actual_departure_datetime'],
+            move_charge
+        )
+
+    def test_incremental_matches_full_recompute(self):
+        assert self.run_seeded(incremental=True) == self.run_seeded(incremental=False)
+
+    def test_incremental_matches_full_recompute_min_cost(self):
+        assert self.run_seeded(incremental=True, assignment_engine='min_cost') == \
+               self.run_seeded(incremental=False, assignment_engine='min_cost')
+
+
+if __name__ == '__main__':
+    unittest.main()
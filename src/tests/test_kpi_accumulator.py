@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+import unittest
+
+from src.asset_simulator.depot.kpi_accumulator import KpiAccumulator
+from src.utils.result_db import get_hourly_peak_power, get_power_stats
+
+
+class TestKpiAccumulator(unittest.TestCase):
+
+    def test_departure_deltas(self):
+        start = datetime(year=2022, month=1, day=1)
+        kpi_accumulator = KpiAccumulator()
+
+        # same reservations as RuntimeEnvironment.get_departure_deltas is tested with,
+        # 'b' is sent twice and 'c' never departs
+        kpi_accumulator.add_assignment(None, 'd', start)
+        kpi_accumulator.add_assignment(1, 'a', start)
+        kpi_accumulator.add_assignment(1, 'b', start + timedelta(hours=1))
+        kpi_accumulator.add_assignment(2, 'c', start + timedelta(hours=4))
+        kpi_accumulator.add_assignment(2, 'b', start + timedelta(hours=1))
+        kpi_accumulator.add_departure(2, 'b', start + timedelta(hours=1), start + timedelta(hours=1))
+        kpi_accumulator.add_departure(1, 'a', start, start + timedelta(minutes=45))
+        # only the first departure counts, a later assignment gets its delta straight away
+        kpi_accumulator.add_departure(1, 'a', start, start + timedelta(hours=2))
+        kpi_accumulator.add_assignment(1, 'a', start)
+        kpi_accumulator.finish(start + timedelta(hours=10))
+
+        assert sorted(kpi_accumulator.departure_deltas) == [0.0, 45.0, 45.0, 360.0, 540.0]
+        assert sum(kpi_accumulator.late_histogram) == 5
+        assert kpi_accumulator.get_pct_late(60) == 40.0
+
+    def test_power_matches_snapshot(self):
+        start = datetime(year=2022, month=1, day=1)
+        power_snapshot = {
+            start: 10.0,
+            start + timedelta(minutes=15): 30.0,
+            start + timedelta(hours=1): 20.0,
+            start + timedelta(hours=1, minutes=15): 5.0
+        }
+        kpi_accumulator = KpiAccumulator()
+        for current_datetime, meter_power_kw in power_snapshot.items():
+            kpi_accumulator.add_meter_power(current_datetime, meter_power_kw)
+
+        assert kpi_accumulator.get_power_stats() == get_power_stats({'power_snapshot': power_snapshot})
+        assert kpi_accumulator.get_hourly_peak_power() == get_hourly_peak_power({'power_snapshot': power_snapshot}) == {0: 30.0, 1: 20.0}
+
+
+if __name__ == '__main__':
+    unittest.main()
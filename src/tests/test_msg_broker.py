@@ -0,0 +1,88 @@
+import json
+import os
+import unittest
+
+from src.asset_simulator.depot.asset_depot import AssetDepot
+from src.asset_simulator.depot_config.depot_config import AssetDepotConfig
+from src.heuristic.depot.algo_depot import AlgoDepot
+from src.mock_queue.mock_queue import MockQueue
+
+
+class TestMsgBroker(unittest.TestCase):
+
+    def get_depots(self):
+        mock_queue = MockQueue()
+        script_dir = os.path.dirname(__file__)
+        with open(os.path.join(script_dir, '../asset_simulator/depot_config/configs/hiker_9_to_5.json')) as f:
+            asset_sim_config = json.load(f)
+        asset_sim_config['vehicles']['sedan']['n'] = 25
+        asset_sim_config['n_l2_stations'] = 4
+        asset_sim_config['n_dcfc_stations'] = 1
+        asset_depot = AssetDepot.build_depot(config=AssetDepotConfig(**asset_sim_config), queue=mock_queue)
+        algo_depot = AlgoDepot.build_depot(config=AssetDepotConfig(**asset_sim_config), queue=mock_queue)
+        return asset_depot, algo_depot
+
+    def test_only_changed_vehicles_are_published(self):
+        asset_depot, _ = self.get_depots()
+        asset_depot.keyframe_every_n_publishes = 3
+
+        asset_depot.publish_state(demand_simulator=False)
+        assert len(asset_depot.queue.vehicles_heuristic) == len(asset_depot.vehicles)
+        asset_depot.queue.vehicles_heuristic = []
+        asset_depot.queue.stations = []
+
+        asset_depot.vehicles[4].state_of_charge = 0.5
+        asset_depot.publish_state(demand_simulator=False)
+        assert [json.loads(message)['id'] for message in asset_depot.queue.vehicles_heuristic] == [4]
+        assert asset_depot.queue.stations == []
+        asset_depot.queue.vehicles_heuristic = []
+
+        # keyframe
+        asset_depot.publish_state(demand_simulator=False)
+        asset_depot.publish_state(demand_simulator=False)
+        assert len(asset_depot.queue.vehicles_heuristic) == len(asset_depot.vehicles)
+        assert len(asset_depot.queue.stations) == 5
+
+    def test_deltas_add_up_to_the_published_state(self):
+        asset_depot, algo_depot = self.get_depots()
+        current_datetime = asset_depot.current_datetime
+        station_id = next(iter(asset_depot.stations))
+
+        edits = [
+            lambda: None,
+            lambda: setattr(asset_depot.vehicles[4], 'state_of_charge', 0.5),
+            lambda: asset_depot.fleet_manager.plugin(2, station_id),
+            lambda: None,
+            lambda: asset_depot.fleet_manager.unplug(2, current_datetime),
+        ]
+        for edit in edits:
+            edit()
+            asset_depot.publish_state(demand_simulator=False)
+            algo_depot.poll_queues()
+            assert {vehicle_id: vehicle.dict() for vehicle_id, vehicle in algo_depot.vehicles.items()} == \
+                   {vehicle_id: vehicle.dict() for vehicle_id, vehicle in asset_depot.vehicles.items()}
+            assert {station_id: station.dict() for station_id, station in algo_depot.stations.items()} == \
+                   {station_id: station.dict() for station_id, station in asset_depot.stations.items()}
+
+    def test_subscribe_to_changes_only_replaces_changed_objects(self):
+        asset_depot, heuristic = self.get_depots()
+        asset_depot.publish_state(demand_simulator=False)
+        heuristic.poll_queues()
+        station_id = next(iter(heuristic.stations))
+        untouched_station = heuristic.stations[station_id]
+        vehicle_id = next(vehicle.id for vehicle in heuristic.vehicles.values() if vehicle.connected_station_id is None)
+        untouched_vehicles = dict(heuristic.vehicles)
+
+        heuristic.plugin(vehicle_id, station_id)
+        assert heuristic.vehicles[vehicle_id].connected_station_id == station_id
+
+        # nothing published since, only the local plugin is dropped
+        assert set(heuristic.subscribe_to_changes('vehicles', 'vehicle', 'vehicles_heuristic')) == {vehicle_id}
+        assert heuristic.subscribe_to_changes('stations', 'station', 'stations') == [station_id]
+        assert heuristic.vehicles[vehicle_id].connected_station_id is None
+        assert heuristic.stations[station_id] is not untouched_station
+        assert all(heuristic.vehicles[other_id] is vehicle for other_id, vehicle in untouched_vehicles.items() if other_id != vehicle_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+import os
+import tempfile
+import unittest
+
+from src.instrumentation import op_counters
+from src.instrumentation.op_counters import count_op, counting, end_op_interval
+from src.plotter.plotter_data import get_op_counts
+from src.utils.single_run import single_run
+
+
+class TestOpCounters(unittest.TestCase):
+
+    def test_disabled_is_noop(self):
+        assert op_counters.active_counters is None
+        count_op('overlap_comparisons', 3)
+        end_op_interval(datetime(year=2022, month=1, day=1))
+
+    def test_interval_counts(self):
+        start = datetime(year=2022, month=1, day=1)
+        with counting() as counters:
+            count_op('station_scans', 2)
+            count_op('station_scans')
+            end_op_interval(start)
+            end_op_interval(start + timedelta(minutes=15))
+            count_op('move_charge_scans', 4)
+            end_op_interval(start + timedelta(minutes=30))
+        assert op_counters.active_counters is None
+
+        assert counters.get_records() == [
+            (start, 'station_scans', 3),
+            (start + timedelta(minutes=30), 'move_charge_scans', 4)
+        ]
+        df_counts = counters.get_frame()
+        assert df_counts.columns.tolist() == ['move_charge_scans', 'station_scans']
+        assert df_counts['station_scans'].tolist() == [3, 0, 0]
+
+    def test_single_run_counts(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, 'test.db')
+            run_result = single_run(1, 10, 0, 0, 3, 1, False, 'hiker_9_to_5.json', event_driven=True, transport='json', seed=0, db_path=db_path, count_ops=True)
+            df_op_counts = get_op_counts(db_path)
+
+        totals = {}
+        for interval_datetime, counter, count in run_result['op_counts']:
+            totals[counter] = totals.get(counter, 0) + count
+        assert totals['overlap_comparisons'] > 0
+        assert totals['station_scans'] > 0
+        assert totals['queue_json_bytes[vehicles_heuristic]'] > totals['queue_messages[vehicles_heuristic]'] > 0
+
+        # persisted with the rest of the run
+        assert len(df_op_counts) == len(run_result['op_counts'])
+        assert df_op_counts['vehicles'].unique().tolist() == [10]
+        assert df_op_counts.groupby('counter')['count'].sum()['overlap_comparisons'] == totals['overlap_comparisons']
@@ -0,0 +1,69 @@
+import os
+import pstats
+import tempfile
+import unittest
+
+from src.instrumentation import phase_profiler
+from src.instrumentation.phase_profiler import PhaseProfiler, PhaseStats, profile_phase, profiling
+from src.utils.single_run import single_run
+
+
+class Broker:
+
+    @profile_phase('broker.publish', label_arg='route')
+    def publish(self, attribute_name, route):
+        return route
+
+    @profile_phase('broker.poll')
+    def poll(self):
+        return 'polled'
+
+
+class TestPhaseProfiler(unittest.TestCase):
+
+    def test_disabled_calls_through(self):
+        broker = Broker()
+        assert phase_profiler.active_profiler is None
+        assert broker.poll() == 'polled'
+        assert broker.publish.__name__ == 'publish'
+
+    def test_phase_stats(self):
+        with profiling() as profiler:
+            broker = Broker()
+            broker.poll()
+            broker.poll()
+            broker.publish('vehicles', 'vehicles_heuristic')
+            broker.publish('stations', route='stations')
+            with profiling() as inner_profiler:
+                broker.poll()
+            # the outer profiler is back once the inner block ends
+            assert phase_profiler.active_profiler is profiler
+        assert phase_profiler.active_profiler is None
+
+        assert set(profiler.phases) == {'broker.poll', 'broker.publish[vehicles_heuristic]', 'broker.publish[stations]'}
+        assert profiler.phases['broker.poll'].calls == 2
+        assert inner_profiler.phases['broker.poll'].calls == 1
+        for row in profiler.get_summary():
+            assert sum(row['histogram']) == row['calls']
+            assert row['p50_ms'] <= row['p95_ms'] <= row['max_ms']
+
+    def test_histogram_bins(self):
+        phase_stats = PhaseStats()
+        # 3us, 3us, 100us and 1s land in bins [2, 4), [64, 128) and [2**19, 2**20) microseconds
+        for seconds in [3e-6, 3e-6, 100e-6, 1.0]:
+            phase_stats.record(seconds)
+        assert phase_stats.histogram[1] == 2 and phase_stats.histogram[6] == 1 and phase_stats.histogram[19] == 1
+        assert phase_stats.get_quantile_seconds(0.5) == 4e-6
+        assert phase_stats.get_quantile_seconds(1.0) == 1.0
+
+    def test_single_run_profile(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cprofile_path = os.path.join(tmp_dir, 'run.prof')
+            run_result = single_run(1, 5, 0, 0, 2, 1, False, 'hiker_9_to_5.json', write_results=False, event_driven=True, seed=0, cprofile_path=cprofile_path)
+            assert len(pstats.Stats(cprofile_path).stats) > 0
+
+        phases = {row['phase']: row for row in run_result['phase_profile']}
+        # demand runs every interval
+        assert phases['demand.run_interval']['calls'] == phases['msg_broker.subscribe_to_queue[vehicles_demand_sim]']['calls']
+        assert 'asset.depart_vehicles' in phases
+        assert 'heuristic.assign_charging_stations_to_reservations' in phases
@@ -0,0 +1,93 @@
+from datetime import datetime
+import unittest
+
+from src.asset_simulator.reservation.reservation import Reservation
+from src.asset_simulator.reservation.reservation_record import ReservationRecord
+from src.asset_simulator.station.station import Station
+from src.asset_simulator.station.station_record import StationRecord
+from src.asset_simulator.vehicle.vehicle import Vehicle
+from src.asset_simulator.vehicle.vehicle_record import VehicleRecord
+from src.mock_queue.mock_queue import MockQueue
+from src.mock_queue.transport import InProcessTransport, JsonTransport, Transport
+from src.utils.scale_harness import get_object_memory
+
+
+class TestRecords(unittest.TestCase):
+
+    def get_vehicle_values(self):
+        return {
+            'id': 3,
+            'connected_station_id': None,
+            'type': 'sedan',
+            'state_of_charge': 0.5,
+            'energy_capacity_kwh': 40,
+            'status': 'parked'
+        }
+
+    def test_defaults_match_model(self):
+        vehicle = VehicleRecord(**self.get_vehicle_values())
+        assert vehicle == Vehicle(**self.get_vehicle_values())
+        assert vehicle.dict() == Vehicle(**self.get_vehicle_values()).dict()
+
+        reservation_values = {
+            'id': 'res_0',
+            'departure_timestamp_utc': datetime(year=2022, month=1, day=1, hour=9),
+            'arrival_timestamp_utc': datetime(year=2022, month=1, day=1, hour=17),
+            'created_at_timestamp_utc': datetime(year=2022, month=1, day=1),
+            'vehicle_type': 'sedan',
+            'state_of_charge': 0.8,
+            'status': 'created'
+        }
+        reservation = ReservationRecord(**reservation_values)
+        assert reservation.walk_in is False
+        assert reservation.assigned_vehicle_id is None
+        assert reservation.to_model() == Reservation(**reservation_values)
+
+    def test_behaviour_shared_with_model(self):
+        vehicle = VehicleRecord(**self.get_vehicle_values())
+        model = Vehicle(**self.get_vehicle_values())
+        current_datetime = datetime(year=2022, month=1, day=1)
+        for charged_vehicle in [vehicle, model]:
+            charged_vehicle._plugin(1)
+            charged_vehicle.charge(900, 7.2, current_datetime)
+            charged_vehicle.add_log(current_datetime)
+        assert vehicle.dict() == model.dict()
+        assert vehicle.log is not model.log
+
+        station = StationRecord(id=0, type='L2', max_power_kw=7.2, last_unplugged=current_datetime)
+        station._plugin(vehicle.id)
+        assert station.is_l2() and not station.is_available()
+
+    def test_version_and_copy(self):
+        vehicle = VehicleRecord(**self.get_vehicle_values())
+        version = vehicle._version
+        vehicle.status = 'parked'
+        assert vehicle._version == version
+
+        vehicle_copy = vehicle.copy()
+        vehicle.status = 'driving'
+        assert vehicle._version > version
+        # the copy keeps the version it was taken at, see MsgBroker.subscribe_to_changes
+        assert vehicle_copy._version == version
+        assert vehicle_copy.status == 'parked'
+
+    def test_transports_decode_records(self):
+        vehicle = VehicleRecord(**self.get_vehicle_values())
+        for transport in [InProcessTransport(), JsonTransport()]:
+            decoded = transport.decode(transport.encode(vehicle), Vehicle)
+            assert isinstance(decoded, VehicleRecord)
+            assert decoded == vehicle
+
+        # json messages are still validated on the way in
+        with self.assertRaises(ValueError):
+            JsonTransport().decode('{"id": "not an id"}', Vehicle)
+
+        # transports have to implement both directions
+        with self.assertRaises(TypeError):
+            Transport()
+        assert isinstance(MockQueue().transport, JsonTransport)
+
+    def test_record_memory(self):
+        object_memory = {(row['object'], row['representation']): row['bytes_per_object'] for row in get_object_memory(200)}
+        assert object_memory[('Vehicle', 'VehicleRecord')] < object_memory[('Vehicle', 'pydantic')]
+        assert object_memory[('Reservation', 'ReservationRecord')] < object_memory[('Reservation', 'pydantic')]
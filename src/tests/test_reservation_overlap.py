@@ -1,6 +1,7 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import os
+import random
 import unittest
 
 from src.demand_simulator.demand_simulator_config.demand_simulator_config import DemandSimulatorConfig
@@ -8,6 +9,7 @@ from src.demand_simulator.demand_simulator.demand_simulator import DemandSimulat
 from src.mock_queue.mock_queue import MockQueue
 from src.asset_simulator.reservation.reservation import Reservation
 from src.asset_simulator.vehicle.vehicle import Vehicle
+from src.heuristic.schedule.reservation_calendar import ReservationCalendar
 from src.tests.test_veh_res_assignment import TestVehicleReservationAssignment
 
 class TestReservationOverlap(unittest.TestCase):
@@ -196,9 +198,74 @@ class TestReservationOverlap(unittest.TestCase):
         # make sure the algo function to detect prior reservations is working
         algo_depot = TestVehicleReservationAssignment.get_algo_depot()
         algo_depot.past_reservation_assignments = {res1.id: res1}
+        algo_depot.rebuild_reservation_calendar()
         overlapping_vehicles = algo_depot.get_vehicles_with_overlapping_reservations(res2)
         print(overlapping_vehicles)
 
+    def test_reservation_calendar_matches_pairwise_overlap(self):
+        """
+        the calendar index must return the same vehicles as checking every past reservation
+        :return:
+        """
+        random.seed(0)
+        start = datetime(year=2022, month=1, day=1)
+        past_reservations = []
+        for idx in range(0, 200):
+            departure = start + timedelta(minutes=15 * random.randint(0, 96 * 14))
+            arrival = departure + timedelta(minutes=15 * random.randint(0, 96 * 2))
+            past_reservations.append(
+                self.get_reservation(
+                    id=idx,
+                    departure=departure,
+                    arrival=arrival,
+                    vehicle_type='sedan',
+                    walk_in=False,
+                    assigned_vehicle_id=random.randint(0, 30)
+                )
+            )
+        calendar = ReservationCalendar.from_reservations(past_reservations)
+
+        for idx in range(0, 200):
+            departure = start + timedelta(minutes=15 * random.randint(0, 96 * 14))
+            new_res = self.get_reservation(
+                id='new',
+                departure=departure,
+                arrival=departure + timedelta(minutes=15 * random.randint(0, 96 * 2)),
+                vehicle_type='sedan',
+                walk_in=False
+            )
+            expected = [
+                res.assigned_vehicle_id for res in past_reservations
+                if DemandSimulator.reservation_does_overlap(new_res, res.departure_timestamp_utc, res.arrival_timestamp_utc)
+            ]
+            busy = calendar.get_busy_vehicle_ids(new_res.departure_timestamp_utc, new_res.arrival_timestamp_utc)
+            assert sorted(busy) == sorted(expected)
+
+    def test_reservation_calendar_reassignment(self):
+        """
+        re-assigning a reservation moves it to the new vehicle and pruning drops arrived reservations
+        :return:
+        """
+        res1 = self.get_reservation(
+            id=1,
+            departure=datetime(year=2022, month=1, day=2, hour=16),
+            arrival=datetime(year=2022, month=1, day=3, hour=14, minute=15),
+            vehicle_type='sedan',
+            walk_in=False,
+            assigned_vehicle_id=1
+        )
+        calendar = ReservationCalendar.from_reservations([res1])
+
+        res1.assigned_vehicle_id = 2
+        calendar.add(res1)
+        busy = calendar.get_busy_vehicle_ids(datetime(year=2022, month=1, day=3, hour=7), datetime(year=2022, month=1, day=4))
+        assert busy == [2]
+
+        calendar.prune(datetime(year=2022, month=1, day=5))
+        busy = calendar.get_busy_vehicle_ids(datetime(year=2022, month=1, day=3, hour=7), datetime(year=2022, month=1, day=4))
+        assert busy == []
+        assert len(calendar.intervals) == 0
+
 
     def test_non_overlapping_reservation_detection_1(self):
         """
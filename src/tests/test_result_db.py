@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from src.plotter.plotter_data import get_departure_kpis, get_hourly_power_stats, get_power_stats
+from src.utils.result_db import connect_result_db, get_completed_run_keys, write_run_results
+
+
+class TestResultDb(unittest.TestCase):
+
+    def get_run_result(self, run_key, vehicles, departure_deltas):
+        start = datetime(year=2022, month=1, day=1)
+        return {
+            'run_key': run_key,
+            'random_sort': False,
+            'vehicles': vehicles,
+            'l2_station': 2,
+            'n_dcfc': 1,
+            'departure_deltas': departure_deltas,
+            'power_snapshot': {start + timedelta(minutes=15*idx): float(idx) for idx in range(0, 8)}
+        }
+
+    def test_write_and_read_kpis(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, 'test.db')
+            con = connect_result_db(db_path)
+            write_run_results(con, [self.get_run_result('a', 5, [0.0, 90.0]), self.get_run_result(None, 10, [0.0, 0.0, 0.0, 75.0])])
+            con.close()
+
+            assert get_completed_run_keys(db_path) == {'a'}
+
+            df_kpis = get_departure_kpis(late_minute_threshold=60, db_path=db_path).sort_values('vehicles')
+            assert df_kpis['pct_late'].tolist() == [50.0, 25.0]
+
+            df_power_stats = get_power_stats(db_path)
+            assert df_power_stats['max_power'].tolist() == [7.0, 7.0]
+            assert df_power_stats['avg_power'].tolist() == [3.5, 3.5]
+
+            df_hourly_power = get_hourly_power_stats(db_path)
+            assert sorted(df_hourly_power['max_hourly_power_kw'].tolist()) == [3.0, 3.0, 7.0, 7.0]
+
+            # every row points back to its run
+            con = sqlite3.connect(db_path)
+            n_departures = dict(con.execute("SELECT runs.vehicles, count(1) FROM late_departures JOIN runs USING (run_id) GROUP BY 1"))
+            assert n_departures == {5: 2, 10: 4}
+            con.close()
+
+    def test_failed_write_is_rolled_back(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, 'test.db')
+            con = connect_result_db(db_path)
+            write_run_results(con, [self.get_run_result('a', 5, [0.0])])
+
+            # the same run key can only be written once
+            with self.assertRaises(sqlite3.IntegrityError):
+                write_run_results(con, [self.get_run_result('b', 5, [0.0]), self.get_run_result('a', 5, [0.0])])
+
+            assert con.execute("SELECT count(1) FROM late_departures").fetchone() == (1,)
+            con.close()
+            assert get_completed_run_keys(db_path) == {'a'}
+
+    def test_old_db_gets_run_id(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, 'test.db')
+            con = sqlite3.connect(db_path)
+            con.execute("CREATE TABLE late_departures(departure_id INTEGER PRIMARY KEY, random_sort INTEGER NOT NULL, vehicles INTEGER, l2_station INTEGER, departure_deltas REAL, n_dcfc INTEGER)")
+            con.execute("INSERT INTO late_departures(random_sort, vehicles, l2_station, departure_deltas, n_dcfc) VALUES(0, 5, 2, 10.0, 1)")
+            con.execute("CREATE TABLE completed_runs(run_key TEXT PRIMARY KEY)")
+            con.execute("INSERT INTO completed_runs(run_key) VALUES('old')")
+            con.commit()
+            con.close()
+
+            con = connect_result_db(db_path)
+            write_run_results(con, [self.get_run_result('a', 5, [0.0])])
+            assert con.execute("SELECT run_id FROM late_departures ORDER BY departure_id").fetchall() == [(None,), (1,)]
+            assert con.execute("SELECT name FROM sqlite_master WHERE name = 'completed_runs'").fetchall() == []
+            con.close()
+            assert get_completed_run_keys(db_path) == {'a'}
+
+
+if __name__ == '__main__':
+    unittest.main()
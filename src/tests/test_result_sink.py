@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+import multiprocessing
+import os
+import queue
+import sqlite3
+import tempfile
+import unittest
+
+from src.utils.result_db import connect_result_db, get_completed_run_keys
+from src.utils.result_sink import ResultSink, run_result_sink
+from src.utils.result_store import get_partition_paths, get_result_store_run_keys, load_result_store
+
+
+def put_run_results(result_queue, worker_idx, n_runs):
+    start = datetime(year=2022, month=1, day=1)
+    for run_idx in range(0, n_runs):
+        result_queue.put({
+            'run_key': str(worker_idx) + '_' + str(run_idx),
+            'random_sort': False,
+            'vehicles': worker_idx,
+            'l2_station': run_idx,
+            'n_dcfc': 0,
+            'departure_deltas': [0.0, 30.0, 90.0],
+            'power_snapshot': {start + timedelta(minutes=15*idx): float(idx) for idx in range(0, 96)}
+        })
+
+
+class TestResultSink(unittest.TestCase):
+
+    def test_results_from_many_workers(self):
+        n_workers = 8
+        n_runs = 20
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, 'test.db')
+            store_path = os.path.join(tmp_dir, 'store')
+            with ResultSink(db_path=db_path, batch_size=7, store_path=store_path) as result_sink:
+                workers = [
+                    multiprocessing.Process(target=put_run_results, args=(result_sink.queue, worker_idx, n_runs))
+                    for worker_idx in range(0, n_workers)
+                ]
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+
+            assert len(get_completed_run_keys(db_path)) == n_workers * n_runs
+            con = connect_result_db(db_path)
+            assert con.execute("SELECT count(1) FROM late_departures").fetchone() == (n_workers * n_runs * 3,)
+            assert con.execute("SELECT count(1) FROM hourly_power_stats").fetchone() == (n_workers * n_runs * 96,)
+            con.close()
+
+            # one partition per batch written to the db
+            partitions = load_result_store(store_path)
+            assert len(partitions) > 1
+            assert get_result_store_run_keys(store_path) == get_completed_run_keys(db_path)
+            assert sum(len(partition['run_key']) for partition in partitions) == n_workers * n_runs
+            assert sum(len(partition['meter_power_kw']) for partition in partitions) == n_workers * n_runs * 96
+
+    def test_store_is_written_with_each_batch(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, 'test.db')
+            store_path = os.path.join(tmp_dir, 'store')
+            result_queue = queue.Queue()
+            put_run_results(result_queue, 0, 3)
+            # the second batch fails to go into the db, the sink dies like it would on a crash
+            put_run_results(result_queue, 0, 1)
+            with self.assertRaises(sqlite3.IntegrityError):
+                run_result_sink(result_queue, db_path, batch_size=2, flush_seconds=60, store_path=store_path)
+            assert len(get_partition_paths(store_path)) == 2
+            assert get_completed_run_keys(db_path) == {'0_0', '0_1'}
+            assert get_result_store_run_keys(store_path) == {'0_0', '0_1', '0_2'}
+
+            # a resumed sweep reruns what the db is missing without storing it twice
+            put_run_results(result_queue, 0, 3)
+            run_results = [result_queue.get() for run_idx in range(0, 3)]
+            result_queue.put(run_results[2])
+            result_queue.put(None)
+            run_result_sink(result_queue, db_path, batch_size=2, flush_seconds=60, store_path=store_path)
+            assert get_completed_run_keys(db_path) == get_result_store_run_keys(store_path)
+            assert sum(len(partition['run_key']) for partition in load_result_store(store_path)) == 3
+
+    def test_failed_write_is_reported(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(RuntimeError):
+                with ResultSink(db_path=os.path.join(tmp_dir, 'test.db')) as result_sink:
+                    # the same run key twice
+                    put_run_results(result_sink.queue, 0, 1)
+                    put_run_results(result_sink.queue, 0, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
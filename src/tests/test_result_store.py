@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.plotter.plotter_data import get_departure_kpis, get_departure_kpis_from_store, get_hourly_power_stats, \
+    get_hourly_power_stats_from_store, get_power_stats, get_power_stats_from_store
+from src.utils.result_db import connect_result_db, write_run_results
+from src.utils.result_store import load_result_store, write_result_store
+
+
+class TestResultStore(unittest.TestCase):
+
+    def get_run_results(self):
+        rng = np.random.default_rng(0)
+        start = datetime(year=2022, month=1, day=1)
+        run_results = []
+        for run_idx, (random_sort, vehicles, l2_station) in enumerate([(False, 5, 1), (True, 5, 1), (False, 5, 1), (False, 15, 3)]):
+            run_results.append({
+                'run_key': str(run_idx),
+                'random_sort': random_sort,
+                'vehicles': vehicles,
+                'l2_station': l2_station,
+                'n_dcfc': 1,
+                'departure_deltas': rng.uniform(0, 180, size=10 + run_idx).tolist(),
+                'power_snapshot': {start + timedelta(minutes=15*idx): float(rng.uniform(0, 50)) for idx in range(0, 192)}
+            })
+        # a run that streamed its KPIs, only its hourly peaks are kept
+        run_results.append({
+            'run_key': '4',
+            'random_sort': False,
+            'vehicles': 25,
+            'l2_station': 3,
+            'n_dcfc': 1,
+            'departure_deltas': rng.uniform(0, 180, size=10).tolist(),
+            'power_snapshot': {},
+            'power_stats': {'max_power': 60.0, 'min_power': 7.2, 'avg_power': 30.0},
+            'hourly_peak_power': {hour: float(rng.uniform(7.2, 60)) for hour in range(6, 18)}
+        })
+        return run_results
+
+    def test_store_matches_db(self):
+        run_results = self.get_run_results()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, 'test.db')
+            con = connect_result_db(db_path)
+            write_run_results(con, run_results)
+            con.close()
+
+            # two sweeps added to the same store
+            store_path = os.path.join(tmp_dir, 'store')
+            write_result_store(store_path, run_results[:1])
+            write_result_store(store_path, run_results[1:])
+
+            partitions = load_result_store(store_path)
+            assert len(partitions) == 2
+            # hourly peaks never mix with the meter power of every interval
+            assert len(partitions[1]['meter_power_kw']) == 3 * 192
+            assert partitions[1]['hourly_peak_power_kw'].shape == (4, 24)
+            con = connect_result_db(db_path)
+            assert con.execute("SELECT count(1) FROM hourly_power_stats WHERE vehicles = 25").fetchone() == (0,)
+            assert con.execute("SELECT count(1) FROM hourly_peak_power").fetchone() == (12,)
+            con.close()
+            assert isinstance(partitions[1]['departure_deltas'], np.memmap)
+            assert partitions[1]['departure_deltas'][partitions[1]['departure_offsets'][1]] == run_results[2]['departure_deltas'][0]
+
+            sort_columns = ['random_sort', 'n_dcfc', 'vehicles', 'l2_station']
+            df_db = get_departure_kpis(late_minute_threshold=60, db_path=db_path).sort_values(sort_columns).reset_index(drop=True)
+            df_store = get_departure_kpis_from_store(late_minute_threshold=60, store_path=store_path).sort_values(sort_columns).reset_index(drop=True)
+            assert np.allclose(df_db['pct_late'], df_store['pct_late'])
+            assert df_db[sort_columns].equals(df_store[sort_columns])
+
+            df_db = get_power_stats(db_path).sort_values(['random_sort', 'vehicles', 'max_power']).reset_index(drop=True)
+            df_store = get_power_stats_from_store(store_path).sort_values(['random_sort', 'vehicles', 'max_power']).reset_index(drop=True)
+            assert np.allclose(df_db[['max_power', 'min_power', 'avg_power']], df_store[['max_power', 'min_power', 'avg_power']])
+
+            df_db = get_hourly_power_stats(db_path)
+            df_store = get_hourly_power_stats_from_store(store_path)
+            assert len(df_db) == len(df_store) == 3 * 24 + 12
+            assert np.allclose(df_db['max_hourly_power_kw'], df_store['max_hourly_power_kw'])
+            assert (df_db['hour'].to_numpy() == df_store['hour'].to_numpy()).all()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+
+from src.utils.scale_harness import format_object_memory_table, format_scale_table, get_object_memory, get_scale_configs, run_scale_case_in_process
+from src.utils.utils import SERVICES
+
+
+class TestScaleHarness(unittest.TestCase):
+
+    def test_scale_configs(self):
+        demand_sim_config, asset_sim_config = get_scale_configs(1000, n_intervals=8)
+        assert asset_sim_config['vehicles']['sedan']['n'] == 1000
+        assert asset_sim_config['n_l2_stations'] == 400
+        assert asset_sim_config['n_dcfc_stations'] == 50
+        assert demand_sim_config['mean_reservations_per_day'] == 700
+        # 8 15 minute intervals
+        assert demand_sim_config['horizon_length_hours'] == 2
+
+    def test_scale_case(self):
+        result = run_scale_case_in_process(50, n_intervals=8)
+        assert result['n_intervals'] == 8
+        assert result['l2_stations'] == 20
+        assert result['peak_rss_mb'] >= result['rss_before_build_mb'] > 0
+        assert result['interval_ms_max'] >= result['interval_ms_p95'] >= result['interval_ms_p50'] > 0
+        assert set(result['phase_seconds']) == set(SERVICES)
+        assert sum(result['phase_seconds'].values()) <= result['run_seconds']
+        assert '| 50 | 20 / 2 |' in format_scale_table([result])
+
+    def test_object_memory(self):
+        object_memory = {(row['object'], row['representation']): row['bytes_per_object'] for row in get_object_memory(200)}
+        assert all(bytes_per_object > 0 for bytes_per_object in object_memory.values())
+        # the arrays only hold the per interval values so a row is far smaller than the model
+        assert object_memory[('Vehicle', 'VehicleFleetState row')] < object_memory[('Vehicle', 'pydantic')]
+        assert 'VehicleFleetState row' in format_object_memory_table(get_object_memory(10))
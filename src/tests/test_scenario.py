@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+import filecmp
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.asset_simulator.depot.kpi_accumulator import KpiAccumulator
+from src.utils.scenario import build_scenario_runtime, get_day_reservations, get_fleet_mix, get_scenario_configs, load_scenario_bundle, \
+    write_scenario_bundle
+
+
+class TestScenario(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def get_bundle_path(self, name):
+        return os.path.join(self.tmp_dir.name, name)
+
+    def test_fleet_mix(self):
+        fleet_mix = get_fleet_mix(101, {'suv': 0.3, 'sedan': 0.5, 'crossover': 0.2})
+        assert fleet_mix == {'suv': 30, 'sedan': 51, 'crossover': 20}
+
+    def test_bundle_is_reproducible(self):
+        write_scenario_bundle(self.get_bundle_path('a'), 200, 5, seed=3)
+        write_scenario_bundle(self.get_bundle_path('b'), 200, 5, seed=3)
+        write_scenario_bundle(self.get_bundle_path('c'), 200, 5, seed=4)
+
+        file_names = ['scenario.json', 'demand_config.json', 'depot_config.json'] + \
+            [os.path.join('reservations', file_name) for file_name in os.listdir(os.path.join(self.get_bundle_path('a'), 'reservations'))]
+        match, mismatch, errors = filecmp.cmpfiles(self.get_bundle_path('a'), self.get_bundle_path('b'), file_names, shallow=False)
+        assert len(mismatch) == 0 and len(errors) == 0
+        assert not filecmp.cmp(
+            os.path.join(self.get_bundle_path('a'), 'reservations', 'departure.npy'),
+            os.path.join(self.get_bundle_path('c'), 'reservations', 'departure.npy'),
+            shallow=False
+        )
+
+    def test_departures_are_bucketed_like_the_demand_simulator(self):
+        demand_sim_config, asset_sim_config = get_scenario_configs(20, 1)
+        demand_sim_config['stdev_vehicle_departure_hours'] = 0.01
+        day_start = np.datetime64(datetime(year=2022, month=1, day=1), 's')
+
+        # a departure goes at the start of its interval, the first interval of the day at the next midnight
+        for mean_hour, departure in [(5.1, day_start + np.timedelta64(5, 'h')), (0.1, day_start + np.timedelta64(24, 'h'))]:
+            demand_sim_config['mean_vehicle_departure_hour_of_day'] = mean_hour
+            day_reservations = get_day_reservations(demand_sim_config, np.array([1.0]), day_start, 0, 0)
+            assert len(day_reservations['departure']) > 0
+            assert (day_reservations['departure'] == departure).all()
+
+        # departures past the end of the day are dropped
+        demand_sim_config['mean_vehicle_departure_hour_of_day'] = 24.5
+        assert len(get_day_reservations(demand_sim_config, np.array([1.0]), day_start, 0, 0)['departure']) == 0
+
+    def test_reservation_stream(self):
+        manifest = write_scenario_bundle(self.get_bundle_path('a'), 200, 3, seed=0)
+        manifest, demand_sim_config, asset_sim_config, reservation_stream = load_scenario_bundle(self.get_bundle_path('a'))
+
+        # mixed fleet with stations scaled to it
+        assert sum(vehicle_settings['n'] for vehicle_settings in asset_sim_config['vehicles'].values()) == 200
+        assert manifest['vehicle_types'] == ['sedan', 'suv', 'crossover']
+        assert asset_sim_config['n_l2_stations'] == 80
+        assert isinstance(reservation_stream.created_at, np.memmap)
+        assert len(reservation_stream) == manifest['n_reservations'] > 0
+
+        # every reservation comes out exactly once when the stream is read an interval at a time
+        start = datetime(year=2022, month=1, day=1)
+        reservations = {}
+        for interval in range(0, 3 * 96):
+            interval_start = start + timedelta(seconds=interval * 900)
+            interval_reservations = reservation_stream.get_reservations(interval_start, interval_start + timedelta(seconds=900))
+            for reservation in interval_reservations.values():
+                assert interval_start <= reservation.created_at_timestamp_utc < interval_start + timedelta(seconds=900)
+                assert reservation.created_at_timestamp_utc < reservation.departure_timestamp_utc <= reservation.created_at_timestamp_utc + timedelta(hours=24)
+                assert reservation.arrival_timestamp_utc - reservation.departure_timestamp_utc >= timedelta(hours=2)
+            reservations.update(interval_reservations)
+        assert len(reservations) == manifest['n_reservations']
+        assert set(reservation.vehicle_type for reservation in reservations.values()) == {'sedan', 'suv', 'crossover'}
+
+    def test_scenario_runtime(self):
+        write_scenario_bundle(self.get_bundle_path('a'), 30, 2, seed=0)
+        runtime = build_scenario_runtime(self.get_bundle_path('a'))
+        runtime.asset_simulator.kpi_accumulator = KpiAccumulator()
+        runtime.asset_simulator.capture_snapshots = False
+
+        departure_deltas = runtime.run(plot_output=False, event_driven=True)
+        assert len(departure_deltas) > 0
+        # the bundle's reservations are published, nothing is sampled
+        assert runtime.demand_simulator.daily_event_counts == {}
+
+    def test_streamed_run_drops_completed_reservations(self):
+        n_days = 5
+        manifest = write_scenario_bundle(self.get_bundle_path('a'), 40, n_days, seed=0)
+        runtime = build_scenario_runtime(self.get_bundle_path('a'))
+        runtime.asset_simulator.use_kpi_accumulator()
+
+        max_retained = 0
+        for interval in range(0, n_days * 96):
+            runtime.demand_simulator.run_interval()
+            runtime.asset_simulator.run_interval()
+            runtime.heuristic.run_interval()
+            for service in [runtime.demand_simulator, runtime.asset_simulator, runtime.heuristic]:
+                service.increment_interval()
+            max_retained = max(max_retained, len(runtime.asset_simulator.reservations))
+
+        # the asset simulator only holds reservations in flight, not every one it was sent
+        asset_simulator = runtime.asset_simulator
+        assert asset_simulator.n_reservations_received > len(asset_simulator.reservations)
+        assert max_retained <= 3 * manifest['n_reservations'] / n_days
+        assert all(reservation.status != 'complete' for reservation in asset_simulator.reservations.values())
+        assert asset_simulator.pending_departure_ids <= asset_simulator.reservations.keys()
+        assert asset_simulator.reservation_order.keys() == asset_simulator.reservations.keys()
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+import json
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.asset_simulator.depot.asset_depot import AssetDepot
+from src.asset_simulator.depot.snapshot_recorder import SnapshotRecorder
+from src.asset_simulator.depot_config.depot_config import AssetDepotConfig
+from src.mock_queue.mock_queue import MockQueue
+
+
+class TestSnapshotRecorder(unittest.TestCase):
+
+    def test_frames_match_snapshot_dicts(self):
+        start = datetime(year=2022, month=1, day=1)
+        datetimes = [start + timedelta(minutes=15*idx) for idx in range(0, 3)]
+        soc = {3: [0.5, 0.6, 0.7], 7: [1.0, 0.9, 0.8]}
+        status = {3: ['charging', 'charging', 'finished_charging'], 7: ['parked', 'driving', 'driving']}
+        meter_power_kw = [12.0, None, 24.5]
+
+        # start small so the recorder has to grow
+        recorder = SnapshotRecorder.for_vehicles(soc.keys(), n_intervals=1)
+        for idx, current_datetime in enumerate(datetimes):
+            recorder.record(
+                current_datetime,
+                np.array([soc[vehicle_id][idx] for vehicle_id in soc]),
+                np.array([recorder.get_status_code(status[vehicle_id][idx]) for vehicle_id in status], dtype=np.int8),
+                meter_power_kw[idx]
+            )
+
+        assert recorder.n_recorded == 3 and len(recorder.meter_power_kw) >= 3
+        df_soc = pd.DataFrame.from_dict({'datetime': datetimes, **soc})
+        assert recorder.get_soc_frame()['datetime'].equals(df_soc['datetime'])
+        assert (recorder.get_soc_frame().iloc[:, 1:].to_numpy() == df_soc.iloc[:, 1:].to_numpy(dtype=np.float32)).all()
+        assert recorder.get_status_frame().equals(pd.DataFrame.from_dict({'datetime': datetimes, **status}))
+        # intervals without a vehicle charging aren't in the power snapshot
+        assert recorder.get_power_snapshot() == {datetimes[0]: 12.0, datetimes[2]: 24.5}
+
+    def test_reserve_keeps_recorded_rows(self):
+        recorder = SnapshotRecorder.for_vehicles([1], n_intervals=1, record_status=False)
+        recorder.record(datetime(year=2022, month=1, day=1), np.array([0.25]), None, 7.0)
+        recorder.reserve(10)
+
+        assert len(recorder.meter_power_kw) == 11 and recorder.status_code is None
+        assert recorder.state_of_charge[0, 0] == 0.25 and recorder.meter_power_kw[0] == 7.0
+        assert np.isnan(recorder.meter_power_kw[1:]).all()
+
+    def test_asset_depot_records_the_same_snapshots(self):
+        script_dir = os.path.dirname(__file__)
+        with open(os.path.join(script_dir, '../asset_simulator/depot_config/configs/hiker_9_to_5.json')) as f:
+            asset_sim_config = json.load(f)
+        asset_sim_config['vehicles']['sedan']['n'] = 3
+        asset_sim_config['n_l2_stations'] = 1
+        asset_sim_config['n_dcfc_stations'] = 0
+
+        asset_depots = []
+        for use_snapshot_recorder in [False, True]:
+            asset_depot = AssetDepot.build_depot(config=AssetDepotConfig(**asset_sim_config), queue=MockQueue())
+            if use_snapshot_recorder:
+                asset_depot.use_snapshot_recorder(n_intervals=1)
+            asset_depot.vehicles[1].state_of_charge = 0.7
+            asset_depot.fleet_manager.plugin(1, 0)
+            asset_depot.vehicles[1].update_status()
+            for interval in range(0, 8):
+                asset_depot.step_interval()
+                asset_depot.increment_interval()
+            asset_depots.append(asset_depot)
+
+        asset_depot, recorded_asset_depot = asset_depots
+        assert recorded_asset_depot.vehicle_soc_snapshot == {}
+        assert recorded_asset_depot.get_status_frame().equals(asset_depot.get_status_frame())
+        assert recorded_asset_depot.get_soc_frame().drop(columns='datetime').equals(asset_depot.get_soc_frame().drop(columns='datetime').astype('float32'))
+        assert len(recorded_asset_depot.get_power_snapshot()) > 0
+        assert recorded_asset_depot.get_power_snapshot() == asset_depot.get_power_snapshot()
+
+
+if __name__ == '__main__':
+    unittest.main()
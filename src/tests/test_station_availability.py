@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+import unittest
+
+from src.asset_simulator.station.station import Station
+from src.heuristic.station.station_availability import StationAvailability
+
+
+class TestStationAvailability(unittest.TestCase):
+
+    def get_stations(self):
+        stations = {}
+        for station_id, station_type in enumerate(['L2', 'L2', 'L2', 'DCFC']):
+            stations[station_id] = Station(
+                id=station_id,
+                type=station_type,
+                max_power_kw=7.2 if station_type == 'L2' else 50,
+                last_unplugged=datetime(year=2020, month=1, day=1)
+            )
+        return stations
+
+    def test_first_free_station_by_type(self):
+        current_datetime = datetime(year=2022, month=1, day=1)
+        stations = self.get_stations()
+        station_availability = StationAvailability.from_stations(stations.values(), current_datetime)
+
+        assert station_availability.get_available_station('L2', stations, current_datetime) == 0
+        assert station_availability.get_available_station('DCFC', stations, current_datetime) == 3
+
+        # plugged in stations are skipped
+        stations[0]._plugin(1)
+        assert station_availability.get_available_station('L2', stations, current_datetime) == 1
+
+        # reserved stations are skipped until the reservation is released
+        station_availability.reserve(2, 1, stations, current_datetime)
+        assert station_availability.get_available_station('L2', stations, current_datetime) == 2
+        station_availability.release_reserved(stations, current_datetime)
+        assert station_availability.get_available_station('L2', stations, current_datetime) == 1
+
+        stations[3]._plugin(3)
+        assert station_availability.get_available_station('DCFC', stations, current_datetime) is None
+
+    def test_cooldown_after_unplug(self):
+        current_datetime = datetime(year=2022, month=1, day=1)
+        stations = self.get_stations()
+        station_availability = StationAvailability.from_stations(stations.values(), current_datetime)
+
+        stations[3]._plugin(1)
+        assert station_availability.get_available_station('DCFC', stations, current_datetime) is None
+
+        stations[3]._unplug(current_datetime)
+        station_availability.unplug(stations[3], current_datetime)
+
+        # a station is only handed out again once the 15 minute cooldown has passed
+        for minutes in [0, 15]:
+            later = current_datetime + timedelta(minutes=minutes)
+            assert station_availability.get_available_station('DCFC', stations, later) is None
+        later = current_datetime + timedelta(minutes=30)
+        assert station_availability.get_available_station('DCFC', stations, later) == 3
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+from datetime import timedelta
+import json
+import os
+import unittest
+
+from src.asset_simulator.depot.asset_depot import AssetDepot
+from src.asset_simulator.depot_config.depot_config import AssetDepotConfig
+from src.asset_simulator.reservation.reservation import Reservation
+from src.mock_queue.mock_queue import MockQueue
+from src.plotter.plotter import Plotter
+
+
+class TestStatusTimeline(unittest.TestCase):
+
+    def get_asset_depot(self, array_backed):
+        script_dir = os.path.dirname(__file__)
+        with open(os.path.join(script_dir, '../asset_simulator/depot_config/configs/hiker_9_to_5.json')) as f:
+            asset_sim_config = json.load(f)
+        asset_sim_config['vehicles']['sedan']['n'] = 3
+        asset_sim_config['n_l2_stations'] = 1
+        asset_sim_config['n_dcfc_stations'] = 0
+        return AssetDepot.build_depot(config=AssetDepotConfig(**asset_sim_config), queue=MockQueue(), array_backed=array_backed)
+
+    def run_depot(self, use_status_timeline, array_backed=True, use_snapshot_recorder=False):
+        asset_depot = self.get_asset_depot(array_backed)
+        if use_snapshot_recorder:
+            asset_depot.use_snapshot_recorder()
+        if use_status_timeline:
+            asset_depot.use_status_timeline()
+        start = asset_depot.current_datetime
+
+        # vehicle 1 charges up to 80% then leaves on its reservation
+        asset_depot.vehicles[1].state_of_charge = 0.7
+        asset_depot.fleet_manager.plugin(1, 0)
+        asset_depot.vehicles[1].update_status()
+        reservation = Reservation(
+            id='0',
+            departure_timestamp_utc=start + timedelta(minutes=15),
+            arrival_timestamp_utc=start + timedelta(hours=3),
+            created_at_timestamp_utc=start,
+            vehicle_type='sedan',
+            state_of_charge=0.8,
+            walk_in=False,
+            status='created',
+            assigned_vehicle_id=1
+        )
+        asset_depot.queue.reservation_assignments.append(json.dumps(reservation.dict(), default=str))
+
+        for interval in range(0, 4 * 24):
+            asset_depot.step_interval()
+            asset_depot.increment_interval()
+        return asset_depot
+
+    def test_timeline_matches_status_snapshot(self):
+        for array_backed in [True, False]:
+            asset_depot = self.run_depot(use_status_timeline=False, array_backed=array_backed)
+            timeline_asset_depot = self.run_depot(use_status_timeline=True, array_backed=array_backed)
+
+            assert timeline_asset_depot.vehicle_status_snapshot == {}
+            assert timeline_asset_depot.get_status_frame().equals(asset_depot.get_status_frame())
+
+            segments = timeline_asset_depot.get_status_segments()
+            assert [segment.status for segment in segments[1]] == ['charging', 'driving', 'parked']
+            assert segments[1][0].station_id == 0 and segments[1][1].station_id is None
+            assert len(segments[0]) == 1 and segments[0][0].end - segments[0][0].start == timedelta(hours=24)
+
+            # same segments from the per interval frame, without stations
+            frame_segments = asset_depot.get_status_segments()
+            for vehicle_id, vehicle_segments in segments.items():
+                assert [segment._replace(station_id=None) for segment in vehicle_segments] == frame_segments[vehicle_id]
+
+    def test_recorder_leaves_status_to_timeline(self):
+        asset_depot = self.run_depot(use_status_timeline=False)
+        recorded_asset_depot = self.run_depot(use_status_timeline=True, use_snapshot_recorder=True)
+
+        assert recorded_asset_depot.snapshot_recorder.status_code is None
+        assert recorded_asset_depot.get_status_frame().equals(asset_depot.get_status_frame())
+        assert recorded_asset_depot.get_soc_frame().drop(columns='datetime').equals(asset_depot.get_soc_frame().drop(columns='datetime').astype('float32'))
+
+    def test_plot_spans(self):
+        asset_depot = self.run_depot(use_status_timeline=True)
+        fig = Plotter().get_soc_timeseries(
+            asset_depot.get_soc_frame(),
+            asset_depot.get_status_frame(),
+            asset_depot.reservation_assignment_snapshot,
+            asset_depot.move_charge_snapshot,
+            asset_depot.fleet_manager.station_fleet,
+            status_segments=asset_depot.get_status_segments()
+        )
+        status_bars = [trace for trace in fig.data if trace.type == 'bar']
+        assert [len(trace.x) for trace in status_bars] == [1, 3, 1]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+from src.utils.result_db import get_completed_run_keys
+from src.utils.result_sink import ResultSink
+from src.utils.single_run import get_single_run_key
+from src.utils.sweep import get_grid_points, get_grid_point_seed, get_new_grid_points, run_sweep
+
+
+class TestSweep(unittest.TestCase):
+
+    def get_grid_points(self, vehicles=(3, 5), l2_stations=(1, 2)):
+        return get_grid_points(
+            1,
+            vehicles,
+            l2_stations,
+            n_days=1,
+            random_sort=False,
+            dcfc_station_count=0,
+            asset_config='hiker_9_to_5.json',
+            event_driven=True
+        )
+
+    def test_grid_point_seeds_are_distinct(self):
+        seeds = [grid_point['seed'] for grid_point in get_grid_points(3, [5, 15], [1, 3, 5], base_seed=0)]
+        assert len(set(seeds)) == len(seeds)
+        assert get_grid_point_seed(0, 1, 15, 3) == get_grid_point_seed(0, 1, 15, 3)
+        assert get_grid_point_seed(0, 1, 15, 3) != get_grid_point_seed(1, 1, 15, 3)
+
+    def test_workers_match_serial(self):
+        def run(workers):
+            results = {}
+            def on_result(run_result):
+                results[(run_result['vehicles'], run_result['l2_station'])] = run_result
+            run_sweep(self.get_grid_points(), on_result, workers=workers)
+            return results
+
+        serial = run(1)
+        assert len(serial) == 4
+        assert run(2) == serial
+
+    def test_run_key_changes_with_config_and_seed(self):
+        grid_point = self.get_grid_points()[0]
+        assert get_single_run_key(**grid_point) == get_single_run_key(**dict(grid_point, event_driven=False))
+        assert get_single_run_key(**grid_point) != get_single_run_key(**dict(grid_point, seed=grid_point['seed'] + 1))
+        assert get_single_run_key(**grid_point) != get_single_run_key(**dict(grid_point, random_sort=True))
+        assert get_single_run_key(**grid_point) != get_single_run_key(**dict(grid_point, dcfc_station_count=1))
+        # these decide which result tables get filled, so a run with them on isn't skipped for one without
+        assert get_single_run_key(**grid_point) != get_single_run_key(**dict(grid_point, count_ops=True))
+        assert get_single_run_key(**grid_point) != get_single_run_key(**dict(grid_point, streaming_kpis=True))
+        assert get_single_run_key(**dict(grid_point, seed=None)) is None
+
+    def test_rerun_only_simulates_new_grid_points(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, 'test.db')
+            grid_points = self.get_grid_points(vehicles=[3], l2_stations=[1])
+            with ResultSink(db_path=db_path) as result_sink:
+                run_sweep(grid_points, lambda grid_point: None, workers=2, result_sink=result_sink)
+
+            completed_run_keys = get_completed_run_keys(db_path)
+            assert get_new_grid_points(grid_points, completed_run_keys) == []
+
+            # widening the sweep only leaves the new grid points
+            widened_grid_points = self.get_grid_points(vehicles=[3], l2_stations=[1, 2])
+            assert get_new_grid_points(widened_grid_points, completed_run_keys) == widened_grid_points[1:]
+
+    def test_dead_sink_stops_the_sweep(self):
+        for workers in [1, 2]:
+            completed = []
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                with self.assertRaises(RuntimeError):
+                    with ResultSink(db_path=os.path.join(tmp_dir, 'test.db')) as result_sink:
+                        def on_result(grid_point):
+                            # the sink dies after the first result
+                            completed.append(grid_point)
+                            result_sink.process.terminate()
+                            result_sink.process.join()
+                        run_sweep(self.get_grid_points(), on_result, workers=workers, result_sink=result_sink)
+            assert len(completed) == 1
+
+if __name__ == '__main__':
+    unittest.main()
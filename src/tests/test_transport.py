@@ -0,0 +1,51 @@
+from datetime import datetime
+import unittest
+
+from src.asset_simulator.reservation.reservation import Reservation
+from src.asset_simulator.station.station import Station
+from src.asset_simulator.vehicle.vehicle import Vehicle
+from src.mock_queue.transport import TRANSPORTS
+
+
+class TestTransport(unittest.TestCase):
+
+    def get_objects(self):
+        current_datetime = datetime(year=2022, month=1, day=1)
+        return [
+            Vehicle(id=3, connected_station_id=1, type='sedan', state_of_charge=0.5, energy_capacity_kwh=40, status='charging', updated_at=current_datetime),
+            Station(id=1, type='L2', connected_vehicle_id=3, max_power_kw=12, last_unplugged=current_datetime),
+            Reservation(
+                id='res_0',
+                departure_timestamp_utc=datetime(year=2022, month=1, day=1, hour=9),
+                arrival_timestamp_utc=datetime(year=2022, month=1, day=1, hour=17),
+                created_at_timestamp_utc=current_datetime,
+                vehicle_type='sedan',
+                state_of_charge=0.8,
+                walk_in=False,
+                status='created',
+                assigned_vehicle_id=3
+            )
+        ]
+
+    def test_in_process_transport_matches_json(self):
+        in_process_transport = TRANSPORTS['in_process']()
+        json_transport = TRANSPORTS['json']()
+        for object in self.get_objects():
+            model = type(object)
+            decoded = in_process_transport.decode(in_process_transport.encode(object), model)
+            json_decoded = json_transport.decode(json_transport.encode(object), model)
+            assert type(decoded) == type(json_decoded)
+            assert decoded.dict() == json_decoded.dict() == object.dict()
+
+    def test_in_process_messages_are_copies(self):
+        transport = TRANSPORTS['in_process']()
+        vehicle = self.get_objects()[0]
+        message = transport.encode(vehicle)
+
+        # edits after publishing don't reach the subscriber, same as on the wire
+        vehicle.state_of_charge = 0.9
+        assert transport.decode(message, Vehicle).state_of_charge == 0.5
+
+
+if __name__ == '__main__':
+    unittest.main()
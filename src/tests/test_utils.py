@@ -0,0 +1,172 @@
+from datetime import timedelta
+import json
+import os
+import random
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src.asset_simulator.depot.asset_depot import AssetDepot
+from src.asset_simulator.depot_config.depot_config import AssetDepotConfig
+from src.asset_simulator.reservation.reservation import Reservation
+from src.demand_simulator.demand_simulator.demand_simulator import DemandSimulator
+from src.demand_simulator.demand_simulator_config.demand_simulator_config import DemandSimulatorConfig
+from src.heuristic.depot.algo_depot import AlgoDepot
+from src.mock_queue.mock_queue import MockQueue
+from src.utils.utils import RuntimeEnvironment
+
+
+class TestRuntimeEnvironment(unittest.TestCase):
+
+    def get_runtime(self):
+        mock_queue = MockQueue()
+        script_dir = os.path.dirname(__file__)
+
+        with open(os.path.join(script_dir, '../demand_simulator/demand_simulator_config/configs/5days_15min_40res_per_day.json')) as f:
+            demand_sim_config = json.load(f)
+        demand_simulator = DemandSimulator(config=DemandSimulatorConfig(**demand_sim_config), queue=mock_queue)
+
+        with open(os.path.join(script_dir, '../asset_simulator/depot_config/configs/hiker_9_to_5.json')) as f:
+            asset_sim_config = json.load(f)
+        asset_sim_config['vehicles']['sedan']['n'] = 5
+        asset_depot = AssetDepot.build_depot(config=AssetDepotConfig(**asset_sim_config), queue=mock_queue)
+        algo_depot = AlgoDepot.build_depot(config=AssetDepotConfig(**asset_sim_config), queue=mock_queue)
+
+        return RuntimeEnvironment(
+            demand_simulator=demand_simulator,
+            asset_simulator=asset_depot,
+            heuristic=algo_depot,
+            queue=mock_queue
+        )
+
+    def run_seeded(self, **kwargs):
+        random.seed(0)
+        np.random.seed(0)
+        runtime = self.get_runtime()
+        runtime.demand_simulator.config.horizon_length_hours = 48
+        departure_deltas = runtime.run(plot_output=False, **kwargs)
+
+        asset_simulator = runtime.asset_simulator
+        move_charge = {
+            vehicle_id: [(vehicle.updated_at, vehicle.connected_station_id) for vehicle in instructions]
+            for vehicle_id, instructions in asset_simulator.move_charge_snapshot.items()
+        }
+        return asset_simulator.vehicle_soc_snapshot, asset_simulator.power_snapshot, move_charge, departure_deltas
+
+    def test_event_driven_matches_fixed_step(self):
+        assert self.run_seeded(event_driven=True) == self.run_seeded()
+        assert self.run_seeded(event_driven=True, random_sort=True) == self.run_seeded(random_sort=True)
+
+    def test_heuristic_quiet_interval_reads_only_its_queue(self):
+        runtime = self.get_runtime()
+        heuristic = runtime.heuristic
+        # every station taken, nothing waiting on the heuristic
+        with mock.patch.object(AlgoDepot, 'l2_is_available', return_value=False), \
+                mock.patch.object(AlgoDepot, 'dcfc_is_available', return_value=False), \
+                mock.patch.object(AlgoDepot, 'walk_in_pool_is_settled', return_value=True):
+            assert heuristic.is_quiet_interval()
+
+            # the asset simulator fleet is never read, only what it publishes
+            runtime.asset_simulator.publish_state(demand_simulator=False)
+            assert not heuristic.is_quiet_interval()
+
+    def test_random_sort_is_passed_to_the_heuristic(self):
+        # the heuristic used to be run with random_sort=True whatever run was given
+        runtime = self.get_runtime()
+        runtime.demand_simulator.config.horizon_length_hours = 1
+        runtime.asset_simulator.use_kpi_accumulator()
+        with mock.patch.object(AlgoDepot, 'run_interval') as run_interval:
+            runtime.run(plot_output=False, random_sort=False, assignment_engine='min_cost', incremental=True)
+        assert run_interval.call_count == 4
+        assert all(call == mock.call(random_sort=False, assignment_engine='min_cost', incremental=True) for call in run_interval.call_args_list)
+
+        with mock.patch.object(AlgoDepot, 'run_interval') as run_interval:
+            runtime.run_heuristic_interval(random_sort=True)
+        run_interval.assert_called_once_with(random_sort=True, assignment_engine='greedy', incremental=False)
+
+    def test_departure_deltas(self):
+        runtime = self.get_runtime()
+        start = runtime.asset_simulator.current_datetime
+        runtime.asset_simulator.current_datetime = start + timedelta(hours=10)
+
+        def get_reservation(id, departure):
+            return Reservation(
+                id=id,
+                departure_timestamp_utc=departure,
+                arrival_timestamp_utc=departure + timedelta(hours=2),
+                created_at_timestamp_utc=start,
+                vehicle_type='sedan',
+                state_of_charge=0.8,
+                walk_in=False,
+                status='created'
+            )
+
+        # reservation 'b' is sent twice and reservation 'c' never departs
+        runtime.asset_simulator.reservation_assignment_snapshot = {
+            None: [get_reservation('d', start)],
+            1: [get_reservation('a', start), get_reservation('b', start + timedelta(hours=1))],
+            2: [get_reservation('c', start + timedelta(hours=4)), get_reservation('b', start + timedelta(hours=1))]
+        }
+        df_actual_departures = pd.DataFrame({
+            'vehicle_id': [2, 1],
+            'reservation_id': ['b', 'a'],
+            'departure_delta_minutes': [0.0, 45.0]
+        })
+
+        assert runtime.get_departure_deltas(df_actual_departures) == [45.0, 540.0, 360.0, 0.0]
+
+    def test_no_snapshots_needs_kpi_accumulator(self):
+        runtime = self.get_runtime()
+        # reservations are made a day ahead, the second day has departures
+        runtime.demand_simulator.config.horizon_length_hours = 48
+        asset_simulator = runtime.asset_simulator
+        asset_simulator.capture_snapshots = False
+        with self.assertRaises(ValueError):
+            runtime.run(plot_output=False)
+        assert asset_simulator.current_datetime == runtime.demand_simulator.current_datetime
+
+        asset_simulator.use_kpi_accumulator()
+        departure_deltas = runtime.run(plot_output=False)
+        assert len(departure_deltas) > 0 and departure_deltas == asset_simulator.kpi_accumulator.departure_deltas
+        # only the KPIs are kept
+        assert asset_simulator.vehicle_soc_snapshot == {} and asset_simulator.power_snapshot == {}
+        assert asset_simulator.reservation_assignment_snapshot == {}
+
+        # built without snapshots an accumulator is created
+        asset_simulator = self.get_runtime().asset_simulator
+        fields = {field_name: getattr(asset_simulator, field_name) for field_name in AssetDepot.__fields__}
+        assert AssetDepot(**dict(fields, capture_snapshots=False, kpi_accumulator=None)).kpi_accumulator is not None
+        assert AssetDepot(**dict(fields, capture_snapshots=True, kpi_accumulator=None)).kpi_accumulator is None
+
+    def test_quiet_intervals_end_at_the_next_event(self):
+        runtime = self.get_runtime()
+        start = runtime.asset_simulator.current_datetime
+        with mock.patch.object(DemandSimulator, 'get_next_event_datetime', return_value=start + timedelta(hours=2)), \
+                mock.patch.object(AlgoDepot, 'is_quiet_interval', return_value=True):
+            assert runtime.get_quiet_intervals(96) == 8
+            assert runtime.get_quiet_intervals(5) == 5
+
+            runtime.asset_simulator.departure_calendar[start + timedelta(hours=1)] = ['res_0']
+            assert runtime.get_quiet_intervals(96) == 4
+
+            # nothing happens without the asset simulator being quiet too
+            runtime.asset_simulator.departure_calendar[start] = ['res_1']
+            assert runtime.get_quiet_intervals(96) == 0
+
+    def test_quiet_intervals_only_step_the_asset_simulator(self):
+        runtime = self.get_runtime()
+        start = runtime.asset_simulator.current_datetime
+        with mock.patch.object(DemandSimulator, 'run_interval', side_effect=AssertionError('demand ran')), \
+                mock.patch.object(AlgoDepot, 'run_interval', side_effect=AssertionError('heuristic ran')):
+            assert runtime.run_quiet_intervals(4) == 4
+
+        for service in [runtime.demand_simulator, runtime.asset_simulator, runtime.heuristic]:
+            assert service.current_datetime == start + timedelta(hours=1)
+        # the asset simulator still recorded every interval
+        assert runtime.asset_simulator.vehicle_soc_snapshot['datetime'] == [start + timedelta(minutes=15*idx) for idx in range(0, 4)]
+
+
+if __name__ == '__main__':
+    unittest.main()
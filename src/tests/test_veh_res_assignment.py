@@ -201,3 +201,57 @@ class TestVehicleReservationAssignment(unittest.TestCase):
 
         # we only make assignments when vehicles are available
         assert len(algo_depot.past_reservation_assignments) == 4
+
+
+    def test_vehicle_reservations_min_cost_1(self):
+        # every vehicle can reach 80% by L2 before departure so the fullest go to the soonest departures
+        algo_depot = self.get_algo_depot()
+        algo_depot.reservations = self.get_reservations()
+
+        # prep vehicles
+        vehicles = self.get_vehicles()
+        fleet_manager = self.get_fleet_manager(vehicles)
+        algo_depot.fleet_manager = fleet_manager
+        algo_depot.assign_vehicles_reservations_by_min_cost_matching()
+
+        assignments = {res.id: res.assigned_vehicle_id for res in algo_depot.past_reservation_assignments.values()}
+        assert {assignments['1'], assignments['2']} == {2, 4}
+        assert assignments['3'] == 3
+        assert len(algo_depot.past_reservation_assignments) == 3
+
+    def test_vehicle_reservations_min_cost_2(self):
+        # vehicles already committed to an overlapping reservation are skipped
+        algo_depot = self.get_algo_depot()
+        algo_depot.reservations = self.get_reservations()
+
+        past_res = self.get_reservation(
+            id=0,
+            departure=datetime(year=2022, month=1, day=1, hour=12),
+            arrival=datetime(year=2022, month=1, day=4, hour=1),
+            vehicle_type='sedan',
+            walk_in=False,
+            assigned_vehicle_id=2
+        )
+        algo_depot.past_reservation_assignments = {past_res.id: past_res}
+        algo_depot.rebuild_reservation_calendar()
+
+        # prep vehicles
+        vehicles = self.get_vehicles()
+        fleet_manager = self.get_fleet_manager(vehicles)
+        algo_depot.fleet_manager = fleet_manager
+        algo_depot.assign_vehicles_reservations_by_min_cost_matching()
+
+        assignments = {res.id: res.assigned_vehicle_id for res in algo_depot.past_reservation_assignments.values()}
+        assert assignments['1'] == 4
+        assert assignments['2'] == 3
+        # vehicle 2 is back well before the last reservation
+        assert assignments['3'] == 2
+
+    def test_assignment_shuffles_depend_only_on_the_interval(self):
+        algo_depot = self.get_algo_depot()
+        first_draw = algo_depot.get_assignment_random().random()
+        algo_depot.get_assignment_random().random()
+        assert algo_depot.get_assignment_random().random() == first_draw
+
+        algo_depot.increment_interval()
+        assert algo_depot.get_assignment_random().random() != first_draw
@@ -0,0 +1,68 @@
+from datetime import datetime
+import random
+import unittest
+
+import numpy as np
+
+from src.asset_simulator.vehicle.vehicle import Vehicle
+from src.asset_simulator.vehicle.vehicle_fleet import VehicleFleet
+
+
+class TestVehicleFleetState(unittest.TestCase):
+
+    def get_vehicles(self, n_vehicles=50):
+        random.seed(0)
+        vehicles = {}
+        for vehicle_idx in range(0, n_vehicles):
+            status = random.choice(['parked', 'charging', 'driving'])
+            vehicles[vehicle_idx] = Vehicle(
+                id=vehicle_idx,
+                connected_station_id=vehicle_idx % 3 if status == 'charging' else None,
+                type='sedan',
+                state_of_charge=random.choice([0.2, 0.5, 0.99, 1.0, random.random()]),
+                energy_capacity_kwh=random.choice([40, 60]),
+                status=status
+            )
+        return vehicles
+
+    def test_vectorized_charge_and_drive_match_vehicle(self):
+        station_max_power_kw = np.array([7.2, 12, 50])
+        current_datetime = datetime(year=2022, month=1, day=1)
+
+        vehicles = self.get_vehicles()
+        vehicle_fleet = VehicleFleet(vehicles=self.get_vehicles())
+        vehicle_fleet.use_array_state()
+
+        for interval in range(0, 20):
+            for vehicle in vehicles.values():
+                if vehicle.status == 'charging':
+                    vehicle.charge(900, station_max_power_kw[vehicle.connected_station_id], current_datetime)
+                vehicle.drive(900, current_datetime)
+            vehicle_fleet.state.charge(900, station_max_power_kw)
+            vehicle_fleet.state.drive(900)
+
+        for vehicle_id, vehicle in vehicles.items():
+            view = vehicle_fleet.vehicles[vehicle_id]
+            assert view.state_of_charge == vehicle.state_of_charge
+            assert view.status == vehicle.status
+            assert view.dict() == vehicle.dict()
+
+    def test_view_updates_state(self):
+        vehicle_fleet = VehicleFleet(vehicles=self.get_vehicles(n_vehicles=3))
+        vehicle_fleet.use_array_state()
+
+        view = vehicle_fleet.vehicles[1]
+        view._plugin(2)
+        view.state_of_charge = 1.0
+        view.update_status()
+        assert vehicle_fleet.state.connected_station_id[1] == 2
+        assert view.status == 'finished_charging'
+        assert 1 in vehicle_fleet.state.get_fully_charged_vehicle_ids()
+
+        view._unplug()
+        assert view.connected_station_id is None
+        assert view.to_vehicle().status == 'finished_charging'
+
+
+if __name__ == '__main__':
+    unittest.main()
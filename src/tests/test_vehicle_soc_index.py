@@ -0,0 +1,51 @@
+import random
+import unittest
+
+from src.asset_simulator.vehicle.vehicle import Vehicle
+from src.asset_simulator.vehicle.vehicle_fleet import VehicleFleet
+from src.heuristic.vehicle.vehicle_soc_index import VehicleSocIndex
+
+
+class TestVehicleSocIndex(unittest.TestCase):
+
+    def get_vehicles(self, n=40):
+        random.seed(0)
+        vehicles = {}
+        for vehicle_id in range(0, n):
+            vehicles[vehicle_id] = Vehicle(
+                id=vehicle_id,
+                type=random.choice(['sedan', 'suv']),
+                # few distinct values so ties have to keep fleet order
+                state_of_charge=random.choice([0.2, 0.5, 0.8, 1.0]),
+                energy_capacity_kwh=40,
+                status='parked'
+            )
+        return vehicles
+
+    def assert_matches_sort(self, vehicle_soc_index, vehicles):
+        for vehicle_type in ['sedan', 'suv']:
+            expected = [vehicle.id for vehicle in VehicleFleet.sort_vehicles_highest_soc_first_by_type(vehicles.values(), vehicle_type)]
+            assert vehicle_soc_index.get_vehicle_ids(vehicle_type) == expected
+            assert list(vehicle_soc_index.iter_vehicle_ids(vehicle_type)) == expected
+
+    def test_updates_match_full_sort(self):
+        vehicles = self.get_vehicles()
+        vehicle_soc_index = VehicleSocIndex.from_vehicles(vehicles.values())
+        assert sorted(vehicle_soc_index.get_types()) == ['sedan', 'suv']
+        self.assert_matches_sort(vehicle_soc_index, vehicles)
+
+        # only the vehicles that changed are updated
+        for interval in range(0, 20):
+            changed_ids = random.sample(list(vehicles.keys()), 5)
+            for vehicle_id in changed_ids:
+                vehicles[vehicle_id].state_of_charge = random.choice([0.2, 0.5, 0.8, 1.0])
+                vehicle_soc_index.update(vehicles[vehicle_id])
+            self.assert_matches_sort(vehicle_soc_index, vehicles)
+
+        # re-sending an unchanged vehicle leaves a single entry
+        vehicle_soc_index.update(vehicles[0])
+        assert sum(len(entries) for entries in vehicle_soc_index.entries_by_type.values()) == len(vehicles)
+
+
+if __name__ == '__main__':
+    unittest.main()
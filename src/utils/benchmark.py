@@ -0,0 +1,112 @@
+import itertools
+import json
+import random
+from time import perf_counter
+
+import numpy as np
+
+from src.instrumentation.phase_profiler import profiling
+from src.utils.run_key import get_code_version
+from src.utils.single_run import build_runtime, get_configs
+from src.utils.utils import get_service_seconds
+
+
+def get_case_name(vehicles, l2_stations, n_days, random_sort):
+    return 'veh_' + str(vehicles) + '_l2_' + str(l2_stations) + '_days_' + str(n_days) + '_random_sort_' + str(bool(random_sort))
+
+
+def run_benchmark_case(vehicles, l2_stations, n_days, random_sort, n_dcfc=1, asset_config='hiker_9_to_5.json', seed=0, repeats=1, **run_kwargs):
+    """
+    time RuntimeEnvironment.run for one fleet size, station count and horizon, building the depots isn't timed
+
+    :param repeats: the fastest of this many runs is kept, every repeat uses the same seed so they do the same work
+    :param run_kwargs: passed to RuntimeEnvironment.run, e.g. assignment_engine or event_driven
+    :return: dict of the case settings, wall seconds, intervals/sec and seconds spent in each service
+    """
+    demand_sim_config, asset_sim_config = get_configs(n_days, vehicles, 0, 0, l2_stations, n_dcfc, asset_config)
+    # get_configs only sets a misspelt key so the horizon is set here
+    demand_sim_config['horizon_length_hours'] = n_days * 24
+    n_intervals = int(demand_sim_config['horizon_length_hours'] * 3600 / demand_sim_config['interval_seconds'])
+
+    fastest = None
+    for repeat in range(0, repeats):
+        random.seed(seed)
+        np.random.seed(seed)
+        runtime = build_runtime(demand_sim_config, dict(asset_sim_config))
+
+        with profiling() as profiler:
+            start = perf_counter()
+            runtime.run(plot_output=False, random_sort=random_sort, **run_kwargs)
+            seconds = perf_counter() - start
+
+        if fastest is None or seconds < fastest['seconds']:
+            fastest = {
+                'seconds': seconds,
+                'phase_seconds': get_service_seconds(profiler)
+            }
+
+    return {
+        'case': get_case_name(vehicles, l2_stations, n_days, random_sort),
+        'vehicles': int(vehicles),
+        'l2_stations': int(l2_stations),
+        'n_days': int(n_days),
+        'random_sort': bool(random_sort),
+        'n_intervals': n_intervals,
+        'seconds': fastest['seconds'],
+        'intervals_per_sec': n_intervals / fastest['seconds'],
+        'phase_seconds': fastest['phase_seconds']
+    }
+
+
+def run_benchmark(vehicles, l2_stations, n_days, on_result=None, **kwargs):
+    """
+    run every fleet size x station count x horizon in heuristic and random_sort mode
+
+    :param on_result: called with each case result as it finishes
+    :param kwargs: passed to run_benchmark_case
+    :return: benchmark dict with the code version it ran on, ready to be written as json
+    """
+    results = []
+    for n_vehicles, n_l2_stations, n_days_run, random_sort in itertools.product(vehicles, l2_stations, n_days, [False, True]):
+        result = run_benchmark_case(n_vehicles, n_l2_stations, n_days_run, random_sort, **kwargs)
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+
+    return {
+        'code_version': get_code_version(),
+        'results': results
+    }
+
+
+def write_benchmark(benchmark, benchmark_path):
+    with open(benchmark_path, 'w') as f:
+        json.dump(benchmark, f, indent=2)
+
+
+def read_benchmark(benchmark_path):
+    with open(benchmark_path) as f:
+        return json.load(f)
+
+
+def get_regressions(benchmark, baseline, threshold=0.2):
+    """
+    :param threshold: fraction of the baseline intervals/sec a case can lose before it counts as a regression
+    :return: one dict per case slower than the baseline by more than the threshold, cases missing from either are skipped
+    """
+    baseline_results = {result['case']: result for result in baseline['results']}
+
+    regressions = []
+    for result in benchmark['results']:
+        baseline_result = baseline_results.get(result['case'])
+        if baseline_result is None:
+            continue
+
+        if result['intervals_per_sec'] < (1 - threshold) * baseline_result['intervals_per_sec']:
+            regressions.append({
+                'case': result['case'],
+                'baseline_intervals_per_sec': baseline_result['intervals_per_sec'],
+                'intervals_per_sec': result['intervals_per_sec'],
+                'slowdown': 1 - result['intervals_per_sec'] / baseline_result['intervals_per_sec']
+            })
+    return regressions
@@ -0,0 +1,60 @@
+import click
+
+from src.utils.benchmark import get_regressions, read_benchmark, run_benchmark, write_benchmark
+from src.utils.utils import SERVICES
+
+
+def parse_counts(counts):
+    return [int(count) for count in counts.split(',')]
+
+
+@click.command()
+@click.option('--vehicles', default='25,100', help='comma separated fleet sizes')
+@click.option('--l2_stations', default='5,20', help='comma separated numbers of L2 EVSEs')
+@click.option('--n_days', default='2,7', help='comma separated simulation horizons in days')
+@click.option('--n_dcfc', default=1, help='number of dcfc stations')
+@click.option('--assignment_engine', default='greedy', type=click.Choice(['greedy', 'min_cost']), help='vehicle to reservation assignment used by the heuristic')
+@click.option('--event_driven', default=False, help='only step the asset simulator and heuristic through intervals where something can happen')
+@click.option('--repeats', default=1, help='keep the fastest of this many runs of every case')
+@click.option('--seed', default=0, help='seed of every run so each commit simulates the same work')
+@click.option('--output_file', default='benchmark.json', help='json file the results are written to')
+@click.option('--baseline', default=None, help='json file of an earlier benchmark to check for regressions against')
+@click.option('--threshold', default=0.2, help='fraction of the baseline intervals/sec a case can lose before it is flagged')
+def run(vehicles, l2_stations, n_days, n_dcfc, assignment_engine, event_driven, repeats, seed, output_file, baseline, threshold):
+
+    def echo_result(result):
+        phases = ', '.join(phase + ': ' + '{:.2f}'.format(result['phase_seconds'][phase]) + 's' for phase in SERVICES)
+        click.echo(result['case'] + ': ' + '{:.1f}'.format(result['intervals_per_sec']) + ' intervals/sec (' + phases + ')')
+
+    benchmark = run_benchmark(
+        parse_counts(vehicles),
+        parse_counts(l2_stations),
+        parse_counts(n_days),
+        on_result=echo_result,
+        n_dcfc=n_dcfc,
+        seed=seed,
+        repeats=repeats,
+        assignment_engine=assignment_engine,
+        event_driven=event_driven
+    )
+    write_benchmark(benchmark, output_file)
+    click.echo('Wrote ' + output_file)
+
+    if baseline is None:
+        return
+
+    regressions = get_regressions(benchmark, read_benchmark(baseline), threshold)
+    for regression in regressions:
+        click.echo(
+            'REGRESSION ' + regression['case'] + ': ' +
+            '{:.1f}'.format(regression['intervals_per_sec']) + ' intervals/sec, ' +
+            '{:.0%}'.format(regression['slowdown']) + ' slower than ' +
+            '{:.1f}'.format(regression['baseline_intervals_per_sec'])
+        )
+    if len(regressions) > 0:
+        raise SystemExit(1)
+    click.echo('No case more than ' + '{:.0%}'.format(threshold) + ' slower than ' + baseline)
+
+
+if __name__ == '__main__':
+    run()
@@ -5,13 +5,20 @@ import pickle
 
 import numpy as np
 
-from src.utils.single_run import single_run
+from src.utils.result_db import get_completed_run_keys
+from src.utils.result_sink import ResultSink
+from src.utils.sweep import get_grid_points, get_new_grid_points, run_sweep
 
 # we use tuples (ev_cnt, station_cnt) as the key
 Result = namedtuple('Result', ('vehicle_cnt', 'station_cnt', 'random_sort', 'n_dcfc'))
 
 @click.command()
 @click.option('--random_sort', default=False, help='disable the heuristic for random charging station assignment')
+@click.option('--assignment_engine', default='greedy', type=click.Choice(['greedy', 'min_cost']), help='vehicle to reservation assignment: greedy highest soc first or min cost matching')
+@click.option('--event_driven', default=False, help='only step the asset simulator and heuristic through intervals where something can happen, same results')
+@click.option('--transport', default='in_process', type=click.Choice(['in_process', 'json']), help='pass queue messages as in process copies or json strings')
+@click.option('--streaming_kpis', default=False, help='accumulate KPIs during each run instead of keeping snapshots, same KPIs with less memory')
+@click.option('--count_ops', default=False, help='count hot path operations per interval of every run into the op_counts table')
 @click.option('--n_days', default=14, help='number of days in the simulation')
 @click.option('--n_repeats', default=3, help='number of repeats at every coordinate of # evs and # L2 EVSE')
 @click.option('--l2_station_min', default=1, help='min number of L2 EVSEs simulated')
@@ -21,14 +28,18 @@ Result = namedtuple('Result', ('vehicle_cnt', 'station_cnt', 'random_sort', 'n_d
 @click.option('--veh_max', default=100, help='max number of vehs simulated')
 @click.option('--veh_steps', default=10, help='increment number of vehs simulated by step size')
 @click.option('--n_dcfc', default=1, help='number of dcfc stations')
-@click.option('--output_file_name', default='default_result', help='name of output pickle file')
-def run(random_sort, n_days, n_repeats, l2_station_min, l2_station_max, l2_steps, veh_min, veh_max, veh_steps, n_dcfc, output_file_name):
+@click.option('--store_path', default=None, envvar='RESULT_STORE_PATH', help='directory of the columnar result store the sweep is added to, named after the sweep settings by default')
+@click.option('--output_file_name', default=None, help='deprecated, use --store_path')
+@click.option('--workers', default=1, help='number of simulations run in parallel processes, 0 uses every core')
+@click.option('--seed', default=0, help='base seed, every repeat x # evs x # L2 EVSE run gets its own stream derived from it')
+def run(random_sort, assignment_engine, event_driven, transport, streaming_kpis, count_ops, n_days, n_repeats, l2_station_min, l2_station_max, l2_steps, veh_min, veh_max, veh_steps, n_dcfc, store_path, output_file_name, workers, seed):
 
     L2_STATIONS = np.arange(l2_station_min, l2_station_max, l2_steps)
     VEHICLES = np.arange(veh_min, veh_max, veh_steps)
 
     config_settings = \
     'random_sort_' + str(random_sort) + \
+    '_assignment_engine_' + assignment_engine + \
     '_n_days_' + str(n_days) + \
     '_n_repeats_' + str(n_repeats) + \
     '_n_veh_min_' + str(veh_min) + \
@@ -38,8 +49,13 @@ def run(random_sort, n_days, n_repeats, l2_station_min, l2_station_max, l2_steps
     '_n_dcfc_' + str(n_dcfc)
     click.echo('Running on: ' + config_settings)
 
-    if output_file_name == 'default_result':
-        output_file_name = config_settings
+    if output_file_name is not None:
+        # it used to name a pickle of the results, sweeps only write to the result store now
+        click.echo('--output_file_name is deprecated, use --store_path', err=True)
+        if store_path is None:
+            store_path = output_file_name
+    if store_path is None:
+        store_path = config_settings
 
 
     veh_runs = len(VEHICLES)
@@ -47,24 +63,30 @@ def run(random_sort, n_days, n_repeats, l2_station_min, l2_station_max, l2_steps
 
     total_combos = veh_runs * station_runs * n_repeats
 
-    output_list = []
-    with click.progressbar(length=total_combos) as bar:
-        for repeat in range(0,n_repeats):
-            print('Repeat #: ' + str(repeat))
-            for veh in VEHICLES:
-                for station_count in L2_STATIONS:
-                    bar.update(1)
+    grid_points = get_grid_points(
+        n_repeats,
+        VEHICLES,
+        L2_STATIONS,
+        base_seed=seed,
+        n_days=n_days,
+        random_sort=random_sort,
+        dcfc_station_count=n_dcfc,
+        asset_config='hiker_9_to_5.json',
+        assignment_engine=assignment_engine,
+        event_driven=event_driven,
+        transport=transport,
+        streaming_kpis=streaming_kpis,
+        count_ops=count_ops
+    )
 
-                    single_run(
-                        n_days=n_days,
-                        sedan_count=veh,
-                        suv_count=0,
-                        crossover_count=0,
-                        l2_station_count=station_count,
-                        random_sort=random_sort,
-                        dcfc_station_count=n_dcfc,
-                        asset_config='hiker_9_to_5.json'
-                    )
+    # runs already in the db from an earlier or smaller sweep are skipped
+    grid_points = get_new_grid_points(grid_points, get_completed_run_keys())
+    click.echo('Skipping ' + str(total_combos - len(grid_points)) + ' of ' + str(total_combos) + ' completed runs')
+
+    # workers stream results to the sink process, the only one writing to the db and result store
+    with ResultSink(store_path=store_path) as result_sink:
+        with click.progressbar(length=len(grid_points)) as bar:
+            run_sweep(grid_points, lambda grid_point: bar.update(1), workers=workers, result_sink=result_sink)
 
 if __name__ == '__main__':
     run()
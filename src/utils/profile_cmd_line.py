@@ -0,0 +1,35 @@
+import json
+
+import click
+
+from src.instrumentation.phase_profiler import PhaseProfiler, profiling
+from src.utils.single_run import build_runtime, get_configs
+
+
+@click.command()
+@click.option('--vehicles', default=85, help='number of sedans')
+@click.option('--l2_stations', default=33, help='number of L2 EVSEs')
+@click.option('--n_dcfc', default=5, help='number of dcfc stations')
+@click.option('--n_days', default=14, help='number of days in the simulation')
+@click.option('--random_sort', default=False, help='disable the heuristic for random charging station assignment')
+@click.option('--assignment_engine', default='greedy', type=click.Choice(['greedy', 'min_cost']), help='vehicle to reservation assignment used by the heuristic')
+@click.option('--event_driven', default=False, help='only step the asset simulator and heuristic through intervals where something can happen')
+@click.option('--summary_file', default='phase_profile.json', help='json file the per phase call counts and wall time histograms are written to')
+@click.option('--cprofile_file', default=None, help='also dump cProfile stats here, e.g. for snakeviz or flameprof')
+def run(vehicles, l2_stations, n_dcfc, n_days, random_sort, assignment_engine, event_driven, summary_file, cprofile_file):
+    demand_sim_config, asset_sim_config = get_configs(n_days, vehicles, 0, 0, l2_stations, n_dcfc, 'hiker_9_to_5.json')
+    # get_configs only sets a misspelt key so the horizon is set here
+    demand_sim_config['horizon_length_hours'] = n_days * 24
+    runtime = build_runtime(demand_sim_config, asset_sim_config)
+
+    with profiling(PhaseProfiler(), cprofile_path=cprofile_file) as profiler:
+        runtime.run(plot_output=False, random_sort=random_sort, assignment_engine=assignment_engine, event_driven=event_driven)
+
+    click.echo(profiler.format_summary())
+    with open(summary_file, 'w') as f:
+        json.dump(profiler.get_summary(), f, indent=2)
+    click.echo('Wrote ' + summary_file)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,195 @@
+import sqlite3
+
+
+# one row per simulation, the result tables point back to it with run_id
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS runs(
+        run_id INTEGER PRIMARY KEY,
+        run_key TEXT UNIQUE,
+        random_sort INTEGER NOT NULL,
+        n_dcfc INTEGER,
+        l2_station INTEGER,
+        vehicles INTEGER
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS late_departures(
+        departure_id INTEGER PRIMARY KEY,
+        run_id INTEGER REFERENCES runs(run_id),
+        random_sort INTEGER NOT NULL,
+        vehicles INTEGER,
+        l2_station INTEGER,
+        departure_deltas REAL,
+        n_dcfc INTEGER
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS power_stats(
+        sim_id INTEGER PRIMARY KEY,
+        run_id INTEGER REFERENCES runs(run_id),
+        random_sort INTEGER NOT NULL,
+        n_dcfc INTEGER,
+        l2_station INTEGER,
+        vehicles INTEGER,
+        max_power REAL,
+        min_power REAL,
+        avg_power REAL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS hourly_power_stats(
+        sim_id INTEGER PRIMARY KEY,
+        run_id INTEGER REFERENCES runs(run_id),
+        random_sort INTEGER NOT NULL,
+        n_dcfc INTEGER,
+        l2_station INTEGER,
+        vehicles INTEGER,
+        meter_power_kw REAL,
+        datetime DATETIME
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS hourly_peak_power(
+        peak_id INTEGER PRIMARY KEY,
+        run_id INTEGER REFERENCES runs(run_id),
+        random_sort INTEGER NOT NULL,
+        n_dcfc INTEGER,
+        l2_station INTEGER,
+        vehicles INTEGER,
+        hour INTEGER,
+        meter_power_kw REAL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS op_counts(
+        op_count_id INTEGER PRIMARY KEY,
+        run_id INTEGER REFERENCES runs(run_id),
+        datetime DATETIME,
+        counter TEXT,
+        count INTEGER
+    )
+    """
+]
+
+# the group by columns of plotter_data, the departure and hourly power indexes also cover the aggregated column
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS late_departures_group ON late_departures(random_sort, n_dcfc, vehicles, l2_station, departure_deltas)",
+    "CREATE INDEX IF NOT EXISTS late_departures_run ON late_departures(run_id)",
+    "CREATE INDEX IF NOT EXISTS power_stats_group ON power_stats(random_sort, n_dcfc, l2_station, vehicles)",
+    "CREATE INDEX IF NOT EXISTS power_stats_run ON power_stats(run_id)",
+    "CREATE INDEX IF NOT EXISTS hourly_power_stats_group ON hourly_power_stats(random_sort, n_dcfc, l2_station, vehicles, datetime, meter_power_kw)",
+    "CREATE INDEX IF NOT EXISTS hourly_power_stats_run ON hourly_power_stats(run_id)",
+    "CREATE INDEX IF NOT EXISTS hourly_peak_power_run ON hourly_peak_power(run_id)",
+    "CREATE INDEX IF NOT EXISTS op_counts_run ON op_counts(run_id, counter)"
+]
+
+
+def connect_result_db(db_path='test.db'):
+    """
+    open the results db in WAL mode, creating tables and indexes if needed
+
+    dbs written before runs were tracked get a run_id column, their old rows keep a null run_id. run keys live in
+    runs only, a completed_runs table from before that is dropped
+    """
+    con = sqlite3.connect(db_path)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA foreign_keys=ON")
+
+    with con:
+        for statement in SCHEMA:
+            con.execute(statement)
+        # its keys hash older sources so they can never match a current run
+        con.execute("DROP TABLE IF EXISTS completed_runs")
+        for table in ['late_departures', 'power_stats', 'hourly_power_stats']:
+            columns = [row[1] for row in con.execute("PRAGMA table_info(" + table + ")")]
+            if 'run_id' not in columns:
+                con.execute("ALTER TABLE " + table + " ADD COLUMN run_id INTEGER REFERENCES runs(run_id)")
+        for statement in INDEXES:
+            con.execute(statement)
+
+    return con
+
+
+def get_completed_run_keys(db_path='test.db'):
+    con = connect_result_db(db_path)
+    completed_run_keys = set(run_key for (run_key,) in con.execute("SELECT run_key FROM runs WHERE run_key IS NOT NULL"))
+    con.close()
+    return completed_run_keys
+
+
+def get_power_stats(run_result):
+    """
+    :return: max/min/avg meter power of a run, from its power stats if it has them, otherwise from its power snapshot
+    """
+    if 'power_stats' in run_result:
+        return run_result['power_stats']
+
+    list_of_power_measures = list(run_result['power_snapshot'].values())
+    return {
+        'max_power': max(list_of_power_measures),
+        'min_power': min(list_of_power_measures),
+        'avg_power': sum(list_of_power_measures)/len(list_of_power_measures)
+    }
+
+
+def get_hourly_peak_power(run_result):
+    """
+    :return: hour of day -> peak meter power of a run, from its hourly peaks if it has them, otherwise from its power snapshot
+    """
+    if 'hourly_peak_power' in run_result:
+        return run_result['hourly_peak_power']
+
+    hourly_peak_power = {}
+    for datetime, meter_power_kw in run_result['power_snapshot'].items():
+        hourly_peak_power[datetime.hour] = max(hourly_peak_power.get(datetime.hour, meter_power_kw), meter_power_kw)
+    return hourly_peak_power
+
+
+def write_run_results(con, run_results):
+    """
+    insert single_run results in one transaction, nothing is written if any insert fails
+
+    :param run_results: list of dicts returned by single_run, runs that streamed their KPIs give power stats and
+    hourly peaks instead of a power snapshot, op counts are only written for runs that counted them
+    """
+    with con:
+        for run_result in run_results:
+            settings = (
+                int(run_result['random_sort']),
+                int(run_result['n_dcfc']),
+                int(run_result['l2_station']),
+                int(run_result['vehicles'])
+            )
+            run_id = con.execute(
+                "INSERT INTO runs(run_key, random_sort, n_dcfc, l2_station, vehicles) VALUES(?, ?, ?, ?, ?)",
+                (run_result['run_key'],) + settings
+            ).lastrowid
+
+            con.executemany(
+                "INSERT INTO late_departures(run_id, random_sort, n_dcfc, l2_station, vehicles, departure_deltas) VALUES(?, ?, ?, ?, ?, ?)",
+                [(run_id,) + settings + (float(departure_delta),) for departure_delta in run_result['departure_deltas']]
+            )
+
+            # mark the max power draw at a given point in time
+            power_stats = get_power_stats(run_result)
+            con.execute(
+                "INSERT INTO power_stats(run_id, random_sort, n_dcfc, l2_station, vehicles, max_power, min_power, avg_power) VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id,) + settings + (power_stats['max_power'], power_stats['min_power'], power_stats['avg_power'])
+            )
+
+            con.executemany(
+                "INSERT INTO hourly_power_stats(run_id, random_sort, n_dcfc, l2_station, vehicles, meter_power_kw, datetime) VALUES(?, ?, ?, ?, ?, ?, ?)",
+                [(run_id,) + settings + (float(meter_power_kw), str(datetime)) for datetime, meter_power_kw in run_result['power_snapshot'].items()]
+            )
+
+            # hourly peaks are kept apart from the meter power of every interval
+            con.executemany(
+                "INSERT INTO hourly_peak_power(run_id, random_sort, n_dcfc, l2_station, vehicles, hour, meter_power_kw) VALUES(?, ?, ?, ?, ?, ?, ?)",
+                [(run_id,) + settings + (int(hour), float(meter_power_kw)) for hour, meter_power_kw in run_result.get('hourly_peak_power', {}).items()]
+            )
+
+            con.executemany(
+                "INSERT INTO op_counts(run_id, datetime, counter, count) VALUES(?, ?, ?, ?)",
+                [(run_id, str(datetime), counter, int(count)) for datetime, counter, count in run_result.get('op_counts', [])]
+            )
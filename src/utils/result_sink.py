@@ -0,0 +1,90 @@
+import multiprocessing
+import queue
+import time
+
+from src.utils.result_db import connect_result_db, write_run_results
+from src.utils.result_store import get_result_store_run_keys, write_result_store
+
+
+def run_result_sink(result_queue, db_path, batch_size, flush_seconds, store_path=None):
+    """
+    the only process writing to the results db, writes whatever results are queued in batches until it reads None
+
+    :param store_path: also write every batch as a new partition of this columnar result store, before the batch
+    goes into the db so the db never has a run the store is missing. runs already in the store, written before
+    a crash kept their batch out of the db, are not stored twice
+    """
+    con = connect_result_db(db_path)
+    stored_run_keys = set() if store_path is None else get_result_store_run_keys(store_path)
+    batch = []
+    last_flush = time.monotonic()
+
+    while True:
+        try:
+            run_result = result_queue.get(timeout=flush_seconds)
+        except queue.Empty:
+            # nothing arrived, only check whether the batch is due
+            run_result = False
+
+        if run_result:
+            batch.append(run_result)
+
+        # flush when the batch is full, when results have been waiting too long or on shutdown
+        if len(batch) >= batch_size or time.monotonic() - last_flush >= flush_seconds or run_result is None:
+            if batch:
+                write_result_batch(con, batch, store_path, stored_run_keys)
+                batch = []
+            last_flush = time.monotonic()
+
+        if run_result is None:
+            break
+
+    con.close()
+
+
+def write_result_batch(con, batch, store_path, stored_run_keys):
+    if store_path is not None:
+        store_batch = [run_result for run_result in batch if run_result['run_key'] is None or run_result['run_key'] not in stored_run_keys]
+        if store_batch:
+            write_result_store(store_path, store_batch)
+            stored_run_keys.update(run_result['run_key'] for run_result in store_batch if run_result['run_key'] is not None)
+    write_run_results(con, batch)
+
+
+class ResultSink:
+    """
+    separate process owning the results db, simulation workers put their run results on queue
+
+    with ResultSink() as result_sink:
+        result_sink.put(run_result)
+
+    workers in other processes put on result_sink.queue directly, their parent should call check_alive as results complete
+    """
+
+    def __init__(self, db_path='test.db', batch_size=16, flush_seconds=5.0, store_path=None):
+        self.queue = multiprocessing.Queue()
+        self.process = multiprocessing.Process(
+            target=run_result_sink,
+            args=(self.queue, db_path, batch_size, flush_seconds, store_path),
+            daemon=True
+        )
+
+    def __enter__(self):
+        self.process.start()
+        return self
+
+    def check_alive(self):
+        # a dead sink would otherwise only show up in __exit__, after every run has been simulated
+        if not self.process.is_alive():
+            raise RuntimeError('result sink exited with code ' + str(self.process.exitcode) + ', results are no longer being written')
+
+    def put(self, run_result):
+        self.check_alive()
+        self.queue.put(run_result)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # write anything still queued, then stop
+        self.queue.put(None)
+        self.process.join()
+        if self.process.exitcode != 0 and exc_type is None:
+            raise RuntimeError('result sink exited with code ' + str(self.process.exitcode) + ', results may be missing from the db')
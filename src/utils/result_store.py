@@ -0,0 +1,122 @@
+import os
+import shutil
+from typing import Dict, List, Set
+
+import numpy as np
+
+from src.utils.result_db import get_hourly_peak_power, get_power_stats
+
+
+# per run metadata, one value per run
+RUN_COLUMNS = ['random_sort', 'n_dcfc', 'l2_station', 'vehicles']
+
+
+def write_result_store(store_path, run_results):
+    """
+    write single_run results as a new partition of a columnar result store, one .npy file per column
+
+    departure deltas and meter power of every run are concatenated into one array each,
+    run i owns rows offsets[i]:offsets[i + 1]. runs that streamed their KPIs have no meter power rows,
+    the hourly peaks of every run are kept apart as one row of 24 hours per run
+
+    the partition is written under a temporary name and renamed into place, so readers never see half of one
+
+    :return: path of the partition written
+    """
+    os.makedirs(store_path, exist_ok=True)
+    partition_name = 'part_' + str(len(get_partition_paths(store_path))).zfill(5)
+    partition_path = os.path.join(store_path, partition_name)
+    tmp_partition_path = os.path.join(store_path, 'tmp_' + partition_name)
+    shutil.rmtree(tmp_partition_path, ignore_errors=True)
+    os.makedirs(tmp_partition_path)
+
+    columns = {
+        'run_key': np.array([str(run_result['run_key']) for run_result in run_results]),
+        'random_sort': np.array([bool(run_result['random_sort']) for run_result in run_results], dtype=bool),
+        'n_dcfc': np.array([run_result['n_dcfc'] for run_result in run_results], dtype=np.int64),
+        'l2_station': np.array([run_result['l2_station'] for run_result in run_results], dtype=np.int64),
+        'vehicles': np.array([run_result['vehicles'] for run_result in run_results], dtype=np.int64),
+        'max_power': np.array([get_power_stats(run_result)['max_power'] for run_result in run_results], dtype=np.float64),
+        'min_power': np.array([get_power_stats(run_result)['min_power'] for run_result in run_results], dtype=np.float64),
+        'avg_power': np.array([get_power_stats(run_result)['avg_power'] for run_result in run_results], dtype=np.float64),
+        'departure_offsets': get_offsets([len(run_result['departure_deltas']) for run_result in run_results]),
+        'departure_deltas': np.array(
+            [departure_delta for run_result in run_results for departure_delta in run_result['departure_deltas']],
+            dtype=np.float64
+        ),
+        'power_offsets': get_offsets([len(run_result['power_snapshot']) for run_result in run_results]),
+        'meter_power_kw': np.array(
+            [meter_power_kw for run_result in run_results for meter_power_kw in run_result['power_snapshot'].values()],
+            dtype=np.float64
+        ),
+        'power_datetime': np.array(
+            [datetime for run_result in run_results for datetime in run_result['power_snapshot'].keys()],
+            dtype='datetime64[s]'
+        ),
+        'hourly_peak_power_kw': get_hourly_peak_power_rows(run_results)
+    }
+
+    for column_name, values in columns.items():
+        np.save(os.path.join(tmp_partition_path, column_name + '.npy'), values)
+    os.rename(tmp_partition_path, partition_path)
+
+    return partition_path
+
+
+def get_hourly_peak_power_rows(run_results) -> np.ndarray:
+    # nan for hours without a vehicle charging
+    hourly_peak_power_kw = np.full((len(run_results), 24), np.nan)
+    for run_idx, run_result in enumerate(run_results):
+        for hour, meter_power_kw in get_hourly_peak_power(run_result).items():
+            hourly_peak_power_kw[run_idx, hour] = meter_power_kw
+    return hourly_peak_power_kw
+
+
+def get_offsets(lengths: List[int]) -> np.ndarray:
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def get_partition_paths(store_path) -> List[str]:
+    if not os.path.isdir(store_path):
+        return []
+    return [
+        os.path.join(store_path, partition_name)
+        for partition_name in sorted(os.listdir(store_path))
+        if partition_name.startswith('part_')
+    ]
+
+
+def get_result_store_run_keys(store_path) -> Set[str]:
+    """
+    :return: run keys of the seeded runs already in the store
+    """
+    return set(
+        str(run_key)
+        for partition_path in get_partition_paths(store_path)
+        for run_key in np.load(os.path.join(partition_path, 'run_key.npy'))
+        if run_key != 'None'
+    )
+
+
+def load_result_store(store_path, mmap_mode='r') -> List[Dict[str, np.ndarray]]:
+    """
+    :param mmap_mode: passed to np.load, the default memory maps every column instead of reading it
+    :return: one dict of column name -> array per partition
+    """
+    partitions = []
+    for partition_path in get_partition_paths(store_path):
+        partitions.append({
+            file_name[:-len('.npy')]: np.load(os.path.join(partition_path, file_name), mmap_mode=mmap_mode)
+            for file_name in os.listdir(partition_path)
+            if file_name.endswith('.npy')
+        })
+    return partitions
+
+
+def get_row_run_index(offsets: np.ndarray) -> np.ndarray:
+    """
+    :return: index of the run owning each row of a concatenated column
+    """
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
@@ -0,0 +1,46 @@
+from functools import lru_cache
+import hashlib
+import json
+import os
+
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+
+@lru_cache(maxsize=None)
+def get_code_version():
+    """
+    hash of every simulator source file so results from older code are never mistaken for current ones
+    """
+    code_hash = hashlib.sha256()
+    for dir_path, dir_names, file_names in os.walk(SRC_DIR):
+        # walk in a fixed order
+        dir_names[:] = sorted(dir_name for dir_name in dir_names if dir_name not in ('tests', '__pycache__'))
+        for file_name in sorted(file_names):
+            if file_name.endswith('.py'):
+                file_path = os.path.join(dir_path, file_name)
+                code_hash.update(os.path.relpath(file_path, SRC_DIR).encode())
+                with open(file_path, 'rb') as f:
+                    code_hash.update(f.read())
+    return code_hash.hexdigest()
+
+
+def get_run_key(demand_sim_config, asset_sim_config, random_sort, assignment_engine, seed, streaming_kpis=False, count_ops=False):
+    """
+    content address of a single_run, two runs with the same key give the same results as the seed covers every
+    random draw and the simulation only reads simulated time, never the wall clock
+
+    streaming_kpis and count_ops are part of the key as they decide which result tables a run fills,
+    event_driven, incremental and transport are left out as they don't change results
+    """
+    run = {
+        'demand_sim_config': demand_sim_config,
+        'asset_sim_config': asset_sim_config,
+        'random_sort': bool(random_sort),
+        'assignment_engine': assignment_engine,
+        'seed': int(seed),
+        'streaming_kpis': bool(streaming_kpis),
+        'count_ops': bool(count_ops),
+        'code_version': get_code_version()
+    }
+    return hashlib.sha256(json.dumps(run, sort_keys=True, default=int).encode()).hexdigest()
@@ -0,0 +1,200 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import multiprocessing
+import random
+import resource
+import sys
+from time import perf_counter
+import tracemalloc
+
+import numpy as np
+
+from src.asset_simulator.reservation.reservation import Reservation
+from src.asset_simulator.reservation.reservation_record import ReservationRecord
+from src.asset_simulator.vehicle.vehicle import Vehicle
+from src.asset_simulator.vehicle.vehicle_fleet_state import VehicleFleetState
+from src.asset_simulator.vehicle.vehicle_record import VehicleRecord
+from src.instrumentation.phase_profiler import profiling
+from src.utils.single_run import build_runtime, get_configs
+from src.utils.utils import get_service_seconds
+
+
+SCALE_VEHICLES = [1000, 10000, 50000]
+
+# ratios of the default single_run depot, 85 sedans with 33 L2 and 5 DCFC stations and 60 reservations a day
+L2_STATIONS_PER_VEHICLE = 0.4
+DCFC_STATIONS_PER_VEHICLE = 0.05
+RESERVATIONS_PER_VEHICLE_DAY = 0.7
+
+
+def get_scale_configs(vehicles, n_intervals=96, asset_config='hiker_9_to_5.json'):
+    """
+    :param n_intervals: the horizon is rounded down to whole hours
+    :return: (demand simulator config, asset simulator config) for a sedan fleet with proportional stations and demand
+    """
+    l2_stations = int(vehicles * L2_STATIONS_PER_VEHICLE)
+    dcfc_stations = max(1, int(vehicles * DCFC_STATIONS_PER_VEHICLE))
+    demand_sim_config, asset_sim_config = get_configs(1, vehicles, 0, 0, l2_stations, dcfc_stations, asset_config)
+
+    demand_sim_config['horizon_length_hours'] = max(1, n_intervals * demand_sim_config['interval_seconds'] // 3600)
+    demand_sim_config['mean_reservations_per_day'] = int(vehicles * RESERVATIONS_PER_VEHICLE_DAY)
+    demand_sim_config['mean_walk_ins_per_day'] = int(vehicles * RESERVATIONS_PER_VEHICLE_DAY)
+    return demand_sim_config, asset_sim_config
+
+
+def get_peak_rss_mb():
+    # ru_maxrss is kilobytes on linux and bytes on mac
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / 1024**2 if sys.platform == 'darwin' else peak_rss / 1024
+
+
+def run_scale_case(vehicles, n_intervals=96, seed=0):
+    """
+    build the three services for a fleet of this size and step them through n_intervals
+
+    KPIs are streamed instead of snapshotted so the memory measured is the simulator's own,
+    peak RSS covers the whole process so run each case in a fresh process, see run_scale_case_in_process
+
+    :return: dict of the fleet size, station counts, build/run seconds, interval latency and peak RSS
+    """
+    rss_before_build_mb = get_peak_rss_mb()
+    demand_sim_config, asset_sim_config = get_scale_configs(vehicles, n_intervals)
+
+    random.seed(seed)
+    np.random.seed(seed)
+    start = perf_counter()
+    runtime = build_runtime(demand_sim_config, asset_sim_config)
+    build_seconds = perf_counter() - start
+    runtime.asset_simulator.use_kpi_accumulator()
+    runtime.interval_wall_seconds = []
+
+    with profiling() as profiler:
+        start = perf_counter()
+        runtime.run(plot_output=False)
+        run_seconds = perf_counter() - start
+
+    interval_ms = 1000 * np.array(runtime.interval_wall_seconds)
+    return {
+        'vehicles': int(vehicles),
+        'l2_stations': asset_sim_config['n_l2_stations'],
+        'n_dcfc': asset_sim_config['n_dcfc_stations'],
+        'n_intervals': len(interval_ms),
+        'build_seconds': build_seconds,
+        'run_seconds': run_seconds,
+        'intervals_per_sec': len(interval_ms) / run_seconds,
+        'interval_ms_p50': float(np.percentile(interval_ms, 50)),
+        'interval_ms_p95': float(np.percentile(interval_ms, 95)),
+        'interval_ms_max': float(interval_ms.max()),
+        'phase_seconds': get_service_seconds(profiler),
+        'rss_before_build_mb': rss_before_build_mb,
+        'peak_rss_mb': get_peak_rss_mb()
+    }
+
+
+def run_scale_case_in_process(vehicles, n_intervals=96, seed=0):
+    # a spawned process starts with nothing from earlier cases so its peak RSS is this case's alone
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(run_scale_case, vehicles, n_intervals, seed).result()
+
+
+def get_retained_bytes(make_object, n=10000):
+    """
+    :param make_object: called with 0..n-1, every object gets its own values so nothing is shared between them
+    :return: bytes still allocated per object while all n are alive, includes the list slot holding it
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [make_object(idx) for idx in range(0, n)]
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del objects
+    return retained / n
+
+
+def make_vehicle(idx):
+    return Vehicle(
+        id=idx,
+        connected_station_id=None,
+        type='sedan',
+        state_of_charge=0.5 + idx * 1e-9,
+        energy_capacity_kwh=40,
+        status='parked'
+    )
+
+
+def make_reservation(idx):
+    created_at = datetime(year=2022, month=1, day=1) + timedelta(seconds=idx)
+    return Reservation(
+        id=str(idx),
+        departure_timestamp_utc=created_at + timedelta(hours=10),
+        arrival_timestamp_utc=created_at + timedelta(hours=34),
+        created_at_timestamp_utc=created_at,
+        vehicle_type='sedan',
+        state_of_charge=0.8 + idx * 1e-9,
+        status='unassigned'
+    )
+
+
+def get_object_memory(n=10000):
+    """
+    retained bytes of one Vehicle/Reservation as a pydantic model versus the same fields as a dict, a namedtuple,
+    the slotted record the simulation works on and, for vehicles, a row of the VehicleFleetState arrays used by
+    array backed fleets
+
+    :return: list of dicts with object, representation and bytes_per_object
+    """
+    VehicleTuple = namedtuple('VehicleTuple', Vehicle.__fields__)
+    ReservationTuple = namedtuple('ReservationTuple', Reservation.__fields__)
+
+    # the fleet state arrays are measured whole and split across vehicles
+    vehicles = [make_vehicle(idx) for idx in range(0, n)]
+    fleet_state_bytes = get_retained_bytes(lambda idx: VehicleFleetState.from_vehicles(vehicles), 1) / n
+
+    object_memory = [
+        ('Vehicle', 'pydantic', get_retained_bytes(make_vehicle, n)),
+        ('Vehicle', 'dict', get_retained_bytes(lambda idx: make_vehicle(idx).dict(), n)),
+        ('Vehicle', 'namedtuple', get_retained_bytes(lambda idx: VehicleTuple(**make_vehicle(idx).dict()), n)),
+        ('Vehicle', 'VehicleRecord', get_retained_bytes(lambda idx: VehicleRecord.from_model(make_vehicle(idx)), n)),
+        ('Vehicle', 'VehicleFleetState row', fleet_state_bytes),
+        ('Reservation', 'pydantic', get_retained_bytes(make_reservation, n)),
+        ('Reservation', 'dict', get_retained_bytes(lambda idx: make_reservation(idx).dict(), n)),
+        ('Reservation', 'namedtuple', get_retained_bytes(lambda idx: ReservationTuple(**make_reservation(idx).dict()), n)),
+        ('Reservation', 'ReservationRecord', get_retained_bytes(lambda idx: ReservationRecord.from_model(make_reservation(idx)), n))
+    ]
+    return [
+        {'object': object_name, 'representation': representation, 'bytes_per_object': bytes_per_object}
+        for object_name, representation, bytes_per_object in object_memory
+    ]
+
+
+def format_scale_table(scale_results):
+    """
+    :return: markdown table with one row per fleet size
+    """
+    lines = [
+        '| vehicles | L2 / DCFC | build s | intervals/sec | interval p50 ms | p95 ms | max ms | peak RSS MB |',
+        '|---:|---:|---:|---:|---:|---:|---:|---:|'
+    ]
+    for result in scale_results:
+        lines.append('| ' + ' | '.join([
+            str(result['vehicles']),
+            str(result['l2_stations']) + ' / ' + str(result['n_dcfc']),
+            '{:.1f}'.format(result['build_seconds']),
+            '{:.1f}'.format(result['intervals_per_sec']),
+            '{:.0f}'.format(result['interval_ms_p50']),
+            '{:.0f}'.format(result['interval_ms_p95']),
+            '{:.0f}'.format(result['interval_ms_max']),
+            '{:.0f}'.format(result['peak_rss_mb'])
+        ]) + ' |')
+    return '\n'.join(lines)
+
+
+def format_object_memory_table(object_memory):
+    lines = [
+        '| object | representation | bytes |',
+        '|---|---|---:|'
+    ]
+    for row in object_memory:
+        lines.append('| ' + row['object'] + ' | ' + row['representation'] + ' | ' + '{:.0f}'.format(row['bytes_per_object']) + ' |')
+    return '\n'.join(lines)
@@ -0,0 +1,34 @@
+import json
+
+import click
+
+from src.utils.scale_harness import SCALE_VEHICLES, format_object_memory_table, format_scale_table, get_object_memory, run_scale_case_in_process
+
+
+@click.command()
+@click.option('--vehicles', default=','.join(str(vehicles) for vehicles in SCALE_VEHICLES), help='comma separated fleet sizes, stations and demand scale with the fleet')
+@click.option('--n_intervals', default=96, help='intervals every fleet is stepped through')
+@click.option('--seed', default=0, help='seed of every run')
+@click.option('--object_count', default=10000, help='objects built to measure the memory of one Vehicle/Reservation')
+@click.option('--output_file', default='scale.json', help='json file the results are written to')
+def run(vehicles, n_intervals, seed, object_count, output_file):
+
+    scale_results = []
+    for n_vehicles in [int(count) for count in vehicles.split(',')]:
+        click.echo('running ' + str(n_vehicles) + ' vehicles')
+        # every fleet gets a fresh process so peak RSS isn't carried over from the fleet before
+        scale_results.append(run_scale_case_in_process(n_vehicles, n_intervals, seed))
+
+    object_memory = get_object_memory(object_count)
+
+    click.echo(format_scale_table(scale_results))
+    click.echo('')
+    click.echo(format_object_memory_table(object_memory))
+
+    with open(output_file, 'w') as f:
+        json.dump({'scale': scale_results, 'object_memory': object_memory}, f, indent=2)
+    click.echo('Wrote ' + output_file)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,189 @@
+from datetime import datetime
+import json
+import os
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from src.demand_simulator.reservation_stream.reservation_stream import ReservationStream
+from src.utils.single_run import build_runtime, get_configs
+
+
+# bumped whenever the layout of a bundle changes
+SCENARIO_FORMAT_VERSION = 1
+SCENARIO_START_DATETIME = datetime(year=2022, month=1, day=1)
+
+
+def get_fleet_mix(vehicles, type_weights):
+    """
+    :return: vehicle type -> count, split by type_weights with the remainder going to the most common type
+    """
+    total_weight = sum(type_weights.values())
+    fleet_mix = {vehicle_type: int(vehicles * weight / total_weight) for vehicle_type, weight in type_weights.items()}
+    most_common_type = max(type_weights, key=type_weights.get)
+    fleet_mix[most_common_type] += vehicles - sum(fleet_mix.values())
+    return fleet_mix
+
+
+def get_scenario_configs(vehicles, n_days, l2_per_vehicle=0.4, dcfc_per_vehicle=0.05, reservations_per_vehicle_day=0.7, asset_config='hiker_9_to_5.json'):
+    """
+    :return: (demand simulator config, asset simulator config) of a mixed fleet split like the reservation types,
+    with stations and reservations per day scaled to the fleet
+    """
+    demand_sim_config, asset_sim_config = get_configs(n_days, 0, 0, 0, 0, 0, asset_config)
+    fleet_mix = get_fleet_mix(vehicles, demand_sim_config['reservation_types'])
+    demand_sim_config, asset_sim_config = get_configs(
+        n_days,
+        fleet_mix.get('sedan', 0),
+        fleet_mix.get('suv', 0),
+        fleet_mix.get('crossover', 0),
+        int(vehicles * l2_per_vehicle),
+        max(1, int(vehicles * dcfc_per_vehicle)),
+        asset_config
+    )
+
+    # get_configs only sets a misspelt key so the horizon is set here
+    demand_sim_config['horizon_length_hours'] = n_days * 24
+    # keep the spread of the default config relative to its mean
+    mean_reservations_per_day = int(vehicles * reservations_per_vehicle_day)
+    demand_sim_config['stdev_reservations_per_day'] = max(1, int(
+        demand_sim_config['stdev_reservations_per_day'] * mean_reservations_per_day / demand_sim_config['mean_reservations_per_day']
+    ))
+    demand_sim_config['mean_reservations_per_day'] = mean_reservations_per_day
+    return demand_sim_config, asset_sim_config
+
+
+def get_day_departure_offsets(demand_sim_config, rng):
+    """
+    first draws of a day's random stream, bucketed like DemandSimulator.get_daily_event_counts: events at or before
+    midnight or past the end of the day are dropped and the rest depart at the start of their interval, with the
+    first interval of the day departing at the next midnight
+
+    :return: intervals from the start of the day to each departure, in draw order
+    """
+    interval_seconds = demand_sim_config['interval_seconds']
+    n_intervals = int(24 * 3600 / interval_seconds)
+    n_reservations = max(0, int(rng.normal(demand_sim_config['mean_reservations_per_day'], demand_sim_config['stdev_reservations_per_day'])))
+    departure_intervals = np.maximum(0, rng.normal(
+        demand_sim_config['mean_vehicle_departure_hour_of_day'],
+        demand_sim_config['stdev_vehicle_departure_hours'],
+        size=n_reservations
+    )) * 3600 / interval_seconds
+    interval_of_day = np.floor(departure_intervals).astype(np.int64)
+    in_interval = (interval_of_day < n_intervals) & (departure_intervals > interval_of_day)
+    return np.where(interval_of_day == 0, n_intervals, interval_of_day)[in_interval]
+
+
+def get_day_reservations(demand_sim_config, vehicle_type_weights, day_start, seed, day):
+    """
+    sample one day of reservations with the departures DemandSimulator makes at midnight and trips rounded to whole
+    intervals of at least 2 hours, unlike DemandSimulator no reservation is dropped for want of an available vehicle
+
+    every day has its own random stream so a bundle doesn't depend on how many days are generated at once
+
+    :return: dict of column -> array, rows sorted by departure
+    """
+    rng = np.random.default_rng([seed, day])
+    interval_seconds = demand_sim_config['interval_seconds']
+
+    departure_offset = get_day_departure_offsets(demand_sim_config, rng)
+    n_reservations = len(departure_offset)
+    trip_hours = np.maximum(2, rng.normal(
+        demand_sim_config['mean_reservation_duration_hours'],
+        demand_sim_config['stdev_reservation_hours'],
+        size=n_reservations
+    ))
+    trip_intervals = np.round(trip_hours * 3600 / interval_seconds).astype(np.int64)
+    vehicle_type_code = rng.choice(len(vehicle_type_weights), size=n_reservations, p=vehicle_type_weights).astype(np.int8)
+
+    order = np.argsort(departure_offset, kind='stable')
+    departure = np.datetime64(day_start, 's') + (departure_offset[order] * interval_seconds).astype('timedelta64[s]')
+    return {
+        'created_at': np.full(n_reservations, np.datetime64(day_start, 's')),
+        'departure': departure,
+        'arrival': departure + (trip_intervals[order] * interval_seconds).astype('timedelta64[s]'),
+        'vehicle_type_code': vehicle_type_code[order]
+    }
+
+
+def write_scenario_bundle(bundle_path, vehicles, n_days, seed=0, **config_kwargs):
+    """
+    write a scenario bundle: the depot and demand configs as json and the reservations as .npy columns,
+    the same arguments always give the same files
+
+    reservations are written a day at a time into memory mapped columns so a bundle of millions of reservations
+    is never held in memory
+
+    :param config_kwargs: passed to get_scenario_configs
+    :return: the bundle manifest
+    """
+    demand_sim_config, asset_sim_config = get_scenario_configs(vehicles, n_days, **config_kwargs)
+    vehicle_types = [vehicle_type for vehicle_type, vehicle_settings in asset_sim_config['vehicles'].items() if vehicle_settings['n'] > 0]
+    vehicle_type_weights = np.array([asset_sim_config['vehicles'][vehicle_type]['n'] for vehicle_type in vehicle_types]) / vehicles
+
+    reservations_path = os.path.join(bundle_path, 'reservations')
+    os.makedirs(reservations_path, exist_ok=True)
+
+    day_starts = [np.datetime64(SCENARIO_START_DATETIME, 's') + np.timedelta64(day * 24 * 3600, 's') for day in range(0, n_days)]
+    day_lengths = [len(get_day_departure_offsets(demand_sim_config, np.random.default_rng([seed, day]))) for day in range(0, n_days)]
+    n_reservations = sum(day_lengths)
+
+    columns = {
+        'created_at': open_memmap(os.path.join(reservations_path, 'created_at.npy'), mode='w+', dtype='datetime64[s]', shape=(n_reservations,)),
+        'departure': open_memmap(os.path.join(reservations_path, 'departure.npy'), mode='w+', dtype='datetime64[s]', shape=(n_reservations,)),
+        'arrival': open_memmap(os.path.join(reservations_path, 'arrival.npy'), mode='w+', dtype='datetime64[s]', shape=(n_reservations,)),
+        'vehicle_type_code': open_memmap(os.path.join(reservations_path, 'vehicle_type_code.npy'), mode='w+', dtype=np.int8, shape=(n_reservations,))
+    }
+    row = 0
+    for day, (day_start, day_length) in enumerate(zip(day_starts, day_lengths)):
+        day_reservations = get_day_reservations(demand_sim_config, vehicle_type_weights, day_start, seed, day)
+        for column_name, column in columns.items():
+            column[row:row + day_length] = day_reservations[column_name]
+        row += day_length
+    for column in columns.values():
+        column.flush()
+    del columns
+
+    manifest = {
+        'format_version': SCENARIO_FORMAT_VERSION,
+        'seed': seed,
+        'vehicles': vehicles,
+        'n_days': n_days,
+        'start_datetime': SCENARIO_START_DATETIME.isoformat(),
+        'n_reservations': n_reservations,
+        'vehicle_types': vehicle_types
+    }
+    for file_name, contents in [('scenario.json', manifest), ('demand_config.json', demand_sim_config), ('depot_config.json', asset_sim_config)]:
+        with open(os.path.join(bundle_path, file_name), 'w') as f:
+            json.dump(contents, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_scenario_bundle(bundle_path, mmap_mode='r'):
+    """
+    :return: (manifest, demand simulator config, asset simulator config, ReservationStream over the bundle)
+    """
+    contents = []
+    for file_name in ['scenario.json', 'demand_config.json', 'depot_config.json']:
+        with open(os.path.join(bundle_path, file_name)) as f:
+            contents.append(json.load(f))
+    manifest, demand_sim_config, asset_sim_config = contents
+
+    if manifest['format_version'] != SCENARIO_FORMAT_VERSION:
+        raise ValueError('scenario bundle format ' + str(manifest['format_version']) + ' can not be read, expected ' + str(SCENARIO_FORMAT_VERSION))
+
+    reservation_stream = ReservationStream.from_path(os.path.join(bundle_path, 'reservations'), manifest['vehicle_types'], mmap_mode=mmap_mode)
+    return manifest, demand_sim_config, asset_sim_config, reservation_stream
+
+
+def build_scenario_runtime(bundle_path, transport='in_process'):
+    """
+    :return: RuntimeEnvironment whose demand simulator publishes the bundle's reservations instead of sampling them
+    """
+    manifest, demand_sim_config, asset_sim_config, reservation_stream = load_scenario_bundle(bundle_path)
+    runtime = build_runtime(demand_sim_config, asset_sim_config, transport)
+    start_datetime = datetime.fromisoformat(manifest['start_datetime'])
+    for service in [runtime.demand_simulator, runtime.asset_simulator, runtime.heuristic]:
+        service.current_datetime = start_datetime
+    runtime.demand_simulator.reservation_stream = reservation_stream
+    return runtime
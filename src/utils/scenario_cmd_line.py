@@ -0,0 +1,28 @@
+import click
+
+from src.utils.scenario import write_scenario_bundle
+
+
+@click.command()
+@click.option('--output_dir', required=True, help='directory the scenario bundle is written to')
+@click.option('--vehicles', default=1000, help='fleet size, split into sedans, suvs and crossovers like the reservation types')
+@click.option('--n_days', default=14, help='days of reservations generated')
+@click.option('--seed', default=0, help='the same seed and settings always give the same bundle')
+@click.option('--l2_per_vehicle', default=0.4, help='L2 EVSEs per vehicle')
+@click.option('--dcfc_per_vehicle', default=0.05, help='DCFC stations per vehicle, at least one')
+@click.option('--reservations_per_vehicle_day', default=0.7, help='mean reservations a day per vehicle')
+def run(output_dir, vehicles, n_days, seed, l2_per_vehicle, dcfc_per_vehicle, reservations_per_vehicle_day):
+    manifest = write_scenario_bundle(
+        output_dir,
+        vehicles,
+        n_days,
+        seed=seed,
+        l2_per_vehicle=l2_per_vehicle,
+        dcfc_per_vehicle=dcfc_per_vehicle,
+        reservations_per_vehicle_day=reservations_per_vehicle_day
+    )
+    click.echo('Wrote ' + str(manifest['n_reservations']) + ' reservations for ' + str(vehicles) + ' vehicles to ' + output_dir)
+
+
+if __name__ == '__main__':
+    run()
@@ -1,169 +1,172 @@
+from contextlib import ExitStack
 import json
 import os
-import sqlite3
+import random
+
+import numpy as np
 
 from src.asset_simulator.depot_config.depot_config import AssetDepotConfig
 from src.asset_simulator.depot.asset_depot import AssetDepot
 from src.demand_simulator.demand_simulator.demand_simulator import DemandSimulator
 from src.demand_simulator.demand_simulator_config.demand_simulator_config import DemandSimulatorConfig
 from src.heuristic.depot.algo_depot import AlgoDepot
+from src.instrumentation.op_counters import counting
+from src.instrumentation.phase_profiler import profiling
 from src.mock_queue.mock_queue import MockQueue
+from src.mock_queue.transport import TRANSPORTS
 
+from src.utils.result_db import connect_result_db, get_completed_run_keys, write_run_results
+from src.utils.run_key import get_run_key
 from src.utils.utils import RuntimeEnvironment
 
-def single_run(n_days, sedan_count, suv_count, crossover_count, l2_station_count, dcfc_station_count, random_sort, asset_config, write_results=True):
-
-    print('running with veh_count: ' + str(sedan_count) + ' and l2_station_count: ' + str(l2_station_count))
-    # setup mock queue
-    mock_queue = MockQueue()
-
+def get_configs(n_days, sedan_count, suv_count, crossover_count, l2_station_count, dcfc_station_count, asset_config):
+    """
+    :return: (demand simulator config, asset simulator config) as dicts with the run's overrides applied
+    """
     script_dir = os.path.dirname(__file__) #<-- absolute dir the script is in
     demand_sim_config = '../demand_simulator/demand_simulator_config/configs/5days_15min_40res_per_day.json'
     demand_sim_path = os.path.join(script_dir, demand_sim_config)
 
-    # setup demand_simulator
     with open(demand_sim_path) as f:
         demand_sim_config = json.load(f)
 
-        demand_sim_config['horizontal_length_hours'] = n_days * 24
-
-        demand_simulator_config = DemandSimulatorConfig(**demand_sim_config)
-        demand_simulator = DemandSimulator(config=demand_simulator_config, queue=mock_queue)
-
-        # setup asset_simulator
-        asset_sim_config = '../asset_simulator/depot_config/configs/' + asset_config
-        asset_sim_path = os.path.join(script_dir, asset_sim_config)
-
-        with open(asset_sim_path) as f:
-            asset_sim_config = json.load(f)
-
-        # override params
-        asset_sim_config['vehicles']['sedan']['n'] = sedan_count
-        asset_sim_config['vehicles']['suv']['n'] = suv_count
-        asset_sim_config['vehicles']['crossover']['n'] = crossover_count
-        asset_sim_config['n_l2_stations'] = l2_station_count
-        asset_sim_config['n_dcfc_stations'] = dcfc_station_count
-
-        asset_depot_config = AssetDepotConfig(**asset_sim_config)
-        asset_depot = AssetDepot.build_depot(config=asset_depot_config, queue=mock_queue)
-        # asset_depot.initialize_plugins()
-
-        # setup heuristic
-        # add a few more algo specific configs
-        asset_sim_config['minimum_ready_vehicle_pool'] = {
-            'sedan': 2,
-            'crossover': 2,
-            'suv': 2
-        }
-        algo_depot_config = AssetDepotConfig(**asset_sim_config)
-
-        algo_depot = AlgoDepot.build_depot(config=algo_depot_config, queue=mock_queue)
-
-
-        runtime = RuntimeEnvironment(
-            mock_queue=mock_queue,
-            demand_simulator=demand_simulator,
-            asset_simulator=asset_depot,
-            heuristic=algo_depot,
-            queue=mock_queue
-        )
-
-        # departure deltas in minutes
-        results = runtime.run(plot_output=False, random_sort=random_sort)
-
-        if write_results:
-
-            con = sqlite3.connect('test.db')
-            cur = con.cursor()
-            cur.execute("""
-            CREATE TABLE IF NOT EXISTS late_departures(
-                departure_id INTEGER PRIMARY KEY,
-                random_sort INTEGER NOT NULL,
-                vehicles INTEGER,
-                l2_station INTEGER,
-                departure_deltas REAL,
-                n_dcfc INTEGER
-            )
-            """)
-
-            cur.execute("""
-            CREATE TABLE IF NOT EXISTS power_stats(
-                sim_id INTEGER PRIMARY KEY,
-                random_sort INTEGER NOT NULL,
-                n_dcfc INTEGER,
-                l2_station INTEGER,
-                vehicles INTEGER,
-                max_power REAL,
-                min_power REAL,
-                avg_power REAL 
-            )
-            """)
-
-
-            cur.execute("""
-            CREATE TABLE IF NOT EXISTS hourly_power_stats(
-                sim_id INTEGER PRIMARY KEY,
-                random_sort INTEGER NOT NULL,
-                n_dcfc INTEGER,
-                l2_station INTEGER,
-                vehicles INTEGER,
-                meter_power_kw REAL,
-                datetime DATETIME
-            )
-            """)
-
-
-
-
-            sql_template = """INSERT INTO late_departures(random_sort, vehicles, l2_station, departure_deltas, n_dcfc) VALUES({random_sort}, {vehicles}, {l2_stations}, {departure_delta}, {n_dcfc});"""
-
-            # cycle through each delta
-            for departure_delta in results:
-                sql_formatted = sql_template.format(
-                    random_sort=random_sort,
-                    vehicles=sedan_count,
-                    l2_stations=l2_station_count,
-                    departure_delta=departure_delta,
-                    n_dcfc=dcfc_station_count
-                )
-
-                cur.execute(sql_formatted)
-
-            # mark the max power draw at a given point in time
-            list_of_power_measures = [kw for kw in asset_depot.power_snapshot.values()]
-            max_instant_power = max(list_of_power_measures)
-            min_instant_power = min(list_of_power_measures)
-            avg_instant_power = sum(list_of_power_measures)/len(list_of_power_measures)
-
-            sql_template = """INSERT INTO power_stats(random_sort, n_dcfc, l2_station, vehicles, max_power, min_power, avg_power) VALUES({random_sort}, {n_dcfc}, {l2_stations}, {vehicles}, {max_power}, {min_power}, {avg_power});"""
-            sql_formatted = sql_template.format(
-                random_sort=random_sort,
-                n_dcfc=dcfc_station_count,
-                l2_stations=l2_station_count,
-                vehicles=sedan_count,
-                max_power=max_instant_power,
-                min_power=min_instant_power,
-                avg_power=avg_instant_power
-            )
-            cur.execute(sql_formatted)
-
-
-            sql_template = """INSERT INTO hourly_power_stats(random_sort, n_dcfc, l2_station, vehicles, meter_power_kw, datetime) VALUES({random_sort}, {n_dcfc}, {l2_stations}, {vehicles}, {meter_power_kw}, '{datetime}');"""
-            for datetime, meter_power_kw in asset_depot.power_snapshot.items():
-                sql_formatted = sql_template.format(
-                    random_sort=random_sort,
-                    n_dcfc=dcfc_station_count,
-                    l2_stations=l2_station_count,
-                    vehicles=sedan_count,
-                    meter_power_kw=meter_power_kw,
-                    datetime=datetime
-                )
-                cur.execute(sql_formatted)
-
-            con.commit()
-
-
-        print('simulation complete')
+    demand_sim_config['horizontal_length_hours'] = n_days * 24
+
+    asset_sim_config = '../asset_simulator/depot_config/configs/' + asset_config
+    asset_sim_path = os.path.join(script_dir, asset_sim_config)
+
+    with open(asset_sim_path) as f:
+        asset_sim_config = json.load(f)
+
+    # override params
+    asset_sim_config['vehicles']['sedan']['n'] = sedan_count
+    asset_sim_config['vehicles']['suv']['n'] = suv_count
+    asset_sim_config['vehicles']['crossover']['n'] = crossover_count
+    asset_sim_config['n_l2_stations'] = l2_station_count
+    asset_sim_config['n_dcfc_stations'] = dcfc_station_count
+
+    return demand_sim_config, asset_sim_config
+
+
+def get_single_run_key(n_days, sedan_count, suv_count, crossover_count, l2_station_count, dcfc_station_count, random_sort, asset_config, assignment_engine='greedy', seed=None, streaming_kpis=False, count_ops=False, **kwargs):
+    """
+    :return: run key of the single_run called with these arguments, None for unseeded runs as they can't be repeated
+    """
+    if seed is None:
+        return None
+
+    demand_sim_config, asset_sim_config = get_configs(n_days, sedan_count, suv_count, crossover_count, l2_station_count, dcfc_station_count, asset_config)
+    return get_run_key(demand_sim_config, asset_sim_config, random_sort, assignment_engine, seed, streaming_kpis, count_ops)
+
+
+def single_run(n_days, sedan_count, suv_count, crossover_count, l2_station_count, dcfc_station_count, random_sort, asset_config, write_results=True, assignment_engine='greedy', incremental=False, event_driven=False, transport='in_process', seed=None, db_path='test.db', streaming_kpis=False, snapshot_recorder=False, profile=False, cprofile_path=None, count_ops=False):
+    """
+    :param seed: seeds random and np.random before the run so the same seed always gives the same run,
+    seeded runs already in the results db are skipped when writing results
+    :param streaming_kpis: accumulate KPIs as the run goes instead of capturing snapshots, the power snapshot
+    returned is empty and hourly_peak_power holds the peak meter power of each hour of day instead
+    :param snapshot_recorder: keep snapshots in preallocated arrays, soc is kept as float32
+    :param profile: time the phases of the three services, the summary is returned as phase_profile
+    :param cprofile_path: also dump cProfile stats of the run here, implies profile
+    :param count_ops: count hot path operations per interval, returned as op_counts and written to the results db
+    :return: dict of the run settings, departure deltas in minutes and meter power per interval, None if skipped
+    """
+    demand_sim_config, asset_sim_config = get_configs(n_days, sedan_count, suv_count, crossover_count, l2_station_count, dcfc_station_count, asset_config)
+    run_key = None if seed is None else get_run_key(demand_sim_config, asset_sim_config, random_sort, assignment_engine, seed, streaming_kpis, count_ops)
+
+    if write_results and run_key in get_completed_run_keys(db_path):
+        print('skipping completed run with veh_count: ' + str(sedan_count) + ' and l2_station_count: ' + str(l2_station_count))
+        return None
+
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+
+    print('running with veh_count: ' + str(sedan_count) + ' and l2_station_count: ' + str(l2_station_count))
+    runtime = build_runtime(demand_sim_config, asset_sim_config, transport)
+    asset_depot = runtime.asset_simulator
+    # asset_depot.initialize_plugins()
+    if streaming_kpis:
+        asset_depot.use_kpi_accumulator()
+    elif snapshot_recorder:
+        asset_depot.use_snapshot_recorder()
+
+    # departure deltas in minutes
+    with ExitStack() as stack:
+        profiler = stack.enter_context(profiling(cprofile_path=cprofile_path)) if profile or cprofile_path is not None else None
+        op_counters = stack.enter_context(counting()) if count_ops else None
+        results = runtime.run(plot_output=False, random_sort=random_sort, assignment_engine=assignment_engine, incremental=incremental, event_driven=event_driven)
+
+    run_result = {
+        'run_key': run_key,
+        'random_sort': random_sort,
+        'vehicles': sedan_count,
+        'l2_station': l2_station_count,
+        'n_dcfc': dcfc_station_count,
+        'departure_deltas': results,
+        'power_snapshot': asset_depot.get_power_snapshot()
+    }
+    if streaming_kpis:
+        run_result['hourly_peak_power'] = asset_depot.kpi_accumulator.get_hourly_peak_power()
+        run_result['power_stats'] = asset_depot.kpi_accumulator.get_power_stats()
+    if profiler is not None:
+        run_result['phase_profile'] = profiler.get_summary()
+    if op_counters is not None:
+        run_result['op_counts'] = op_counters.get_records()
+
+    if write_results:
+        write_run_result(run_result, db_path)
+
+    print('simulation complete')
+    return run_result
+
+
+def build_runtime(demand_sim_config, asset_sim_config, transport='in_process'):
+    """
+    :param demand_sim_config: demand simulator config dict, see get_configs
+    :param asset_sim_config: asset simulator config dict, the heuristic gets a copy with its own extra settings
+    :return: RuntimeEnvironment with the three services sharing one mock queue
+    """
+    # setup mock queue, all services share this process so json is only needed to mimic the wire
+    mock_queue = MockQueue(transport=TRANSPORTS[transport]())
+
+    # setup demand_simulator
+    demand_simulator_config = DemandSimulatorConfig(**demand_sim_config)
+    demand_simulator = DemandSimulator(config=demand_simulator_config, queue=mock_queue)
+
+    # setup asset_simulator, its fleet is charged and driven as arrays
+    asset_depot_config = AssetDepotConfig(**asset_sim_config)
+    asset_depot = AssetDepot.build_depot(config=asset_depot_config, queue=mock_queue, array_backed=True)
+
+    # setup heuristic
+    # add a few more algo specific configs
+    algo_sim_config = dict(asset_sim_config)
+    algo_sim_config['minimum_ready_vehicle_pool'] = {
+        'sedan': 2,
+        'crossover': 2,
+        'suv': 2
+    }
+    algo_depot_config = AssetDepotConfig(**algo_sim_config)
+
+    algo_depot = AlgoDepot.build_depot(config=algo_depot_config, queue=mock_queue)
+
+    return RuntimeEnvironment(
+        mock_queue=mock_queue,
+        demand_simulator=demand_simulator,
+        asset_simulator=asset_depot,
+        heuristic=algo_depot,
+        queue=mock_queue
+    )
+
+
+def write_run_result(run_result, db_path='test.db'):
+    """
+    append the results of one single_run to the sqlite results db, seeded runs are recorded with their run key
+    in the same transaction so a rerun skips them
+    """
+    con = connect_result_db(db_path)
+    write_run_results(con, [run_result])
+    con.close()
 
 
 if __name__ == '__main__':
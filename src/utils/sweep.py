@@ -0,0 +1,100 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
+
+import numpy as np
+
+from src.utils.single_run import get_single_run_key, single_run
+
+
+def get_grid_point_seed(base_seed, repeat, vehicles, l2_stations):
+    """
+    every grid point gets its own random stream that doesn't depend on which worker runs it or in what order
+    """
+    seed_sequence = np.random.SeedSequence([base_seed, repeat, int(vehicles), int(l2_stations)])
+    return int(seed_sequence.generate_state(1)[0])
+
+
+def get_grid_points(n_repeats, vehicles, l2_stations, base_seed=0, **single_run_kwargs):
+    """
+    :return: list of single_run kwargs, one per repeat x vehicle count x L2 station count
+    """
+    grid_points = []
+    for repeat in range(0, n_repeats):
+        for veh in vehicles:
+            for station_count in l2_stations:
+                grid_points.append(dict(
+                    single_run_kwargs,
+                    sedan_count=int(veh),
+                    suv_count=0,
+                    crossover_count=0,
+                    l2_station_count=int(station_count),
+                    seed=get_grid_point_seed(base_seed, repeat, veh, station_count)
+                ))
+    return grid_points
+
+
+def get_new_grid_points(grid_points, completed_run_keys):
+    """
+    :return: grid points whose run key isn't in completed_run_keys
+    """
+    return [grid_point for grid_point in grid_points if get_single_run_key(**grid_point) not in completed_run_keys]
+
+
+# set in each worker when results go straight to a ResultSink, the sink itself when running in this process
+_result_queue = None
+
+
+def set_result_queue(result_queue):
+    global _result_queue
+    _result_queue = result_queue
+
+
+def run_grid_point(grid_point):
+    # workers never touch the db, results either go back to the parent or to the result sink
+    run_result = single_run(write_results=False, **grid_point)
+    if _result_queue is None:
+        return run_result
+
+    _result_queue.put(run_result)
+    return grid_point
+
+
+def run_sweep(grid_points, on_result, workers=1, result_sink=None):
+    """
+    run single_run at every grid point
+
+    :param on_result: called in this process with each run result as it completes, in completion order,
+    or with the grid point when results go to result_sink
+    :param workers: number of worker processes, 1 runs everything in this process and 0 uses every core
+    :param result_sink: ResultSink the workers put their results on instead of sending them back, the sweep
+    stops with a RuntimeError as soon as the sink is found dead
+    """
+    if workers == 0:
+        workers = os.cpu_count()
+
+    if result_sink is not None:
+        result_sink.check_alive()
+
+    if workers == 1:
+        # ResultSink.put checks the sink is still alive before every result
+        set_result_queue(result_sink)
+        try:
+            for grid_point in grid_points:
+                on_result(run_grid_point(grid_point))
+        finally:
+            set_result_queue(None)
+        return
+
+    result_queue = None if result_sink is None else result_sink.queue
+    with ProcessPoolExecutor(max_workers=workers, initializer=set_result_queue, initargs=(result_queue,)) as executor:
+        futures = [executor.submit(run_grid_point, grid_point) for grid_point in grid_points]
+        try:
+            for future in as_completed(futures):
+                on_result(future.result())
+                if result_sink is not None:
+                    result_sink.check_alive()
+        except BaseException:
+            # don't simulate the rest of the grid on the way out
+            for future in futures:
+                future.cancel()
+            raise
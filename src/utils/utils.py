@@ -1,3 +1,7 @@
+from datetime import timedelta
+from time import perf_counter
+from typing import Dict, List, Optional
+
 import pandas as pd
 from pydantic import BaseModel
 import sqlite3
@@ -5,60 +9,90 @@ import sqlite3
 from src.asset_simulator.depot.asset_depot import AssetDepot
 from src.demand_simulator.demand_simulator.demand_simulator import DemandSimulator
 from src.heuristic.depot.algo_depot import AlgoDepot
+from src.instrumentation.op_counters import end_op_interval
+from src.instrumentation.phase_profiler import PhaseProfiler, profile_phase
 from src.mock_queue.mock_queue import MockQueue
 from src.plotter.plotter import Plotter
 
 
+# services timed as runtime.<service> while profiling, see get_service_seconds
+SERVICES = ['demand', 'asset', 'heuristic']
+
+
 class RuntimeEnvironment(BaseModel):
     demand_simulator: DemandSimulator
     asset_simulator: AssetDepot
     heuristic: AlgoDepot
+    # wall seconds of every interval, only kept when set to a list before the run
+    interval_wall_seconds: Optional[List[float]] = None
     queue: MockQueue
 
-    def run(self, plot_output=True, random_sort=False):
+    def run(self, plot_output=True, random_sort=False, assignment_engine='greedy', incremental=False, event_driven=False):
+        """
+        :param plot_output: ignored when the asset simulator doesn't capture snapshots, the departure deltas are returned
+        :param event_driven: only run the full asset simulator and heuristic intervals when something can happen,
+        quiet intervals just charge/drive vehicles and record snapshots and the demand simulator and heuristic clocks
+        jump straight to the next event. Gives the same results as stepping every interval
+        """
+        if not self.asset_simulator.capture_snapshots and self.asset_simulator.kpi_accumulator is None:
+            # nothing would be recorded, fail before simulating
+            raise ValueError('capture_snapshots is off without a kpi_accumulator, see AssetDepot.use_kpi_accumulator')
+
         interval_seconds = self.demand_simulator.config.interval_seconds
         horizon_length_hours = self.demand_simulator.config.horizon_length_hours
 
         n_intervals = int((horizon_length_hours * 3600) / interval_seconds)
-        for interval in range(0, n_intervals):
+        if self.asset_simulator.snapshot_recorder is not None:
+            self.asset_simulator.snapshot_recorder.reserve(n_intervals)
+        interval = 0
+        while interval < n_intervals:
 
             pct_complete = 100.0*interval/n_intervals
             # print(str(pct_complete) + ': % complete')
 
-            self.demand_simulator.run_interval()
-            self.asset_simulator.run_interval()
-            self.heuristic.run_interval(random_sort=True)
+            interval_start = perf_counter()
+            n_quiet_intervals = self.get_quiet_intervals(n_intervals - interval) if event_driven else 0
+            if n_quiet_intervals > 0:
+                n_run = self.run_quiet_intervals(
+                    n_quiet_intervals,
+                    random_sort=random_sort,
+                    assignment_engine=assignment_engine,
+                    incremental=incremental
+                )
+            else:
+                self.run_demand_interval()
+                state_changed = self.run_asset_interval(event_driven=event_driven)
+                self.run_heuristic_interval(
+                    random_sort=random_sort,
+                    assignment_engine=assignment_engine,
+                    incremental=incremental,
+                    event_driven=event_driven,
+                    state_changed=state_changed
+                )
+                self.end_interval()
+                n_run = 1
+
+            interval += n_run
+            if self.interval_wall_seconds is not None:
+                # intervals jumped over share the time evenly
+                self.interval_wall_seconds.extend([(perf_counter() - interval_start)/n_run]*n_run)
 
-            # increment clock
-            self.demand_simulator.increment_interval()
-            self.asset_simulator.increment_interval()
-            self.heuristic.increment_interval()
 
+        kpi_accumulator = self.asset_simulator.kpi_accumulator
+        if kpi_accumulator is not None:
+            kpi_accumulator.finish(self.asset_simulator.current_datetime)
+        if not self.asset_simulator.capture_snapshots:
+            # no history to plot, the departure deltas were accumulated as the simulation ran
+            return kpi_accumulator.departure_deltas
 
         # load meta data into dataframe for plotting
-        df_soc = pd.DataFrame.from_dict(self.asset_simulator.vehicle_soc_snapshot)
-        df_status = pd.DataFrame.from_dict(self.asset_simulator.vehicle_status_snapshot)
+        df_soc = self.asset_simulator.get_soc_frame()
+        df_status = self.asset_simulator.get_status_frame()
         df_actual_departures = pd.DataFrame.from_dict(self.asset_simulator.departure_snapshot)
         df_actual_departures['departure_delta_minutes'] = df_actual_departures['actual_departure_datetime'] - df_actual_departures['scheduled_departure_datetime']
         df_actual_departures['departure_delta_minutes'] = pd.to_timedelta(df_actual_departures['departure_delta_minutes'])/pd.Timedelta('60s')
 
-        flat_list_results = []
-        for veh_key, veh_res_list in self.asset_simulator.reservation_assignment_snapshot.items():
-            # we need to exclude non-vehicle assignments
-            if veh_key != None:
-                for res in veh_res_list:
-                    # find the corresponding item in the dataframe
-                    delta_minutes = df_actual_departures.loc[(df_actual_departures['vehicle_id'] == veh_key) & (df_actual_departures['reservation_id'] == res.id)]['departure_delta_minutes'].values
-
-                    if len(delta_minutes) > 0:
-                        delta_minutes = delta_minutes[0]
-                    elif len(delta_minutes) == 0:
-                        # if the departure never occured we default to a large delta minutes departure for tracking
-                        # NOTE: use delta from current_timestamp and prior
-                        delta_minutes = self.asset_simulator.current_datetime - res.departure_timestamp_utc
-                        delta_minutes = delta_minutes.total_seconds()/60
-
-                    flat_list_results.append(delta_minutes)
+        flat_list_results = self.get_departure_deltas(df_actual_departures)
 
 
         if plot_output:
@@ -68,7 +102,8 @@ class RuntimeEnvironment(BaseModel):
                 df_status,
                 self.asset_simulator.reservation_assignment_snapshot,
                 self.asset_simulator.move_charge_snapshot,
-                self.asset_simulator.fleet_manager.station_fleet
+                self.asset_simulator.fleet_manager.station_fleet,
+                status_segments=self.asset_simulator.get_status_segments()
             )
             # departure_delta_minutes = (pd.to_timedelta(df_actual_departures['departure_delta_minutes'])/pd.Timedelta('60s')).tolist()
             # return (soc_chart, departure_delta_minutes)
@@ -77,4 +112,161 @@ class RuntimeEnvironment(BaseModel):
         if plot_output == False:
             # departure_delta_minutes = df_actual_departures['departure_delta_minutes'].tolist()
             # return departure_delta_minutes
-            return flat_list_results
\ No newline at end of file
+            return flat_list_results
+
+    def get_departure_deltas(self, df_actual_departures: pd.DataFrame) -> list:
+        """
+        departure delta in minutes of every reservation assignment sent to a vehicle, in snapshot order
+
+        reservations that never departed are counted as late from their scheduled departure until the end of the run
+        """
+        assignments = [
+            (veh_key, res.id, res.departure_timestamp_utc)
+            for veh_key, veh_res_list in self.asset_simulator.reservation_assignment_snapshot.items()
+            # we need to exclude non-vehicle assignments
+            if veh_key != None
+            for res in veh_res_list
+        ]
+        df_assignments = pd.DataFrame(assignments, columns=['vehicle_id', 'reservation_id', 'departure_timestamp_utc'])
+
+        # a reservation departs at most once, keep the first departure like a lookup would
+        df_deltas = df_actual_departures[['vehicle_id', 'reservation_id', 'departure_delta_minutes']] \
+            .drop_duplicates(subset=['vehicle_id', 'reservation_id'])
+        df_assignments = df_assignments.merge(df_deltas, on=['vehicle_id', 'reservation_id'], how='left')
+
+        # if the departure never occured we default to a large delta minutes departure for tracking
+        # NOTE: use delta from current_timestamp and prior
+        never_departed = df_assignments['departure_delta_minutes'].isna()
+        df_assignments.loc[never_departed, 'departure_delta_minutes'] = \
+            (self.asset_simulator.current_datetime - df_assignments.loc[never_departed, 'departure_timestamp_utc']).dt.total_seconds()/60
+
+        return df_assignments['departure_delta_minutes'].tolist()
+
+    def end_interval(self):
+        end_op_interval(self.demand_simulator.current_datetime)
+
+        # increment clock
+        self.demand_simulator.increment_interval()
+        self.asset_simulator.increment_interval()
+        self.heuristic.increment_interval()
+
+    def get_quiet_intervals(self, max_intervals):
+        """
+        :return: intervals from now until the next reservation, departure, arrival or station done cooling down,
+        at most max_intervals. 0 unless none of the services has anything to do this interval
+        """
+        interval = timedelta(seconds=self.demand_simulator.config.interval_seconds)
+        current_datetime = self.asset_simulator.current_datetime
+        next_datetime = current_datetime + max_intervals*interval
+        for service in [self.demand_simulator, self.asset_simulator]:
+            event_datetime = service.get_next_event_datetime()
+            if event_datetime is not None:
+                next_datetime = min(next_datetime, event_datetime)
+        if next_datetime == current_datetime:
+            return 0
+
+        if not self.asset_simulator.is_quiet_interval() or not self.heuristic.is_quiet_interval():
+            return 0
+        event_datetime = self.heuristic.get_next_event_datetime()
+        if event_datetime is not None:
+            next_datetime = min(next_datetime, event_datetime)
+        return (next_datetime - current_datetime)//interval
+
+    def run_quiet_intervals(self, n_intervals, random_sort=False, assignment_engine='greedy', incremental=False):
+        """
+        jump over intervals get_quiet_intervals found nothing due in, only the asset simulator steps through them
+        to charge/drive and record its vehicles
+
+        :return: intervals run, fewer than n_intervals once the asset simulator isn't quiet. The interval a vehicle
+        driving drops below minimum soc in is finished like in run so the heuristic can act on it
+        """
+        n_run = 0
+        while n_run < n_intervals:
+            # get_quiet_intervals checked the first one, a vehicle can still finish charging in the others
+            if n_run > 0 and not self.asset_simulator.is_quiet_interval():
+                break
+
+            if self.run_quiet_asset_interval():
+                self.skip_quiet_intervals(n_run)
+                self.run_heuristic_interval(
+                    random_sort=random_sort,
+                    assignment_engine=assignment_engine,
+                    incremental=incremental,
+                    event_driven=True
+                )
+                self.end_interval()
+                return n_run + 1
+
+            end_op_interval(self.asset_simulator.current_datetime)
+            self.asset_simulator.increment_interval()
+            n_run += 1
+
+        self.skip_quiet_intervals(n_run)
+        return n_run
+
+    def skip_quiet_intervals(self, n_intervals):
+        # catch the demand simulator and heuristic up with the asset simulator
+        self.demand_simulator.skip_intervals(n_intervals)
+        self.heuristic.skip_quiet_intervals(n_intervals)
+
+    @profile_phase('runtime.demand')
+    def run_demand_interval(self):
+        self.demand_simulator.run_interval()
+
+    @profile_phase('runtime.asset')
+    def run_asset_interval(self, event_driven=False):
+        """
+        :param event_driven: quiet intervals just charge/drive vehicles and only publish when that changed something
+        :return: True if the asset simulator published its state to the heuristic
+        """
+        if not event_driven:
+            self.asset_simulator.run_interval()
+            return True
+
+        if self.asset_simulator.is_quiet_interval():
+            state_changed = self.asset_simulator.step_quiet_interval()
+        else:
+            self.asset_simulator.step_interval()
+            state_changed = True
+        self.publish_asset_state(state_changed)
+        return state_changed
+
+    @profile_phase('runtime.asset')
+    def run_quiet_asset_interval(self):
+        # only called once the interval is known to be quiet, see run_quiet_intervals
+        state_changed = self.asset_simulator.step_quiet_interval()
+        self.publish_asset_state(state_changed)
+        return state_changed
+
+    def publish_asset_state(self, state_changed):
+        # the heuristic decides whether it is quiet from what was published to it
+        if state_changed:
+            self.asset_simulator.publish_state(demand_simulator=False)
+
+        # the demand simulator only reads the fleet when it generates reservations at midnight
+        next_datetime = self.asset_simulator.current_datetime + timedelta(seconds=self.asset_simulator.interval_seconds)
+        if DemandSimulator.is_reservation_generation_time(next_datetime):
+            self.asset_simulator.publish_state(heuristic=False)
+
+    @profile_phase('runtime.heuristic')
+    def run_heuristic_interval(self, random_sort=False, assignment_engine='greedy', incremental=False, event_driven=False, state_changed=True):
+        """
+        :param state_changed: whether the asset simulator published its state this interval, see run_asset_interval
+        """
+        if event_driven and self.heuristic.is_quiet_interval():
+            self.heuristic.run_quiet_interval()
+            return
+
+        # soc changes of quiet intervals are only published once the heuristic needs them
+        if not state_changed:
+            self.asset_simulator.publish_state(demand_simulator=False)
+        self.heuristic.run_interval(random_sort=random_sort, assignment_engine=assignment_engine, incremental=incremental)
+
+
+def get_service_seconds(profiler: PhaseProfiler) -> Dict[str, float]:
+    """
+    :param profiler: collected while RuntimeEnvironment.run was profiling
+    :return: wall seconds spent in each service over the run, demand/asset/heuristic
+    """
+    total_seconds = {row['phase']: row['total_seconds'] for row in profiler.get_summary()}
+    return {service: total_seconds.get('runtime.' + service, 0.0) for service in SERVICES}
@@ -125,6 +125,8 @@ with st.echo(code_location='below'):
 
    asset_depot = AssetDepot.build_depot(config=asset_depot_config, queue=mock_queue)
    # asset_depot.initialize_plugins()
+   # statuses are plotted as spans so only keep the status changes
+   asset_depot.use_status_timeline()
 
    print('num vehicles test 123')
    print(len(asset_depot.vehicles))